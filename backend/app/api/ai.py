@@ -1,23 +1,177 @@
-from fastapi import APIRouter, HTTPException
+import json
+from typing import List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Request, Response
 from fastapi import Body
-from pydantic import BaseModel
-from app.services.ai_service import generate_response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, model_validator
+from app.db.schemas import Message, ModelResponse
+from app.services.ai_scheduler import SchedulerOverloaded
+from app.services.campaign_memory import CAMPAIGN_ID_PATTERN
+from app.services.ai_service import (
+    GenerationCancelled,
+    build_context,
+    generate_model_response,
+    stream_response,
+)
 
 router = APIRouter()
 
 
 class GenerateRequest(BaseModel):
     prompt: str
+    history: List[Message] = []
+    # When set, the session's messages and rolling summary are used; a
+    # history cannot be passed as well.
+    session_id: Optional[str] = None
+    # Skip the response cache to get a fresh completion ("reroll").
+    reroll: bool = False
+    # Used to queue model calls fairly between campaigns and users.
+    user_id: Optional[str] = None
+    campaign_id: Optional[str] = Field(None, pattern=CAMPAIGN_ID_PATTERN)
+    # Relevant lore from this world is added to the prompt.
+    world_id: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _history_or_session(self):
+        if self.history and self.session_id:
+            raise ValueError("Pass either history or session_id, not both")
+        return self
+
+    def fairness_key(self, request: Request) -> str:
+        if self.campaign_id:
+            return f"campaign:{self.campaign_id}"
+        if self.user_id:
+            return f"user:{self.user_id}"
+        # Anonymous callers are queued per client address rather than all
+        # under one key, so one of them cannot use up the shared slot and
+        # pending cap and push the others into 429s. Behind a proxy, run
+        # uvicorn with --proxy-headers so this is the real client.
+        host = request.client.host if request.client else "unknown"
+        return f"client:{host}"
+
+
+def _overloaded(error: SchedulerOverloaded) -> HTTPException:
+    return HTTPException(status_code=error.status_code,
+                         detail=str(error),
+                         headers={"Retry-After": str(error.retry_after)})
 
 
 @router.post("/generate")
-async def generate_response_endpoint(data: GenerateRequest):
+async def generate_response_endpoint(data: GenerateRequest, request: Request):
     """
     Generate a response from the AI model based on the prompt and conversation history.
+
+    The provider call is aborted if the client disconnects before it completes.
+
+    Returns:
+        dict: The generated text under "response", plus the ModelResponse
+        measurements (queue time, time to first token, latency, token
+        counts and cache status).
     """
     try:
         prompt = data.prompt
-        response = generate_response(prompt)
-        return {"response": response}
+        context = await build_context(prompt,
+                                      history=data.history,
+                                      session_id=data.session_id,
+                                      fairness_key=data.fairness_key(request),
+                                      world_id=data.world_id,
+                                      campaign_id=data.campaign_id)
+        response = await generate_model_response(
+            prompt,
+            history=context.messages,
+            is_disconnected=request.is_disconnected,
+            bypass_cache=data.reroll,
+            fairness_key=data.fairness_key(request),
+            prompt_tokens=context.prompt_tokens)
+        return {"response": response.generated_text, **response.model_dump()}
+    except GenerationCancelled:
+        # 499 Client Closed Request; nobody is listening for the body.
+        return Response(status_code=499)
+    except SchedulerOverloaded as e:
+        raise _overloaded(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _format_chunk(payload: dict, format: str, event: str = None) -> str:
+    """
+    Encode a single streamed chunk as an SSE frame or an NDJSON line.
+    """
+    if format == "ndjson":
+        return json.dumps(payload) + "\n"
+    frame = f"data: {json.dumps(payload)}\n\n"
+    if event:
+        frame = f"event: {event}\n" + frame
+    return frame
+
+
+@router.post("/generate/stream")
+async def stream_response_endpoint(data: GenerateRequest,
+                                   request: Request,
+                                   format: Literal["sse", "ndjson"] = "sse"):
+    """
+    Stream the AI model response token by token.
+
+    Tokens are forwarded as soon as the provider emits them, either as
+    Server-Sent Events (default) or as newline-delimited JSON. The stream
+    ends with a `done` event carrying the ModelResponse measurements;
+    provider failures are reported in-band with
+    an `error` event once the status line has been sent. If the client
+    disconnects, the upstream stream is closed immediately.
+
+    Raises:
+        HTTPException:
+            429/503: If the request was shed by the scheduler (with Retry-After)
+            500: If the provider fails before the first token
+    """
+    # Wait for the first token before committing to a 200 so that shedding
+    # and early provider errors still get a real status code.
+    try:
+        context = await build_context(data.prompt,
+                                      history=data.history,
+                                      session_id=data.session_id,
+                                      fairness_key=data.fairness_key(request),
+                                      world_id=data.world_id,
+                                      campaign_id=data.campaign_id)
+        stats = ModelResponse(generated_text="",
+                              prompt_tokens=context.prompt_tokens)
+        tokens = stream_response(data.prompt,
+                                 history=context.messages,
+                                 is_disconnected=request.is_disconnected,
+                                 bypass_cache=data.reroll,
+                                 fairness_key=data.fairness_key(request),
+                                 stats=stats)
+        first_token = await tokens.__anext__()
+    except StopAsyncIteration:
+        first_token = None
+    except SchedulerOverloaded as e:
+        raise _overloaded(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def token_stream():
+        try:
+            if first_token is not None:
+                yield _format_chunk({"token": first_token}, format)
+                async for token in tokens:
+                    yield _format_chunk({"token": token}, format)
+            yield _format_chunk(
+                {
+                    "done": True,
+                    **stats.model_dump(exclude={"generated_text"})
+                },
+                format,
+                event="done")
+        except Exception as e:
+            yield _format_chunk({"error": str(e)}, format, event="error")
+        finally:
+            await tokens.aclose()
+
+    media_type = ("application/x-ndjson"
+                  if format == "ndjson" else "text/event-stream")
+    return StreamingResponse(token_stream(),
+                             media_type=media_type,
+                             headers={
+                                 "Cache-Control": "no-cache",
+                                 "X-Accel-Buffering": "no"
+                             })
@@ -1,7 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Header
 from pydantic import BaseModel
-import firebase_admin
-from firebase_admin import credentials
 from fastapi.responses import JSONResponse  # Import JSONResponse
 from app.services.auth_service import (
     login_email_user,
@@ -10,37 +8,11 @@ from app.services.auth_service import (
 )
 
 from app.core.config import get_settings
-import os
 
 settings = get_settings()
 
 router = APIRouter()
 
-if not firebase_admin._apps:
-    try:
-        # Ensure the environment variable is set and the path is correct
-        cred_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
-        if not cred_path:
-            raise ValueError(
-                "FIREBASE_CREDENTIALS_PATH environment variable not set.")
-        if not os.path.exists(cred_path):
-            raise FileNotFoundError(
-                f"Firebase credentials file not found at: {cred_path}")
-
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-        # Log successful initialization
-        print("Firebase Admin SDK initialized successfully.")
-    except (ValueError, FileNotFoundError) as e:
-        print(f"Error initializing Firebase Admin SDK: {e}")
-        # Depending on your application's needs, you might want to exit or handle this differently
-        # For production, you'd want robust error handling here.
-    except Exception as e:
-        print(
-            f"An unexpected error occurred during Firebase Admin SDK initialization: {e}"
-        )
-
-
 class EmailPasswordLogin(BaseModel):
     email: str
     password: str
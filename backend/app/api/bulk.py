@@ -0,0 +1,87 @@
+# routes/bulk.py
+from typing import Any, Awaitable, Callable, List, Optional, Type
+from fastapi import HTTPException
+from pydantic import BaseModel, ValidationError
+from app.core.config import get_settings
+from app.repository import BulkWriteResult
+from app.db.schemas import BulkError, BulkWriteResponse
+
+settings = get_settings()
+
+
+def _check_size(entries: list) -> None:
+    if len(entries) > settings.BULK_WRITE_MAX_DOCUMENTS:
+        raise HTTPException(
+            status_code=413,
+            detail="Too many entries: at most "
+            f"{settings.BULK_WRITE_MAX_DOCUMENTS} per request")
+
+
+def _entry_id(entry: Any) -> Optional[str]:
+    if isinstance(entry, str):
+        return entry
+    entry_id = entry.get("id") if isinstance(entry, dict) else None
+    return entry_id if isinstance(entry_id, str) else None
+
+
+def validation_message(error: ValidationError) -> str:
+    """
+    Summarize a validation error as "loc: msg" pairs.
+    """
+    return "; ".join(
+        f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}"
+        for detail in error.errors())
+
+
+async def run_bulk(entries: List[Any],
+                   write: Callable[[list], Awaitable[BulkWriteResult]],
+                   model: Optional[Type[BaseModel]] = None
+                   ) -> BulkWriteResponse:
+    """
+    Validate the entries of a bulk request one by one and write the valid
+    ones with a single bulk service call.
+
+    An invalid entry does not fail the request: it is reported, with its
+    position, in the response's errors, like the writes that fail.
+
+    Args:
+        entries (List[Any]): The request body's entries.
+        write: The service function, e.g. create_items.
+        model (Type[BaseModel], optional): The model every entry must
+            validate against; without one, entries are passed on as they
+            are.
+
+    Returns:
+        BulkWriteResponse: The document ID of each entry (None where it
+            failed) and the errors, in request order.
+
+    Raises:
+        HTTPException: 413 if there are too many entries.
+    """
+    _check_size(entries)
+    valid, positions, errors = [], [], []
+    for index, entry in enumerate(entries):
+        if model is None:
+            valid.append(entry)
+            positions.append(index)
+            continue
+        try:
+            valid.append(model.model_validate(entry))
+            positions.append(index)
+        except ValidationError as e:
+            errors.append(
+                BulkError(index=index,
+                          id=_entry_id(entry),
+                          error=validation_message(e)))
+    ids = [None] * len(entries)
+    result = await write(valid) if valid else BulkWriteResult()
+    for position, index in enumerate(positions):
+        doc_id = result.ids[position]
+        if position in result.errors:
+            errors.append(
+                BulkError(index=index, id=doc_id,
+                          error=result.errors[position]))
+        else:
+            ids[index] = doc_id
+    errors.sort(key=lambda error: error.index)
+    return BulkWriteResponse(ids=ids, errors=errors)
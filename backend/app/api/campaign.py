@@ -1,33 +1,99 @@
 # routes/campaign.py
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.db.campaign import Campaign, CampaignCreate
-from app.services.campaign_service import get_campaign, get_all_campaigns_of_user, create_campaign, update_campaign, delete_campaign
-from app.services.character_service import get_character
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from google.cloud.exceptions import NotFound
+from typing import List, Optional, Tuple
+from app.api.listing import ListParams, list_params, list_response
+from app.api.mutation import to_mutation
+from datetime import datetime
+from app.db.campaign import Campaign, CampaignBase, CampaignCreate, CampaignEvent, CampaignEventRecord, CampaignExpanded, CampaignSummary
+from app.db.schemas import MutationRequest
+from app.repository import Mutation
+from app.services.campaign_service import campaign_character_ids, get_campaign, stream_campaigns_of_user, create_campaign, update_campaign, mutate_campaign, delete_campaign
+from app.services.character_service import get_character, get_characters_by_ids
+from app.services.world_service import get_worlds_by_ids
+from app.services.campaign_events import EventBufferFull, get_synced_memory, record_events, stream_events
+from app.services.cascade_delete import start_cascade_delete
 
 router = APIRouter()
+_list_params = list_params(Campaign, CampaignSummary)
+_event_list_params = list_params(CampaignEventRecord)
 
+EXPANDABLE = ("worlds", "characters")
 
-@router.get("/{campaign_id}", response_model=Campaign)
-def read_campaign(campaign_id: str):
+
+def _parse_expand(expand: Optional[str]) -> List[str]:
+    if not expand:
+        return []
+    names = list(dict.fromkeys(
+        name.strip() for name in expand.split(",") if name.strip()))
+    invalid = [name for name in names if name not in EXPANDABLE]
+    if invalid:
+        raise HTTPException(status_code=422,
+                            detail=f"Cannot expand {invalid}; "
+                            f"expected any of {list(EXPANDABLE)}")
+    return names
+
+
+async def _expand_campaign(campaign: dict,
+                           expand: List[str]) -> Tuple[dict, List[str]]:
+    lookups = {}
+    if "worlds" in expand:
+        lookups["worlds"] = get_worlds_by_ids(campaign.get("world_ids") or [])
+    if "characters" in expand:
+        lookups["characters"] = get_characters_by_ids(
+            campaign_character_ids(campaign))
+    # Each lookup is one batched read; the two run concurrently.
+    results = await asyncio.gather(*lookups.values())
+    expanded, missing_ids = dict(campaign), []
+    for name, result in zip(lookups, results):
+        expanded[name] = result.documents
+        missing_ids.extend(result.missing_ids)
+    return expanded, missing_ids
+
+
+@router.get("/{campaign_id}",
+            response_model=CampaignExpanded,
+            response_model_exclude_unset=True)
+async def read_campaign(
+    campaign_id: str,
+    response: Response,
+    expand: Optional[str] = Query(
+        None,
+        description="Comma-separated references to resolve: 'worlds', "
+        "'characters' or both."),
+):
     """
     Retrieve a campaign by its ID.
 
+    The campaign references its worlds and characters by ID. `expand`
+    adds the referenced documents as `worlds` and `characters`; IDs that
+    no longer exist are listed in the X-Missing-Ids response header.
+
     Args:
         campaign_id (str): The ID of the campaign.
+        expand (str, optional): The references to resolve.
 
     Returns:
-        Campaign: The campaign object.
+        CampaignExpanded: The campaign object, with the expanded lists.
 
     Raises:
         HTTPException: 
             404 if not found
+            422 for an unknown `expand` name
             500 for other errors
     """
     try:
-        campaign = get_campaign(campaign_id)
+        expand_names = _parse_expand(expand)
+        campaign = await get_campaign(campaign_id)
         if campaign is None:
             raise HTTPException(status_code=404, detail="Campaign not found")
+        campaign = {**campaign, "id": campaign_id}
+        if expand_names:
+            campaign, missing_ids = await _expand_campaign(
+                campaign, expand_names)
+            if missing_ids:
+                response.headers["X-Missing-Ids"] = ",".join(missing_ids)
         return campaign
     except HTTPException:
         raise
@@ -37,12 +103,16 @@ def read_campaign(campaign_id: str):
 
 
 @router.get("/user/{user_id}", response_model=List[Campaign])
-def read_campaigns_by_user(user_id: str):
+async def read_campaigns_by_user(user_id: str,
+                                 response: Response,
+                                 params: ListParams = Depends(_list_params)):
     """
     Retrieve all campaigns for a specific user.
 
     Args:
         user_id (str): The user's ID.
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
 
     Returns:
         List[Campaign]: List of campaign objects.
@@ -52,15 +122,15 @@ def read_campaigns_by_user(user_id: str):
             500 for errors
     """
     try:
-        campaigns = get_all_campaigns_of_user(user_id)
-        return campaigns
+        rows = stream_campaigns_of_user(user_id, **params.query())
+        return await list_response(params, response, rows)
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Error retrieving campaigns for user: {e}")
 
 
 @router.post("/", response_model=str)
-def create_campaign(campaign: CampaignCreate):
+async def create_campaign_route(campaign: CampaignCreate):
     """
     Create a new campaign.
 
@@ -75,7 +145,7 @@ def create_campaign(campaign: CampaignCreate):
             500 for errors
     """
     try:
-        campaign_id = create_campaign(campaign)
+        campaign_id = await create_campaign(campaign)
         return campaign_id
     except Exception as e:
         raise HTTPException(status_code=500,
@@ -83,7 +153,7 @@ def create_campaign(campaign: CampaignCreate):
 
 
 @router.put("/{campaign_id}", response_model=Campaign)
-def update_campaign(campaign_id: str, campaign: Campaign):
+async def update_campaign_route(campaign_id: str, campaign: Campaign):
     """
     Update an existing campaign.
 
@@ -100,7 +170,7 @@ def update_campaign(campaign_id: str, campaign: Campaign):
             500 for other errors
     """
     try:
-        updated_campaign = update_campaign(campaign_id, campaign)
+        updated_campaign = await update_campaign(campaign_id, campaign)
         if updated_campaign is None:
             raise HTTPException(status_code=404, detail="Campaign not found")
         return updated_campaign
@@ -111,34 +181,182 @@ def update_campaign(campaign_id: str, campaign: Campaign):
                             detail=f"Error updating campaign: {e}")
 
 
-@router.put("/{campaign_id}/characters/{character_id}")
-def add_character_to_campaign(campaign_id: str, character_id: str):
-    campaign = get_campaign(campaign_id)
-    if campaign is None:
+@router.patch("/{campaign_id}", response_model=Campaign)
+async def mutate_campaign_route(campaign_id: str, body: MutationRequest):
+    """
+    Change fields of a campaign without sending the whole campaign: set
+    fields, add to or remove from arrays (e.g. world_ids) and increment
+    numbers, in one atomic write.
+
+    Args:
+        campaign_id (str): The ID of the campaign to change.
+        body (MutationRequest): The field changes.
+
+    Returns:
+        Campaign: The updated campaign object.
+
+    Raises:
+        HTTPException: 
+            404 if not found
+            422 for an invalid change
+            500 for other errors
+    """
+    try:
+        return await mutate_campaign(campaign_id,
+                                     to_mutation(body, CampaignBase))
+    except HTTPException:
+        raise
+    except NotFound:
         raise HTTPException(status_code=404, detail="Campaign not found")
-    character = get_character(character_id)
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error changing campaign: {e}")
+
+
+@router.put("/{campaign_id}/characters/{character_id}")
+async def add_character_to_campaign(campaign_id: str, character_id: str):
+    character = await get_character(character_id)
     if character is None:
         raise HTTPException(status_code=404, detail="Character not found")
-    if character["type"] == "PC":
-        campaign["player_character_ids"] = campaign.get(
-            "player_character_ids", []) + [character_id]
+    # Characters without a type are player characters.
+    if character.get("type", "PC") == "PC":
+        roster = "player_character_ids"
     else:
-        campaign["active_npc_character_ids"] = campaign.get(
-            "active_npc_character_ids", []) + [character_id]
-    update_campaign(campaign_id, Campaign(**campaign))
+        roster = "active_npc_character_ids"
+    try:
+        # One array-union write: concurrent additions are all kept.
+        await mutate_campaign(campaign_id, Mutation(add={roster: [character_id]}))
+    except NotFound:
+        raise HTTPException(status_code=404, detail="Campaign not found")
     return {"message": "Character added to campaign"}
 
 
+@router.post("/{campaign_id}/events", status_code=202)
+async def record_campaign_events(campaign_id: str,
+                                 events: List[CampaignEvent]):
+    """
+    Append events to a campaign's event log.
+
+    The events are buffered and written in batches shortly after; reads of
+    the log always include them.
+
+    Args:
+        campaign_id (str): The ID of the campaign.
+        events (List[CampaignEvent]): The new events.
+
+    Returns:
+        dict: The new events' IDs, in request order.
+
+    Raises:
+        HTTPException: 
+            404 if the campaign is not found
+            503 if too many events are waiting to be written
+            500 for other errors
+    """
+    try:
+        campaign = await get_campaign(campaign_id)
+        if campaign is None:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        return {"ids": record_events(campaign_id, events)}
+    except HTTPException:
+        raise
+    except EventBufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e),
+                            headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error recording campaign events: {e}")
+
+
+@router.get("/{campaign_id}/events", response_model=List[CampaignEventRecord])
+async def read_campaign_events(
+    campaign_id: str,
+    response: Response,
+    since: Optional[datetime] = Query(
+        None, description="Only events at or after this time."),
+    until: Optional[datetime] = Query(
+        None, description="Only events before this time."),
+    params: ListParams = Depends(_event_list_params),
+):
+    """
+    Retrieve a campaign's events in timestamp order.
+
+    Args:
+        campaign_id (str): The ID of the campaign.
+        since (datetime, optional): Start of the time range.
+        until (datetime, optional): End of the time range (exclusive).
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
+
+    Returns:
+        List[CampaignEventRecord]: The events, with their IDs.
+
+    Raises:
+        HTTPException: 
+            404 if the campaign is not found
+            500 for other errors
+    """
+    try:
+        campaign = await get_campaign(campaign_id)
+        if campaign is None:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        rows = stream_events(campaign_id, since, until, **params.query())
+        return await list_response(params, response, rows)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error retrieving campaign events: {e}")
+
+
+@router.get("/{campaign_id}/memory")
+async def search_campaign_memory(campaign_id: str,
+                                 q: str,
+                                 k: int = Query(5, ge=1, le=100)):
+    """
+    Retrieve the campaign events most similar to a query.
+
+    Args:
+        campaign_id (str): The ID of the campaign.
+        q (str): The query text, e.g. an NPC name or a situation.
+        k (int): Maximum number of events to return.
+
+    Returns:
+        List[dict]: Matching events with their similarity scores, best first.
+
+    Raises:
+        HTTPException: 
+            404 if not found
+            500 for other errors
+    """
+    try:
+        if await get_campaign(campaign_id) is None:
+            raise HTTPException(status_code=404, detail="Campaign not found")
+        memory = await get_synced_memory(campaign_id)
+        return [{
+            "score": score,
+            "event": event
+        } for score, event in memory.search(q, k)]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error searching campaign memory: {e}")
+
+
 @router.delete("/{campaign_id}")
-def delete_campaign(campaign_id: str):
+async def delete_campaign_route(campaign_id: str):
     """
     Delete a campaign by its ID.
 
+    The campaign's items are deleted in the background; the job's progress
+    is at /api/jobs/{job_id}.
+
     Args:
         campaign_id (str): The ID of the campaign to delete.
 
     Returns:
-        dict: Message indicating deletion status.
+        dict: Message indicating deletion status, and the cascade job's ID.
 
     Raises:
         HTTPException: 
@@ -146,10 +364,11 @@ def delete_campaign(campaign_id: str):
             500 for other errors
     """
     try:
-        deleted = delete_campaign(campaign_id)
+        deleted = await delete_campaign(campaign_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Campaign not found")
-        return {"message": "Campaign deleted"}
+        job = start_cascade_delete("campaign", campaign_id)
+        return {"message": "Campaign deleted", "job_id": job.id}
     except HTTPException:
         raise
     except Exception as e:
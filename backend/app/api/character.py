@@ -1,63 +1,119 @@
 # routes/character.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.db.character import Character, CharacterCreate
-from app.services.character_service import get_character, get_characters_in_campaign, get_characters_in_world, get_characters_at_location, get_characters_of_user, create_character, update_character, delete_character
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from google.cloud.exceptions import NotFound
+from typing import List, Optional
+from app.api.bulk import run_bulk
+from app.api.listing import ListParams, list_params, list_response
+from app.api.mutation import to_mutation
+from app.db.character import Character, CharacterBase, CharacterCreate, CharacterSummary
+from app.db.schemas import BulkWriteResponse, MutationRequest
+from app.services.character_service import get_character, get_characters_in_campaign, stream_characters_in_world, stream_characters_at_location, stream_characters_of_user, create_character, create_characters, update_character, update_characters, mutate_character, flush_character_writes, delete_character, delete_characters
 
 router = APIRouter()
+_list_params = list_params(summary_model=CharacterSummary,
+                           field_model=Character)
+
+
+# Registered before the /{character_id} routes, which would otherwise take
+# "bulk" for a character ID.
+@router.post("/bulk", response_model=BulkWriteResponse)
+async def create_characters_route(characters: List[dict]):
+    return await run_bulk(characters, create_characters, CharacterCreate)
+
+
+@router.put("/bulk", response_model=BulkWriteResponse)
+async def update_characters_route(characters: List[dict]):
+    return await run_bulk(characters, update_characters, Character)
+
+
+@router.post("/bulk/delete", response_model=BulkWriteResponse)
+async def delete_characters_route(character_ids: List[str]):
+    return await run_bulk(character_ids, delete_characters)
+
+
+@router.post("/flush")
+async def flush_character_writes_route(
+        character_ids: Optional[List[str]] = None):
+    # Called at the end of an encounter or session so that other workers
+    # see the buffered updates without waiting for the next flush.
+    written = await flush_character_writes(character_ids)
+    return {"written": written}
 
 
 @router.get("/{character_id}", response_model=Character)
-def read_character(character_id: str):
-    character = get_character(character_id)
+async def read_character(character_id: str):
+    character = await get_character(character_id)
     if character is None:
         raise HTTPException(status_code=404, detail="Character not found")
-    return character
+    return {**character, "id": character_id}
 
 
 @router.get("/users/{user_id}/characters")
-def get_characters_of_user(user_id: str):
-    characters = get_characters_of_user(user_id)
-    return characters
+async def read_characters_of_user(user_id: str,
+                                  response: Response,
+                                  params: ListParams = Depends(_list_params)):
+    rows = stream_characters_of_user(user_id, **params.query())
+    return await list_response(params, response, rows)
 
 
 @router.get("/worlds/{world_id}/characters")
-def get_characters_in_world(world_id: str):
-    characters = get_characters_in_world(world_id)
-    return characters
+async def read_characters_in_world(world_id: str,
+                                   response: Response,
+                                   params: ListParams = Depends(_list_params)):
+    rows = stream_characters_in_world(world_id, **params.query())
+    return await list_response(params, response, rows)
 
 
 @router.get("/locations/{location_id}/characters")
-def get_characters_at_location(location_id: str):
-    characters = get_characters_at_location(location_id)
-    return characters
+async def read_characters_at_location(location_id: str,
+                                      response: Response,
+                                      params: ListParams = Depends(
+                                          _list_params)):
+    rows = stream_characters_at_location(location_id, **params.query())
+    return await list_response(params, response, rows)
 
 
 @router.get("/campaigns/{campaign_id}/characters")
-def get_characters_in_campaign(campaign_id: str):
-    characters = get_characters_in_campaign(campaign_id)
+async def read_characters_in_campaign(campaign_id: str,
+                                      response: Response,
+                                      params: ListParams = Depends(
+                                          _list_params)):
+    characters = await get_characters_in_campaign(campaign_id,
+                                                  **params.page())
     if characters is None:
         raise HTTPException(status_code=404, detail="Campaign not found")
-    return characters
+    if characters.missing_ids:
+        response.headers["X-Missing-Ids"] = ",".join(characters.missing_ids)
+    return await list_response(params, response, characters.documents,
+                               characters.requested_ids)
 
 
 @router.post("/", response_model=str)
-def create_character(character: CharacterCreate):
-    character_id = create_character(character)
+async def create_character_route(character: CharacterCreate):
+    character_id = await create_character(character)
     return character_id
 
 
 @router.put("/{character_id}", response_model=Character)
-def update_character(character_id: str, character: Character):
-    updated_character = update_character(character_id, character)
+async def update_character_route(character_id: str, character: Character):
+    updated_character = await update_character(character_id, character)
     if updated_character is None:
         raise HTTPException(status_code=404, detail="Character not found")
     return updated_character
 
 
+@router.patch("/{character_id}", response_model=Character)
+async def mutate_character_route(character_id: str, body: MutationRequest):
+    mutation = to_mutation(body, CharacterBase)
+    try:
+        return await mutate_character(character_id, mutation)
+    except NotFound:
+        raise HTTPException(status_code=404, detail="Character not found")
+
+
 @router.delete("/{character_id}")
-def delete_character(character_id: str):
-    deleted = delete_character(character_id)
+async def delete_character_route(character_id: str):
+    deleted = await delete_character(character_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Character not found")
     return {"message": "Character deleted"}
@@ -1,23 +1,114 @@
 # routes/item.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from google.cloud.exceptions import NotFound
 from typing import List
-from app.db.item import Item, ItemCreate
+from app.api.bulk import run_bulk
+from app.api.listing import ListParams, list_params, list_response
+from app.api.mutation import to_mutation
+from app.db.item import Item, ItemCreate, ItemSummary
+from app.db.schemas import BulkWriteResponse, MutationRequest
 from app.services.item_service import (
     get_item,
-    get_all_items_of_user,
-    get_items_by_campaign,
-    get_items_by_character,
-    get_items_by_world,
+    stream_items_of_user,
+    stream_items_by_campaign,
+    stream_items_by_character,
+    stream_items_by_world,
     create_item,
+    create_items,
     update_item,
+    update_items,
+    mutate_item,
     delete_item,
+    delete_items,
 )
 
 router = APIRouter()
+_list_params = list_params(Item, ItemSummary)
+
+
+# Registered before the /items/{item_id} routes, which would otherwise take
+# "bulk" for an item ID.
+@router.post("/items/bulk", response_model=BulkWriteResponse)
+async def create_items_route(items: List[dict]):
+    """
+    Create many items at once, e.g. to import a compendium.
+
+    Args:
+        items (List[dict]): The items' data, each validated as an ItemCreate.
+
+    Returns:
+        BulkWriteResponse: The new item IDs in request order, with the
+            entries that were invalid or could not be written in `errors`.
+
+    Raises:
+        HTTPException:
+            413: If there are too many items.
+            500: For other errors.
+    """
+    try:
+        return await run_bulk(items, create_items, ItemCreate)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error creating items: {e}")
+
+
+@router.put("/items/bulk", response_model=BulkWriteResponse)
+async def update_items_route(items: List[dict]):
+    """
+    Update many existing items at once.
+
+    Args:
+        items (List[dict]): The updated items, each validated as an Item and
+            identified by its `id`.
+
+    Returns:
+        BulkWriteResponse: The item IDs in request order, with the entries
+            that were invalid or not found in `errors`.
+
+    Raises:
+        HTTPException:
+            413: If there are too many items.
+            500: For other errors.
+    """
+    try:
+        return await run_bulk(items, update_items, Item)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error updating items: {e}")
+
+
+@router.post("/items/bulk/delete", response_model=BulkWriteResponse)
+async def delete_items_route(item_ids: List[str]):
+    """
+    Delete many items by ID at once.
+
+    Args:
+        item_ids (List[str]): The IDs of the items to delete.
+
+    Returns:
+        BulkWriteResponse: The item IDs, with the deletes that failed in
+            `errors`.
+
+    Raises:
+        HTTPException:
+            413: If there are too many IDs.
+            500: For other errors.
+    """
+    try:
+        return await run_bulk(item_ids, delete_items)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error deleting items: {e}")
 
 
 @router.get("/items/{item_id}", response_model=Item)
-def read_item(item_id: str):
+async def read_item(item_id: str):
     """
     Retrieve an item by its ID.
 
@@ -33,7 +124,7 @@ def read_item(item_id: str):
             500: For other errors.
     """
     try:
-        item = get_item(item_id)
+        item = await get_item(item_id)
         if item is None:
             raise HTTPException(status_code=404, detail="Item not found")
         return item
@@ -45,12 +136,16 @@ def read_item(item_id: str):
 
 
 @router.get("/items/user/{user_id}", response_model=List[Item])
-def read_items_by_user(user_id: str):
+async def read_items_by_user(user_id: str,
+                             response: Response,
+                             params: ListParams = Depends(_list_params)):
     """
     Retrieve all items for a specific user.
 
     Args:
         user_id (str): The user's ID.
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
 
     Returns:
         List[Item]: List of item objects.
@@ -60,20 +155,24 @@ def read_items_by_user(user_id: str):
             500: For other errors.
     """
     try:
-        items = get_all_items_of_user(user_id)
-        return items
+        rows = stream_items_of_user(user_id, **params.query())
+        return await list_response(params, response, rows)
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Error retrieving items for user: {e}")
 
 
 @router.get("/items/campaign/{campaign_id}", response_model=List[Item])
-def read_items_by_campaign(campaign_id: str):
+async def read_items_by_campaign(campaign_id: str,
+                                 response: Response,
+                                 params: ListParams = Depends(_list_params)):
     """
     Retrieve all items for a specific campaign.
 
     Args:
         campaign_id (str): The campaign's ID.
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
 
     Returns:
         List[Item]: List of item objects.
@@ -83,20 +182,24 @@ def read_items_by_campaign(campaign_id: str):
             500: For other errors.
     """
     try:
-        items = get_items_by_campaign(campaign_id)
-        return items
+        rows = stream_items_by_campaign(campaign_id, **params.query())
+        return await list_response(params, response, rows)
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Error retrieving items for campaign: {e}")
 
 
 @router.get("/items/character/{character_id}", response_model=List[Item])
-def read_items_by_character(character_id: str):
+async def read_items_by_character(character_id: str,
+                                  response: Response,
+                                  params: ListParams = Depends(_list_params)):
     """
     Retrieve all items for a specific character.
 
     Args:
         character_id (str): The character's ID.
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
 
     Returns:
         List[Item]: List of item objects.
@@ -106,8 +209,8 @@ def read_items_by_character(character_id: str):
             500: For other errors.
     """
     try:
-        items = get_items_by_character(character_id)
-        return items
+        rows = stream_items_by_character(character_id, **params.query())
+        return await list_response(params, response, rows)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -115,12 +218,16 @@ def read_items_by_character(character_id: str):
 
 
 @router.get("/items/world/{world_id}", response_model=List[Item])
-def read_items_by_world(world_id: str):
+async def read_items_by_world(world_id: str,
+                              response: Response,
+                              params: ListParams = Depends(_list_params)):
     """
     Retrieve all items for a specific world.
 
     Args:
         world_id (str): The world's ID.
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
 
     Returns:
         List[Item]: List of item objects.
@@ -130,15 +237,15 @@ def read_items_by_world(world_id: str):
             500: For other errors.
     """
     try:
-        items = get_items_by_world(world_id)
-        return items
+        rows = stream_items_by_world(world_id, **params.query())
+        return await list_response(params, response, rows)
     except Exception as e:
         raise HTTPException(status_code=500,
                             detail=f"Error retrieving items for world: {e}")
 
 
 @router.post("/items/", response_model=str)
-def create_item_route(item: ItemCreate):
+async def create_item_route(item: ItemCreate):
     """
     Create a new item.
 
@@ -153,7 +260,7 @@ def create_item_route(item: ItemCreate):
             500: For other errors.
     """
     try:
-        item_id = create_item(item)
+        item_id = await create_item(item)
         return item_id
     except Exception as e:
         raise HTTPException(status_code=500,
@@ -161,7 +268,7 @@ def create_item_route(item: ItemCreate):
 
 
 @router.put("/items/{item_id}", response_model=Item)
-def update_item_route(item_id: str, item: Item):
+async def update_item_route(item_id: str, item: Item):
     """
     Update an existing item.
 
@@ -178,7 +285,7 @@ def update_item_route(item_id: str, item: Item):
             500: For other errors.
     """
     try:
-        updated_item = update_item(item_id, item)
+        updated_item = await update_item(item_id, item)
         if updated_item is None:
             raise HTTPException(status_code=404, detail="Item not found")
         return updated_item
@@ -189,8 +296,38 @@ def update_item_route(item_id: str, item: Item):
                             detail=f"Error updating item: {e}")
 
 
+@router.patch("/items/{item_id}", response_model=Item)
+async def mutate_item_route(item_id: str, body: MutationRequest):
+    """
+    Change fields of an item without sending the whole item: set fields,
+    add to or remove from arrays and increment numbers, in one atomic write.
+
+    Args:
+        item_id (str): The ID of the item to change.
+        body (MutationRequest): The field changes.
+
+    Returns:
+        Item: The updated item object.
+
+    Raises:
+        HTTPException: 
+            404: If not found
+            422: For an invalid change
+            500: For other errors.
+    """
+    try:
+        return await mutate_item(item_id, to_mutation(body, Item))
+    except HTTPException:
+        raise
+    except NotFound:
+        raise HTTPException(status_code=404, detail="Item not found")
+    except Exception as e:
+        raise HTTPException(status_code=500,
+                            detail=f"Error changing item: {e}")
+
+
 @router.delete("/items/{item_id}")
-def delete_item_route(item_id: str):
+async def delete_item_route(item_id: str):
     """
     Delete an item by its ID.
 
@@ -206,7 +343,7 @@ def delete_item_route(item_id: str):
             500: For other errors.
     """
     try:
-        deleted = delete_item(item_id)
+        deleted = await delete_item(item_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="Item not found")
         return {"message": "Item deleted"}
@@ -0,0 +1,28 @@
+# routes/jobs.py
+from fastapi import APIRouter, HTTPException
+from app.services.cascade_delete import get_cascade_job
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+def read_job(job_id: str):
+    """
+    Retrieve the progress of a background cascade delete.
+
+    Args:
+        job_id (str): The job ID returned by the world or campaign delete.
+
+    Returns:
+        dict: The job's status ("pending", "running", "completed", "failed"
+            or "cancelled"), the number of documents deleted and failed per
+            collection, and the first errors.
+
+    Raises:
+        HTTPException:
+            404 if the job is unknown or its record has expired
+    """
+    job = get_cascade_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
@@ -0,0 +1,245 @@
+# routes/listing.py
+import json
+import re
+from typing import (AsyncIterable, Iterable, List, Literal, Optional, Type,
+                    Union)
+from fastapi import HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from app.core.responses import json_response_class
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# `fields=summary` selects the fields of the route's summary model.
+SUMMARY_FIELDS = "summary"
+
+ListFormat = Literal["json", "ndjson"]
+
+_FIELD_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class ListParams:
+    """
+    Query parameters shared by the list routes: cursor paging, field
+    projection and the response format, plus the model rows are validated
+    against.
+    """
+
+    def __init__(self,
+                 limit: Optional[int] = None,
+                 start_after: Optional[str] = None,
+                 format: ListFormat = "json",
+                 fields: Optional[List[str]] = None,
+                 row_model: Optional[Type[BaseModel]] = None):
+        self.limit = limit
+        self.start_after = start_after
+        self.format = format
+        # Top-level fields to return besides the ID; None for whole
+        # documents.
+        self.fields = fields
+        self.row_model = row_model
+
+    def page(self) -> dict:
+        """
+        The paging arguments, for passing on to a service function.
+        """
+        return {"limit": self.limit, "start_after": self.start_after}
+
+    def query(self) -> dict:
+        """
+        The paging and projection arguments, for passing on to a service
+        stream function.
+        """
+        return {**self.page(), "fields": self.fields}
+
+
+def _parse_fields(fields: Optional[str],
+                  field_model: Optional[Type[BaseModel]],
+                  summary_model: Optional[Type[BaseModel]]
+                  ) -> Optional[List[str]]:
+    if not fields:
+        return None
+    if fields == SUMMARY_FIELDS:
+        if summary_model is None:
+            raise HTTPException(status_code=422,
+                                detail="This list has no summary view")
+        return [name for name in summary_model.model_fields if name != "id"]
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    invalid = [name for name in names if not _FIELD_RE.match(name)]
+    if invalid:
+        raise HTTPException(status_code=422,
+                            detail=f"Invalid field names: {invalid}")
+    if field_model is not None:
+        unknown = [name for name in names
+                   if name != "id" and name not in field_model.model_fields]
+        if unknown:
+            raise HTTPException(status_code=422,
+                                detail=f"Unknown fields: {unknown}")
+    return list(dict.fromkeys(name for name in names if name != "id"))
+
+
+def list_params(model: Optional[Type[BaseModel]] = None,
+                summary_model: Optional[Type[BaseModel]] = None,
+                field_model: Optional[Type[BaseModel]] = None):
+    """
+    Build the dependency that parses a list route's query parameters.
+
+    Args:
+        model: The full row model, used to validate streamed rows (JSON
+            pages are validated by the route's response_model).
+        summary_model: The model selected by `fields=summary`.
+        field_model: The model whose fields `fields` may name; defaults to
+            `model`. Other names are rejected with 422.
+    """
+    field_model = field_model or model
+
+    def dependency(
+        limit: Optional[int] = Query(
+            None, ge=1, le=MAX_PAGE_SIZE,
+            description="Maximum number of results."),
+        start_after: Optional[str] = Query(
+            None,
+            description="ID of the last result of the previous page, as "
+            f"returned in the {NEXT_CURSOR_HEADER} header."),
+        format: ListFormat = Query(
+            "json",
+            description="'json' for one array, 'ndjson' to stream one JSON "
+            "object per line."),
+        fields: Optional[str] = Query(
+            None,
+            description="Comma-separated top-level fields to return, or "
+            f"'{SUMMARY_FIELDS}' for the lightweight summary view. The ID "
+            "is always returned."),
+    ) -> ListParams:
+        selected = _parse_fields(fields, field_model, summary_model)
+        if fields == SUMMARY_FIELDS:
+            row_model = summary_model
+        else:
+            row_model = model if selected is None else None
+        return ListParams(limit=limit,
+                          start_after=start_after,
+                          format=format,
+                          fields=selected,
+                          row_model=row_model)
+
+    return dependency
+
+
+def _row_id(row) -> Optional[str]:
+    if isinstance(row, str):
+        return row
+    return row.get("id") if isinstance(row, dict) else getattr(
+        row, "id", None)
+
+
+def _next_cursor(rows: list, limit: Optional[int]) -> Optional[str]:
+    if limit and rows and len(rows) >= limit:
+        return _row_id(rows[-1])
+    return None
+
+
+def set_next_cursor(response: Response, rows: list,
+                    limit: Optional[int]) -> None:
+    """
+    Set the cursor for the next page when the page came back full.
+    `rows` are the page's results or, for lists resolved from stored IDs,
+    the IDs that were requested.
+    """
+    cursor = _next_cursor(rows, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+
+
+def project(row: dict, fields: Optional[List[str]]) -> dict:
+    """
+    Keep only `fields` and the ID of a document that is already in memory.
+    """
+    if fields is None:
+        return row
+    projected = {name: row[name] for name in fields if name in row}
+    projected["id"] = row.get("id")
+    return projected
+
+
+def _encode_row(row, model: Optional[Type[BaseModel]]) -> str:
+    if model is not None:
+        return model.model_validate(row).model_dump_json()
+    return json.dumps(jsonable_encoder(row))
+
+
+def ndjson_response(rows: Union[AsyncIterable, Iterable],
+                    model: Optional[Type[BaseModel]] = None
+                    ) -> StreamingResponse:
+    """
+    Stream `rows` as newline-delimited JSON, serializing one row at a time
+    so memory use does not grow with the result size.
+
+    Rows are validated against `model` when given, like the JSON routes'
+    response_model. An error after streaming has started is reported as a
+    final {"error": ...} line.
+    """
+
+    async def body():
+        try:
+            if hasattr(rows, "__aiter__"):
+                async for row in rows:
+                    yield _encode_row(row, model) + "\n"
+            else:
+                for row in rows:
+                    yield _encode_row(row, model) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
+async def list_response(params: ListParams,
+                        response: Response,
+                        rows: Union[AsyncIterable, list],
+                        cursor_rows: Optional[list] = None):
+    """
+    Serve one page of a list route in the requested format and view.
+
+    Args:
+        params (ListParams): The parsed list parameters.
+        response (Response): The route's response, for the cursor header.
+        rows: Either an async iterator of rows the query already projected
+            (a service stream function called with `params.query()`), or a
+            list of whole documents, which is projected here.
+        cursor_rows (list, optional): What the next-page cursor is taken
+            from when it is not the rows themselves, e.g. the requested IDs.
+
+    Returns:
+        The list of rows for whole documents, so the route's response_model
+        validates them; otherwise a finished JSON or NDJSON response, since
+        projected rows would not pass the full model.
+    """
+    if isinstance(rows, list):
+        rows = [project(row, params.fields) for row in rows]
+    if params.format == "ndjson":
+        streamed = ndjson_response(rows, params.row_model)
+        # Headers set on `response` (e.g. X-Missing-Ids) are not sent when
+        # a route returns its own Response.
+        streamed.headers.update(response.headers)
+        return streamed
+    if not isinstance(rows, list):
+        rows = [row async for row in rows]
+    cursor = _next_cursor(rows if cursor_rows is None else cursor_rows,
+                          params.limit)
+    if params.fields is None:
+        if cursor:
+            response.headers[NEXT_CURSOR_HEADER] = cursor
+        return rows
+    if params.row_model is not None:
+        content = [
+            params.row_model.model_validate(row).model_dump(mode="json")
+            for row in rows
+        ]
+    else:
+        content = jsonable_encoder(rows)
+    projected = json_response_class()(content,
+                                      headers=dict(response.headers))
+    if cursor:
+        projected.headers[NEXT_CURSOR_HEADER] = cursor
+    return projected
@@ -0,0 +1,16 @@
+# routes/metrics.py
+from fastapi import APIRouter
+from app.core import metrics
+
+router = APIRouter()
+
+
+@router.get("/")
+def read_metrics():
+    """
+    Retrieve the in-process service metrics.
+
+    Returns:
+        dict: Counters and histograms collected since the worker started.
+    """
+    return metrics.snapshot()
@@ -0,0 +1,113 @@
+# routes/mutation.py
+from types import NoneType, UnionType
+from typing import (Any, Collection, List, Type, Union, get_args,
+                    get_origin)
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from app.api.bulk import validation_message
+from app.db.schemas import MutationRequest
+from app.repository import Mutation
+
+
+def _optional_type(annotation: Any) -> Any:
+    # Optional[X] (or X | None) -> X
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _is_model(annotation: Any) -> bool:
+    return isinstance(annotation, type) and issubclass(annotation, BaseModel)
+
+
+def _path_type(model: Type[BaseModel], path: str,
+               read_only: Collection[str]) -> Any:
+    # The annotation of the field a path addresses. Paths may only descend
+    # into maps (dict fields) and required nested models; anything else
+    # would turn a scalar or array into a map, or create a partial model
+    # in place of a missing optional one, and break the document.
+    name, *rest = path.split(".")
+    if name not in model.model_fields or name in read_only:
+        raise HTTPException(status_code=422,
+                            detail=f"Field cannot be changed: {path}")
+    annotation = model.model_fields[name].annotation
+    for segment in rest:
+        container = _optional_type(annotation)
+        if (_is_model(container) and container is annotation
+                and segment in container.model_fields):
+            annotation = container.model_fields[segment].annotation
+        elif container is dict or container is Any:
+            annotation = Any
+        elif get_origin(container) is dict:
+            annotation = get_args(container)[1]
+        else:
+            raise HTTPException(status_code=422,
+                                detail=f"Field cannot be changed: {path}")
+    return annotation
+
+
+def _check_value(path: str, annotation: Any, value: Any) -> Any:
+    adapter = TypeAdapter(annotation)
+    try:
+        return adapter.dump_python(adapter.validate_python(value),
+                                   mode="python")
+    except ValidationError as e:
+        raise HTTPException(status_code=422,
+                            detail=f"{path}: {validation_message(e)}")
+
+
+def _check_elements(path: str, annotation: Any, values: List[Any]) -> Any:
+    annotation = _optional_type(annotation)
+    if annotation is not Any and annotation is not list and get_origin(
+            annotation) is not list:
+        raise HTTPException(status_code=422,
+                            detail=f"Field is not an array: {path}")
+    return _check_value(path, annotation, values)
+
+
+def _check_amount(path: str, annotation: Any, amount: Any) -> Any:
+    annotation = _optional_type(annotation)
+    if annotation not in (int, float):
+        raise HTTPException(status_code=422,
+                            detail=f"Field is not a number: {path}")
+    return _check_value(path, annotation, amount)
+
+
+def to_mutation(body: MutationRequest,
+                model: Type[BaseModel],
+                read_only: Collection[str] = ("id",)) -> Mutation:
+    """
+    Check a PATCH body against the document model and build the Mutation.
+
+    Every path must start at a field of `model` other than `read_only` and
+    may only continue into maps and required nested models. Values are validated
+    against the type of the field the path ends at: the value of `set`,
+    the elements of `add`/`remove` (array fields only) and the amount of
+    `increment` (int and float fields only).
+
+    Raises:
+        HTTPException: 422 if the body is empty, changes a field twice or
+            does not fit the model.
+    """
+    mutation = Mutation(set=dict(body.set),
+                        add=dict(body.add),
+                        remove=dict(body.remove),
+                        increment=dict(body.increment))
+    try:
+        mutation.check()
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    types = {path: _path_type(model, path, read_only)
+             for path in mutation.paths()}
+    for path in list(mutation.set):
+        mutation.set[path] = _check_value(path, types[path],
+                                          mutation.set[path])
+    for changes in (mutation.add, mutation.remove):
+        for path in list(changes):
+            changes[path] = _check_elements(path, types[path], changes[path])
+    for path in list(mutation.increment):
+        mutation.increment[path] = _check_amount(path, types[path],
+                                                 mutation.increment[path])
+    return mutation
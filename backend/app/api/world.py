@@ -1,19 +1,110 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from google.cloud.exceptions import NotFound
 from typing import List
-from app.db.world import World, WorldCreate, WorldUpdate
+from app.api.bulk import run_bulk
+from app.api.listing import ListParams, list_params, list_response
+from app.api.mutation import to_mutation
+from app.repository import Mutation, page_ids
+from app.db.world import World, WorldBase, WorldBulkUpdate, WorldCreate, WorldSummary, WorldUpdate
+from app.db.schemas import BulkDeleteResponse, BulkWriteResponse, MutationRequest
+from app.db.item import Item, ItemSummary
 from app.services.world_service import (
     get_world,
-    get_all_worlds_of_user,
+    stream_worlds_of_user,
     create_world,
+    create_worlds,
     update_world,
+    update_worlds,
+    mutate_world,
     delete_world,
+    delete_worlds,
 )
-from app.services.item_service import get_item
+from app.services.item_service import get_item, get_items_by_ids
+from app.services.cascade_delete import start_cascade_delete
 
 router = APIRouter()
+_world_list_params = list_params(World, WorldSummary)
+_item_list_params = list_params(Item, ItemSummary)
+
+# The bulk routes are registered before the /{world_id} routes, which would
+# otherwise take "bulk" for a world ID.
+@router.post("/bulk", response_model=BulkWriteResponse)
+async def create_worlds_route(worlds: List[dict]):
+    """
+    Create many worlds at once.
+
+    Args:
+        worlds (List[dict]): The worlds' data, each validated as a WorldCreate.
+
+    Returns:
+        BulkWriteResponse: The new world IDs in request order, with the
+            entries that were invalid or could not be written in `errors`.
+
+    Raises:
+        HTTPException: 413 if there are too many worlds, 500 for other errors.
+    """
+    try:
+        return await run_bulk(worlds, create_worlds, WorldCreate)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating worlds: {e}")
+
+@router.put("/bulk", response_model=BulkWriteResponse)
+async def update_worlds_route(worlds: List[dict]):
+    """
+    Update many existing worlds at once.
+
+    Args:
+        worlds (List[dict]): The updates, each validated as a WorldUpdate
+            plus the `id` of the world it applies to.
+
+    Returns:
+        BulkWriteResponse: The world IDs in request order, with the
+            entries that were invalid or not found in `errors`.
+
+    Raises:
+        HTTPException: 413 if there are too many worlds, 500 for other errors.
+    """
+    try:
+        return await run_bulk(worlds, update_worlds, WorldBulkUpdate)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error updating worlds: {e}")
+
+@router.post("/bulk/delete", response_model=BulkDeleteResponse)
+async def delete_worlds_route(world_ids: List[str]):
+    """
+    Delete many worlds by ID at once.
+
+    Like a single delete, each deleted world's items and characters are
+    deleted in the background, one job per world.
+
+    Args:
+        world_ids (List[str]): The IDs of the worlds to delete.
+
+    Returns:
+        BulkDeleteResponse: The world IDs, with the deletes that failed in
+            `errors`, and the cascade job of each deleted world.
+
+    Raises:
+        HTTPException: 413 if there are too many IDs, 500 for other errors.
+    """
+    try:
+        result = await run_bulk(world_ids, delete_worlds)
+        job_ids = [
+            start_cascade_delete("world", world_id).id if world_id else None
+            for world_id in result.ids
+        ]
+        return BulkDeleteResponse(**result.model_dump(), job_ids=job_ids)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error deleting worlds: {e}")
 
 @router.get("/{world_id}", response_model=World)
-def read_world(world_id: str):
+async def read_world(world_id: str):
     """
     Retrieve a world by its ID.
 
@@ -27,7 +118,7 @@ def read_world(world_id: str):
         HTTPException: 404 if not found, 500 for other errors.
     """
     try:
-        world = get_world(world_id)
+        world = await get_world(world_id)
         if world is None:
             raise HTTPException(status_code=404, detail="World not found")
         return world
@@ -37,12 +128,17 @@ def read_world(world_id: str):
         raise HTTPException(status_code=500, detail=f"Error retrieving world: {e}")
 
 @router.get("/user/{user_id}", response_model=List[World])
-def read_worlds_by_user(user_id: str):
+async def read_worlds_by_user(user_id: str,
+                              response: Response,
+                              params: ListParams = Depends(
+                                  _world_list_params)):
     """
     Retrieve all worlds for a specific user.
 
     Args:
         user_id (str): The user's ID.
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
 
     Returns:
         List[World]: List of world objects.
@@ -51,13 +147,13 @@ def read_worlds_by_user(user_id: str):
         HTTPException: 500 for errors.
     """
     try:
-        worlds = get_all_worlds_of_user(user_id)
-        return worlds
+        rows = stream_worlds_of_user(user_id, **params.query())
+        return await list_response(params, response, rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving worlds for user: {e}")
 
 @router.post("/", response_model=str)
-def create_world_route(world: WorldCreate):
+async def create_world_route(world: WorldCreate):
     """
     Create a new world.
 
@@ -71,13 +167,13 @@ def create_world_route(world: WorldCreate):
         HTTPException: 500 for errors.
     """
     try:
-        world_id = create_world(world)
+        world_id = await create_world(world)
         return world_id
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating world: {e}")
 
 @router.put("/{world_id}", response_model=World)
-def update_world_route(world_id: str, world_update: WorldUpdate):
+async def update_world_route(world_id: str, world_update: WorldUpdate):
     """
     Update an existing world.
 
@@ -92,7 +188,7 @@ def update_world_route(world_id: str, world_update: WorldUpdate):
         HTTPException: 404 if not found, 500 for other errors.
     """
     try:
-        updated_world = update_world(world_id, world_update)
+        updated_world = await update_world(world_id, world_update)
         if updated_world is None:
             raise HTTPException(status_code=404, detail="World not found")
         return updated_world
@@ -101,11 +197,41 @@ def update_world_route(world_id: str, world_update: WorldUpdate):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating world: {e}")
 
+@router.patch("/{world_id}", response_model=World)
+async def mutate_world_route(world_id: str, body: MutationRequest):
+    """
+    Change fields of a world without sending the whole world: set fields,
+    add to or remove from arrays and increment numbers, in one atomic write.
+
+    Args:
+        world_id (str): The ID of the world to change.
+        body (MutationRequest): The field changes.
+
+    Returns:
+        World: The updated world object.
+
+    Raises:
+        HTTPException: 404 if not found, 422 for an invalid change, 500 for
+            other errors.
+    """
+    try:
+        return await mutate_world(world_id, to_mutation(body, WorldBase))
+    except HTTPException:
+        raise
+    except NotFound:
+        raise HTTPException(status_code=404, detail="World not found")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error changing world: {e}")
+
 @router.put("/{world_id}/items/{item_id}")
-def add_item_to_world(world_id: str, item_id: str):
+async def add_item_to_world(world_id: str, item_id: str):
     """
     Add an item to a world.
 
+    The item ID is added to the world's item_ids with a single array-union
+    write, so concurrent additions are all kept and adding it twice has no
+    effect.
+
     Args:
         world_id (str): The ID of the world.
         item_id (str): The ID of the item.
@@ -117,43 +243,77 @@ def add_item_to_world(world_id: str, item_id: str):
         HTTPException: 404 if world or item not found, 500 for other errors.
     """
     try:
-        world = get_world(world_id)
-        if world is None:
-            raise HTTPException(status_code=404, detail="World not found")
-        item = get_item(item_id)
+        item = await get_item(item_id)
         if item is None:
             raise HTTPException(status_code=404, detail="Item not found")
-        # Add item_id to world['item_ids'] (create if not present)
-        item_ids = world.get("item_ids", [])
-        if item_id not in item_ids:
-            item_ids.append(item_id)
-        world["item_ids"] = item_ids
-        update_world(world_id, WorldUpdate(**world))
+        await mutate_world(world_id, Mutation(add={"item_ids": [item_id]}))
         return {"message": "Item added to world"}
     except HTTPException:
         raise
+    except NotFound:
+        raise HTTPException(status_code=404, detail="World not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error adding item to world: {e}")
 
+@router.get("/{world_id}/items", response_model=List[Item])
+async def read_world_items(world_id: str,
+                           response: Response,
+                           params: ListParams = Depends(_item_list_params)):
+    """
+    Retrieve the items listed in a world's item_ids, in that order.
+
+    IDs whose item no longer exists are skipped and listed in the
+    X-Missing-Ids response header.
+
+    Args:
+        world_id (str): The ID of the world.
+        params (ListParams): Paging (limit, start_after), fields and
+            format.
+
+    Returns:
+        List[Item]: The world's items.
+
+    Raises:
+        HTTPException: 404 if the world is not found, 500 for other errors.
+    """
+    try:
+        world = await get_world(world_id)
+        if world is None:
+            raise HTTPException(status_code=404, detail="World not found")
+        item_ids = page_ids(world.get("item_ids") or [], **params.page())
+        items = await get_items_by_ids(item_ids)
+        if items.missing_ids:
+            response.headers["X-Missing-Ids"] = ",".join(items.missing_ids)
+        return await list_response(params, response, items.documents,
+                                   items.requested_ids)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving world items: {e}")
+
 @router.delete("/{world_id}")
-def delete_world_route(world_id: str):
+async def delete_world_route(world_id: str):
     """
     Delete a world by its ID.
 
+    The world's items and characters are deleted in the background; the
+    job's progress is at /api/jobs/{job_id}.
+
     Args:
         world_id (str): The ID of the world to delete.
 
     Returns:
-        dict: Message indicating deletion status.
+        dict: Message indicating deletion status, and the cascade job's ID.
 
     Raises:
         HTTPException: 404 if not found, 500 for other errors.
     """
     try:
-        deleted = delete_world(world_id)
+        deleted = await delete_world(world_id)
         if not deleted:
             raise HTTPException(status_code=404, detail="World not found")
-        return {"message": "World deleted"}
+        job = start_cascade_delete("world", world_id)
+        return {"message": "World deleted", "job_id": job.id}
     except HTTPException:
         raise
     except Exception as e:
@@ -0,0 +1,128 @@
+# core/compression.py
+import gzip
+from typing import Dict, Optional
+from app.core.etag import STREAMING_TYPES, header_value
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Bodies of these types are compressed; streamed types are left alone so
+# each line or event still reaches the client as it is produced.
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def _accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    # "br;q=1.0, gzip;q=0.5, *;q=0" -> {"br": 1.0, "gzip": 0.5, "*": 0.0}
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    The encoding to compress with for an Accept-Encoding header value:
+    "br" when brotli is installed and accepted, else "gzip" if accepted,
+    else None.
+    """
+    accepted = _accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    candidates = [(accepted.get(coding, wildcard), coding)
+                  for coding in available]
+    quality, coding = max(candidates, key=lambda candidate: candidate[0])
+    return coding if quality > 0 else None
+
+
+class CompressionMiddleware:
+    """
+    Compress complete JSON and text responses of at least `minimum_size`
+    bytes with brotli or gzip, whichever the client prefers and is
+    available.
+
+    Smaller bodies are sent as they are, since the encoding overhead and CPU
+    time outweigh the bytes saved. Bodies are compressed after the ETag is
+    computed, so every encoding of a response shares its (weak) tag.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 1,
+                 brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        """
+        Compress `body` with "br" or "gzip".
+        """
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = dict(scope["headers"]).get(b"accept-encoding",
+                                                     b"")
+        encoding = choose_encoding(accept_encoding.decode("latin-1"))
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if message["status"] == 304:
+                    # Repeats the Vary of the response it stands for.
+                    passthrough = True
+                    headers.append((b"vary", b"Accept-Encoding"))
+                    await send({**message, "headers": headers})
+                    return
+                content_type = (header_value(headers, b"content-type")
+                                or b"").decode("latin-1")
+                if (header_value(headers, b"content-encoding") is not None
+                        or content_type.startswith(STREAMING_TYPES)
+                        or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = {**message, "headers": headers}
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            headers = start["headers"]
+            if len(body) >= self.minimum_size:
+                # Caches must keep the encodings of this URL apart.
+                headers.append((b"vary", b"Accept-Encoding"))
+                if encoding is not None:
+                    body = self.compress(body, encoding)
+                    headers[:] = [(key, value) for key, value in headers
+                                  if key.lower() != b"content-length"]
+                    headers.append((b"content-encoding",
+                                    encoding.encode("latin-1")))
+                    headers.append((b"content-length",
+                                    str(len(body)).encode("latin-1")))
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
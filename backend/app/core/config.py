@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Literal
+from typing import Literal, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -27,6 +27,70 @@ class Settings(BaseSettings):
     MODEL_NAME: str
     HF_API_KEY: str
     PROVIDER: str
+    # Model response cache
+    AI_CACHE_ENABLED: bool = True
+    AI_CACHE_MAX_ENTRIES: int = 1024
+    AI_CACHE_TTL_SECONDS: int = 3600
+    AI_CACHE_DISK_PATH: Optional[str] = None
+    AI_CACHE_DISK_MAX_ENTRIES: int = 10000
+    # Model call scheduling
+    AI_MAX_CONCURRENCY: int = 8
+    AI_MAX_QUEUE_DEPTH: int = 64
+    AI_MAX_QUEUE_PER_KEY: int = 8
+    # Conversation context
+    AI_CONTEXT_TOKEN_BUDGET: int = 3000
+    AI_SUMMARY_TOKEN_BUDGET: int = 400
+    TOKENIZER_NAME: Optional[str] = None  # defaults to MODEL_NAME
+    AI_LORE_TOKEN_BUDGET: int = 600
+    AI_LORE_TOP_K: int = 8
+    # Campaign long-term memory
+    CAMPAIGN_MEMORY_DIR: Optional[str] = "data/campaign_memory"
+    CAMPAIGN_MEMORY_DIM: int = 512
+    CAMPAIGN_MEMORY_MAX_LOADED: int = 256
+    AI_MEMORY_TOP_K: int = 5
+    AI_MEMORY_TOKEN_BUDGET: int = 400
+    # Campaign event log: new events are buffered and written in batches
+    # once this many are pending or the oldest has waited this long.
+    CAMPAIGN_EVENT_FLUSH_EVENTS: int = 100
+    CAMPAIGN_EVENT_FLUSH_MS: int = 250
+    # New events are refused (503) while this many wait to be written,
+    # e.g. during a database outage.
+    CAMPAIGN_EVENT_MAX_PENDING: int = 10000
+    # Character updates are merged in memory and written together at most
+    # this long after the first one; 0 writes each update at once.
+    CHARACTER_WRITE_FLUSH_MS: int = 1000
+    # Where documents are stored: "firestore", "memory" (nothing persisted)
+    # or "sqlite" (a local database file at SQLITE_PATH)
+    REPOSITORY_BACKEND: Literal["firestore", "memory", "sqlite"] = "firestore"
+    SQLITE_PATH: str = "data/app.db"
+    # Read-through cache of worlds, items, campaigns and characters
+    ENTITY_CACHE_ENABLED: bool = True
+    ENTITY_CACHE_MAX_ENTRIES: int = 2048
+    ENTITY_CACHE_TTL_SECONDS: int = 300
+    # Also drop entries on Firestore change events. Off by default: each
+    # worker then listens to the whole of every cached collection, which
+    # reads (and bills) every document once at startup and streams every
+    # change in the project to every worker. Without it, writes by other
+    # processes show up within ENTITY_CACHE_TTL_SECONDS.
+    ENTITY_CACHE_LISTEN: bool = False
+    # Create the Firestore and model clients at startup rather than on the
+    # first request that needs them.
+    WARM_UP_CLIENTS: bool = True
+    # Bulk create/update/delete endpoints
+    BULK_WRITE_MAX_DOCUMENTS: int = 5000  # per request
+    BULK_WRITE_CONCURRENCY: int = 4  # batched writes in flight at once
+    # Background deletes of a deleted world's or campaign's dependents
+    CASCADE_JOB_MAX_ENTRIES: int = 1024
+    CASCADE_JOB_TTL_SECONDS: int = 86400  # how long job progress is kept
+    # Serialize JSON responses with orjson instead of the standard library
+    FAST_JSON_RESPONSES: bool = False
+    # Compress responses of at least this many bytes with brotli (when
+    # installed and accepted) or gzip; 0 turns compression off. Fast levels
+    # keep most of the savings on JSON at a fraction of the CPU time (see
+    # benchmarks/response_serialization.py).
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    GZIP_COMPRESS_LEVEL: int = 1
+    BROTLI_QUALITY: int = 4
 
     GOOGLE_CLIENT_ID: str
     GOOGLE_CLIENT_SECRET: str
@@ -0,0 +1,110 @@
+# core/etag.py
+import hashlib
+from typing import List, Optional
+
+# Responses of these types are streamed, so they are passed through as
+# they are produced rather than buffered and hashed.
+STREAMING_TYPES = ("application/x-ndjson", "text/event-stream")
+
+# Headers describing the body, which a 304 response leaves out; the rest
+# (ETag, Cache-Control, CORS headers, ...) are repeated from the 200.
+_BODY_HEADERS = (b"content-type", b"content-length", b"content-encoding")
+
+
+def body_etag(body: bytes) -> str:
+    """
+    An entity tag for a response body. It is weak, as the same JSON may be
+    sent with different content encodings.
+    """
+    return 'W/"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _opaque(tag: str) -> str:
+    # If-None-Match uses the weak comparison: W/"x" matches "x".
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Whether an If-None-Match header value matches `etag`.
+    """
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return _opaque(etag) in (_opaque(tag) for tag in tags if tag)
+
+
+def header_value(headers: List[tuple], name: bytes) -> Optional[bytes]:
+    """
+    The value of header `name` (lower case) in an ASGI header list.
+    """
+    return next((value for key, value in headers if key.lower() == name),
+                None)
+
+
+class ETagMiddleware:
+    """
+    Conditional GETs for the API: every complete 200 response to a GET gets
+    an ETag, the hash of its body, and a request whose If-None-Match holds
+    that tag is answered with 304 Not Modified and no body.
+
+    Hashing the body gives documents, lists, projections and expanded views
+    a tag that changes exactly when what the client would receive changes.
+    The route still runs, so a 304 saves the transfer, not the read.
+    Responses without a `Cache-Control` header get "no-cache", so clients
+    revalidate instead of reusing a copy unchecked.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        request_headers = dict(scope["headers"])
+        if_none_match = request_headers.get(b"if-none-match")
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                content_type = (header_value(headers, b"content-type")
+                                or b"").decode("latin-1")
+                if (message["status"] != 200
+                        or header_value(headers, b"etag") is not None
+                        or content_type.startswith(STREAMING_TYPES)):
+                    passthrough = True
+                    await send(message)
+                    return
+                start = {**message, "headers": headers}
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            etag = body_etag(body)
+            headers = start["headers"]
+            headers.append((b"etag", etag.encode("latin-1")))
+            if header_value(headers, b"cache-control") is None:
+                headers.append((b"cache-control", b"no-cache"))
+            if if_none_match is not None and etag_matches(
+                    if_none_match.decode("latin-1"), etag):
+                await send({
+                    "type": "http.response.start",
+                    "status": 304,
+                    "headers": [(key, value) for key, value in headers
+                                if key.lower() not in _BODY_HEADERS],
+                })
+                await send({"type": "http.response.body", "body": b""})
+                return
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,26 +1,368 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 from app.core.config import get_settings
+from app.repository.base import (  # noqa: F401 (re-exported)
+    BulkWriteResult,
+    MultiGetResult,
+    Mutation,
+    apply_mutation,
+    page_ids,
+    unique_ids,
+)
 
 settings = get_settings()
 
-firebase_app = None
-firebase_db = None
+_lock = threading.Lock()
+_firebase_app = None
+_firestore_client = None
+_async_firestore_client = None
 
-if not firebase_admin._apps:
-    cred = credentials.Certificate(settings.FIREBASE_CREDENTIALS_PATH)
-    firebase_admin.initialize_app(cred)
-    firebase_db = firestore.client()
-else:
-    firebase_app = firebase_admin.get_app()
-    firebase_db = firestore.client(firebase_app)
+# Document references sent per get_all (BatchGetDocuments) call.
+GET_ALL_CHUNK_SIZE = 100
+# Firestore accepts at most 500 writes in one batched write.
+WRITE_BATCH_SIZE = 500
+
+
+def get_firebase_app():
+    """
+    Return the default Firebase app, initializing it on first use.
+
+    Initialization reads the credentials file, so it is deferred until a
+    request (or the startup warm-up) actually needs Firebase.
+    """
+    global _firebase_app
+    if _firebase_app is None:
+        with _lock:
+            if _firebase_app is None:
+                import firebase_admin
+                from firebase_admin import credentials
+                if firebase_admin._apps:
+                    _firebase_app = firebase_admin.get_app()
+                else:
+                    cred = credentials.Certificate(
+                        settings.FIREBASE_CREDENTIALS_PATH)
+                    _firebase_app = firebase_admin.initialize_app(cred)
+    return _firebase_app
+
+
+def get_firestore_client():
+    """
+    Return the shared Firestore client, creating it on first use.
+    """
+    global _firestore_client
+    if _firestore_client is None:
+        app = get_firebase_app()
+        with _lock:
+            if _firestore_client is None:
+                from firebase_admin import firestore
+                _firestore_client = firestore.client(app)
+    return _firestore_client
+
+
+def get_async_firestore_client():
+    """
+    Return the shared asynchronous Firestore client, creating it on first use.
+
+    Its gRPC channel belongs to the event loop it is first used on, so it
+    should only be used from the application's loop.
+    """
+    global _async_firestore_client
+    if _async_firestore_client is None:
+        app = get_firebase_app()
+        with _lock:
+            if _async_firestore_client is None:
+                from firebase_admin import firestore_async
+                _async_firestore_client = firestore_async.client(app)
+    return _async_firestore_client
+
+
+async def get_documents_by_ids(collection: str,
+                               doc_ids: Iterable[str]) -> Dict[str, dict]:
+    """
+    Fetch many documents of one collection with batched get_all calls.
+
+    IDs are split into chunks of GET_ALL_CHUNK_SIZE that are fetched
+    concurrently, so N documents cost ceil(N / chunk) round-trips instead of
+    N.
+
+    Returns:
+        Dict[str, dict]: The data of every document that exists, keyed by ID.
+            IDs without a document are absent.
+    """
+    client = get_async_firestore_client()
+    collection_ref = client.collection(collection)
+    doc_ids = unique_ids(doc_ids)
+
+    async def fetch(chunk: List[str]) -> Dict[str, dict]:
+        refs = [collection_ref.document(doc_id) for doc_id in chunk]
+        return {
+            snapshot.id: snapshot.to_dict()
+            async for snapshot in client.get_all(refs) if snapshot.exists
+        }
+
+    found = {}
+    for chunk_result in await asyncio.gather(*[
+            fetch(doc_ids[i:i + GET_ALL_CHUNK_SIZE])
+            for i in range(0, len(doc_ids), GET_ALL_CHUNK_SIZE)
+    ]):
+        found.update(chunk_result)
+    return found
+
+
+@dataclass
+class Write:
+    """
+    One document write of a bulk operation: "set", "update" or "delete".
+    """
+    ref: object
+    op: str
+    data: Optional[dict] = None
+
+    def add_to(self, batch) -> None:
+        if self.op == "set":
+            batch.set(self.ref, self.data)
+        elif self.op == "update":
+            batch.update(self.ref, self.data)
+        else:
+            batch.delete(self.ref)
+
+
+async def commit_writes(writes: List[Write],
+                        concurrency: Optional[int] = None) -> Dict[int, str]:
+    """
+    Commit `writes` in batched writes of up to WRITE_BATCH_SIZE, with up to
+    `concurrency` batches in flight, so N writes cost about
+    N / WRITE_BATCH_SIZE round-trips instead of N.
+
+    A batched write is all-or-nothing, so when one fails (e.g. an update of
+    a missing document) its writes are retried one at a time; only the
+    writes that fail on their own are reported.
+
+    Returns:
+        Dict[int, str]: The error of each write that was not applied, keyed
+            by its position in `writes`.
+    """
+    client = get_async_firestore_client()
+    semaphore = asyncio.Semaphore(concurrency
+                                  or settings.BULK_WRITE_CONCURRENCY)
+    errors = {}
+
+    async def commit(chunk: List[Write]) -> None:
+        batch = client.batch()
+        for write in chunk:
+            write.add_to(batch)
+        async with semaphore:
+            await batch.commit()
+
+    async def commit_one(position: int) -> None:
+        try:
+            await commit([writes[position]])
+        except Exception as e:
+            errors[position] = str(e)
+
+    async def commit_chunk(start: int) -> None:
+        chunk = writes[start:start + WRITE_BATCH_SIZE]
+        try:
+            await commit(chunk)
+        except Exception:
+            await asyncio.gather(*[
+                commit_one(position)
+                for position in range(start, start + len(chunk))
+            ])
+
+    await asyncio.gather(*[
+        commit_chunk(start)
+        for start in range(0, len(writes), WRITE_BATCH_SIZE)
+    ])
+    return errors
+
+
+async def bulk_create(collection: str, documents: List[dict],
+                      id_field: Optional[str] = None) -> BulkWriteResult:
+    """
+    Create one document with a generated ID per entry of `documents`.
+
+    Args:
+        collection (str): The collection name.
+        documents (List[dict]): The new documents' data.
+        id_field (str, optional): Also store the generated ID in this field
+            of each document.
+    """
+    collection_ref = get_async_firestore_client().collection(collection)
+    writes = []
+    for data in documents:
+        ref = collection_ref.document()
+        if id_field:
+            data[id_field] = ref.id
+        writes.append(Write(ref, "set", data))
+    return BulkWriteResult(ids=[write.ref.id for write in writes],
+                           errors=await commit_writes(writes))
+
+
+async def bulk_set(collection: str,
+                   documents: List[tuple]) -> BulkWriteResult:
+    """
+    Create or replace many documents under given IDs.
+
+    Args:
+        collection (str): The collection path.
+        documents (List[tuple]): (document ID, data) pairs.
+    """
+    collection_ref = get_async_firestore_client().collection(collection)
+    writes = [
+        Write(collection_ref.document(doc_id), "set", data)
+        for doc_id, data in documents
+    ]
+    return BulkWriteResult(ids=[doc_id for doc_id, _ in documents],
+                           errors=await commit_writes(writes))
+
+
+async def bulk_update(collection: str,
+                      updates: List[tuple]) -> BulkWriteResult:
+    """
+    Apply top-level field updates to many documents. Updates of documents
+    that do not exist are reported as errors.
+
+    Args:
+        collection (str): The collection name.
+        updates (List[tuple]): (document ID, fields to update) pairs.
+    """
+    collection_ref = get_async_firestore_client().collection(collection)
+    writes = [
+        Write(collection_ref.document(doc_id), "update", data)
+        for doc_id, data in updates
+    ]
+    return BulkWriteResult(ids=[doc_id for doc_id, _ in updates],
+                           errors=await commit_writes(writes))
+
+
+async def bulk_delete(collection: str,
+                      doc_ids: List[str]) -> BulkWriteResult:
+    """
+    Delete many documents by ID. Deleting a missing document succeeds.
+    """
+    collection_ref = get_async_firestore_client().collection(collection)
+    writes = [
+        Write(collection_ref.document(doc_id), "delete") for doc_id in doc_ids
+    ]
+    return BulkWriteResult(ids=list(doc_ids),
+                           errors=await commit_writes(writes))
+
+
+async def update_and_merge(doc_ref, data: dict,
+                           pre_image: Optional[dict] = None) -> dict:
+    """
+    Apply top-level field `data` to a document with update() and return the
+    resulting document without reading it back afterwards.
+
+    With a `pre_image` (e.g. from a cache) the result is computed locally
+    and the update is the only round-trip. Without one, the current
+    document is read concurrently with the update, so the call costs one
+    round-trip of latency instead of two. The write result's update_time
+    tells which version the read saw: if it is not older than our write, the
+    snapshot already contains the update (and possibly later ones) and is
+    returned as is; otherwise the update is merged onto it.
+
+    Raises:
+        NotFound: If the document does not exist.
+    """
+    if pre_image is not None:
+        await doc_ref.update(data)
+        return {**pre_image, **data}
+    write_result, snapshot = await asyncio.gather(doc_ref.update(data),
+                                                  doc_ref.get())
+    current = snapshot.to_dict() or {}
+    if (snapshot.update_time is not None
+            and snapshot.update_time >= write_result.update_time):
+        return current
+    return {**current, **data}
+
+
+def mutation_fields(mutation: Mutation) -> dict:
+    """
+    Translate a Mutation into the field paths and values of an update():
+    array changes become ArrayUnion/ArrayRemove transforms and increments
+    Increment transforms, which the server applies to the current value;
+    deleted fields become DELETE_FIELD.
+    """
+    from google.cloud import firestore
+    fields = dict(mutation.set)
+    fields.update((path, firestore.ArrayUnion(values))
+                  for path, values in mutation.add.items())
+    fields.update((path, firestore.ArrayRemove(values))
+                  for path, values in mutation.remove.items())
+    fields.update((path, firestore.Increment(amount))
+                  for path, amount in mutation.increment.items())
+    fields.update((path, firestore.DELETE_FIELD) for path in mutation.delete)
+    return fields
+
+
+async def mutate_and_merge(doc_ref, mutation: Mutation) -> dict:
+    """
+    Apply a Mutation with a single update() and return the resulting
+    document, reading it concurrently like update_and_merge. No cached
+    pre-image is used: the transforms' result depends on the stored value,
+    which a cached copy may not match.
+
+    Raises:
+        NotFound: If the document does not exist.
+    """
+    write_result, snapshot = await asyncio.gather(
+        doc_ref.update(mutation_fields(mutation)), doc_ref.get())
+    current = snapshot.to_dict() or {}
+    if (snapshot.update_time is not None
+            and snapshot.update_time >= write_result.update_time):
+        return current
+    return apply_mutation(current, mutation)
+
+
+def paginate(query, limit: Optional[int] = None,
+             start_after: Optional[str] = None):
+    """
+    Order `query` by document ID and restrict it to one page.
+
+    Args:
+        query: A Firestore query (or collection reference).
+        limit (int, optional): Maximum number of documents.
+        start_after (str, optional): Return documents after this document ID,
+            i.e. the last ID of the previous page.
+    """
+    query = query.order_by("__name__")
+    if start_after:
+        query = query.start_after({"__name__": start_after})
+    if limit:
+        query = query.limit(limit)
+    return query
+
+
+async def stream_documents(query,
+                           limit: Optional[int] = None,
+                           start_after: Optional[str] = None,
+                           fields: Optional[List[str]] = None
+                           ) -> AsyncIterator[dict]:
+    """
+    Yield the documents of a query page one at a time, with their ID as
+    "id", without materializing the result.
+
+    When `fields` is given only those top-level fields are read, with a
+    server-side projection, so unused parts of large documents are neither
+    transferred nor decoded.
+    """
+    query = paginate(query, limit, start_after)
+    if fields is not None:
+        query = query.select(fields)
+    async for snapshot in query.stream():
+        yield {**(snapshot.to_dict() or {}), "id": snapshot.id}
 
 
 # Helper function to get a document by ID
-def get_document(collection: str, doc_id: str):
+async def get_document(collection: str, doc_id: str):
     """Fetches a single document from Firestore."""
-    doc_ref = firebase_db.collection(collection).document(doc_id)
-    doc = doc_ref.get()
+    doc_ref = get_async_firestore_client().collection(collection).document(
+        doc_id)
+    doc = await doc_ref.get()
     if doc.exists:
         return doc.to_dict()
     else:
@@ -28,29 +370,31 @@ def get_document(collection: str, doc_id: str):
 
 
 # Helper function to get documents by user ID
-def get_user_documents(collection: str, user_id: str):
+async def get_user_documents(collection: str, user_id: str):
     """Fetches documents from a collection filtered by user_id."""
-    docs = firebase_db.collection(collection).where("user_id", "==",
-                                                    user_id).stream()
-    return [doc.to_dict() for doc in docs]
+    docs = get_async_firestore_client().collection(collection).where(
+        "user_id", "==", user_id).stream()
+    return [doc.to_dict() async for doc in docs]
 
 
 # Helper function to create a document
-def create_document(collection: str, data: dict):
+async def create_document(collection: str, data: dict):
     """Creates a new document in Firestore."""
-    doc_ref = firebase_db.collection(collection).document()
-    doc_ref.set(data)
+    doc_ref = get_async_firestore_client().collection(collection).document()
+    await doc_ref.set(data)
     return doc_ref.id
 
 
 # Helper function to update a document
-def update_document(collection: str, doc_id: str, data: dict):
+async def update_document(collection: str, doc_id: str, data: dict):
     """Updates an existing document in Firestore."""
-    doc_ref = firebase_db.collection(collection).document(doc_id)
-    doc_ref.update(data)
+    doc_ref = get_async_firestore_client().collection(collection).document(
+        doc_id)
+    await doc_ref.update(data)
 
 
 # Helper function to delete a document
-def delete_document(collection: str, doc_id: str):
+async def delete_document(collection: str, doc_id: str):
     """Deletes a document from Firestore."""
-    firebase_db.collection(collection).document(doc_id).delete()
+    await get_async_firestore_client().collection(collection).document(
+        doc_id).delete()
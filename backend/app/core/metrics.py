@@ -0,0 +1,104 @@
+# core/metrics.py
+import bisect
+import threading
+from collections import defaultdict
+
+# Upper bounds (milliseconds) of the latency histogram buckets.
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000,
+                      30000, 60000)
+# Upper bounds of the token-count histogram buckets.
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_histograms = {}
+_gauges = {}
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. The final bucket counts observations above the
+    largest bound.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(self.buckets, self.counts)
+                }, "le_inf": self.counts[-1]
+            },
+        }
+
+
+def increment(name: str, value: int = 1) -> None:
+    """
+    Increment a named counter.
+
+    Args:
+        name (str): The counter name, e.g. "ai.generations_cancelled".
+        value (int): The amount to add.
+    """
+    with _lock:
+        _counters[name] += value
+
+
+def get_counter(name: str) -> int:
+    """
+    Return the current value of a named counter.
+    """
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def observe(name: str, value: float, buckets=DEFAULT_BUCKETS_MS) -> None:
+    """
+    Record an observation, e.g. a latency in milliseconds, in a named
+    histogram. `buckets` only applies when the histogram is first created.
+    """
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram(buckets)
+        histogram.observe(value)
+
+
+def register_gauge(name: str, read) -> None:
+    """
+    Register a callable whose current value is reported on every snapshot,
+    e.g. a queue depth or a cache's stats().
+    """
+    with _lock:
+        _gauges[name] = read
+
+
+def snapshot() -> dict:
+    """
+    Return a point-in-time copy of every metric.
+    """
+    with _lock:
+        result = {
+            "counters": dict(_counters),
+            "histograms": {
+                name: histogram.to_dict()
+                for name, histogram in _histograms.items()
+            },
+        }
+        gauges = dict(_gauges)
+    result["gauges"] = {name: read() for name, read in gauges.items()}
+    return result
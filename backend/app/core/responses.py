@@ -0,0 +1,28 @@
+# core/responses.py
+from typing import Type
+from fastapi import responses
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.core.config import get_settings
+
+settings = get_settings()
+
+
+def json_response_class() -> Type[JSONResponse]:
+    """
+    The response class JSON bodies are rendered with: ORJSONResponse when
+    FAST_JSON_RESPONSES is set, otherwise FastAPI's default JSONResponse.
+
+    orjson serializes large documents, such as worlds with many GeoJSON
+    boundaries, several times faster than the standard library and emits
+    compact output.
+
+    Raises:
+        RuntimeError: If fast responses are enabled but orjson is not
+            installed.
+    """
+    if not settings.FAST_JSON_RESPONSES:
+        return JSONResponse
+    if responses.orjson is None:
+        raise RuntimeError(
+            "FAST_JSON_RESPONSES is set but orjson is not installed")
+    return ORJSONResponse
@@ -12,26 +12,53 @@ class CampaignEvent(BaseModel):
     character_id: Optional[str]  # ID of the character involved in the event
     world_id: Optional[str]  # ID of the world where the event occurred
 
+class CampaignEventRecord(CampaignEvent):
+    """
+    An event read from a campaign's event log. IDs sort in timestamp order.
+    """
+    id: str
+
 class CampaignBase(BaseModel):
     name: str
-    worlds: List[World]
-    characters: List[Character]
+    # Worlds and characters are referenced by ID; GET /api/campaign/{id}
+    # resolves them with `expand=worlds,characters`.
+    world_ids: List[str] = []
+    player_character_ids: List[str] = []
+    active_npc_character_ids: List[str] = []
     created_at: datetime
     updated_at: datetime
-    history: List[CampaignEvent]
     by_user: str
 
 
 class CampaignCreate(CampaignBase):
-    pass
+    # Initial events, written to the campaign's event log.
+    history: List[CampaignEvent] = []
+
+class CampaignSummary(BaseModel):
+    """
+    A campaign without its world and character references, for lists.
+    """
+    id: str
+    name: str
+    created_at: datetime
+    updated_at: datetime
+    by_user: str
 
 class CampaignUpdate(BaseModel):
     name: Optional[str]
-    worlds: Optional[List[World]]
-    characters: Optional[List[Character]]
+    world_ids: Optional[List[str]] = None
+    player_character_ids: Optional[List[str]] = None
+    active_npc_character_ids: Optional[List[str]] = None
     updated_at: Optional[datetime] = datetime.now(timezone.utc)
-    history: Optional[List[CampaignEvent]]
 
 class Campaign(CampaignBase):
     id: str
-    pass
\ No newline at end of file
+    pass
+
+class CampaignExpanded(Campaign):
+    """
+    A campaign with the worlds and characters it references, for
+    `GET /api/campaign/{id}?expand=...`. Only the requested lists are set.
+    """
+    worlds: Optional[List[World]] = None
+    characters: Optional[List[Character]] = None
\ No newline at end of file
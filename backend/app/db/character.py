@@ -51,3 +51,15 @@ class Character(CharacterBase):
 
     class Config:
         from_attributes = True
+
+class CharacterSummary(BaseModel):
+    """
+    A character's identity and level, without stats, gear or backstory, for
+    lists.
+    """
+    id: str
+    name: str
+    class_id: str
+    level: int
+    race: Race
+    image: Optional[str] = None
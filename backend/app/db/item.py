@@ -47,6 +47,16 @@ class Item(ItemBase):
     class Config:
         from_attributes = True
 
+class ItemSummary(BaseModel):
+    """
+    An item without its description, image and bonuses, for lists.
+    """
+    id: str
+    name: str
+    rarity: Rarity
+    weight: float
+    cost: int
+
 class ItemSet(BaseModel):
     id: str
     name: str
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 from datetime import datetime
 
 # ----- User Schema -----
@@ -33,6 +33,10 @@ class GameSession(GameSessionCreate):
     messages: List[Message] = []
     created_at: datetime
     updated_at: datetime
+    # Rolling summary of messages[:summarized_message_count], maintained so
+    # prompts only carry the recent turns verbatim.
+    summary: Optional[str] = None
+    summarized_message_count: int = 0
 
 
 # ----- Model Interaction -----
@@ -40,9 +44,45 @@ class ModelRequest(BaseModel):
     prompt: str
     system: Optional[str] = "Fantasy"
     history: Optional[List[Message]] = []
+    session_id: Optional[str] = None
 
 
 class ModelResponse(BaseModel):
     generated_text: str
     tokens_used: Optional[int] = None
     latency_ms: Optional[int] = None
+    queue_ms: Optional[int] = None
+    ttft_ms: Optional[int] = None  # time to first token
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cache_status: Optional[str] = None  # "hit", "miss", "bypass", "coalesced"
+
+
+# ----- Bulk Writes -----
+class BulkError(BaseModel):
+    index: int  # position of the entry in the request
+    id: Optional[str] = None
+    error: str
+
+
+class BulkWriteResponse(BaseModel):
+    ids: List[Optional[str]]  # per request entry; None where it failed
+    errors: List[BulkError] = []
+
+
+class BulkDeleteResponse(BulkWriteResponse):
+    # Per request entry: the job deleting the document's dependents, at
+    # /api/jobs/{job_id}; None where the delete failed.
+    job_ids: List[Optional[str]] = []
+
+
+# ----- Mutations -----
+class MutationRequest(BaseModel):
+    """
+    Body of the PATCH routes. Keys are field paths; dots address nested
+    fields, e.g. {"increment": {"experience": 50}}.
+    """
+    set: Dict[str, Any] = {}
+    add: Dict[str, List[Any]] = {}  # appended unless already present
+    remove: Dict[str, List[Any]] = {}  # every equal element removed
+    increment: Dict[str, Union[int, float]] = {}
@@ -21,6 +21,7 @@ class WorldBase(BaseModel):
     description: Optional[str] = ""
     areas: List[Area] = []
     pois: List[POI] = []
+    item_ids: List[str] = []
     map_image: Optional[str] = None  # base64 or URL
 
 class WorldCreate(BaseModel):
@@ -33,11 +34,28 @@ class World(WorldBase):
     id: str
     by_user: str
 
+class WorldSummary(BaseModel):
+    """
+    A world without its map, areas and points of interest, for lists.
+    """
+    id: str
+    name: str
+    type: Optional[str] = ""
+    description: Optional[str] = ""
+    by_user: str
+
 class WorldUpdate(BaseModel):
     name: Optional[str] = None
     type: Optional[str] = None
     description: Optional[str] = None
     areas: Optional[List[Area]] = None
     pois: Optional[List[POI]] = None
+    item_ids: Optional[List[str]] = None
     map_image: Optional[str] = None
-    by_user: Optional[str] = None
\ No newline at end of file
+    by_user: Optional[str] = None
+
+class WorldBulkUpdate(WorldUpdate):
+    """
+    A world update within a bulk update, identifying the world it applies to.
+    """
+    id: str
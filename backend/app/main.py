@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
@@ -7,8 +9,43 @@ from app.api.world import router as world_router
 from app.api.item import router as item_router
 from app.api.character import router as char_router
 from app.api.campaign import router as campgain_router
+from app.api.metrics import router as metrics_router
+from app.api.jobs import router as jobs_router
+from app.core.compression import CompressionMiddleware
+from app.core.config import get_settings
+from app.core.etag import ETagMiddleware
+from app.core.responses import json_response_class
+from app.repository import close_repository, get_repository
+from app.services.ai_service import get_model_client
+from app.services.campaign_events import close_event_buffer
+from app.services.character_service import close_character_writes
+from app.services.cascade_delete import cancel_cascade_deletes
+from app.services.entity_cache import start_listeners, stop_listeners
 
-app = FastAPI()
+settings = get_settings()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are created lazily; warming them here keeps the cost off the
+    # first request while still letting the app import quickly.
+    if settings.WARM_UP_CLIENTS:
+        # The async Firestore client is bound to this loop, so create it
+        # here rather than in a worker thread.
+        get_repository().warm_up()
+        await asyncio.to_thread(get_model_client)
+    if settings.ENTITY_CACHE_LISTEN:
+        await asyncio.to_thread(start_listeners)
+    yield
+    stop_listeners()
+    await cancel_cascade_deletes()
+    await close_event_buffer()
+    await close_character_writes()
+    close_repository()
+
+
+app = FastAPI(lifespan=lifespan,
+              default_response_class=json_response_class())
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,6 +54,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# GET responses carry an ETag and are answered with 304 when unchanged.
+app.add_middleware(ETagMiddleware)
+# Added last so it runs outermost: ETags are computed on the plain body.
+if settings.COMPRESSION_MINIMUM_SIZE > 0:
+    app.add_middleware(CompressionMiddleware,
+                       minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+                       gzip_level=settings.GZIP_COMPRESS_LEVEL,
+                       brotli_quality=settings.BROTLI_QUALITY)
 
 # app.mount("/static", StaticFiles(directory="frontend/dist/static"), name="static")
 # app.mount("/", StaticFiles(directory="frontend/dist", html=True), name="index")
@@ -27,3 +72,5 @@ app.include_router(world_router, prefix="/api/world", tags=["World"])
 app.include_router(item_router, prefix="/api/item", tags=["Item"])
 app.include_router(char_router, prefix="/api/character", tags=["Character"])
 app.include_router(campgain_router, prefix="/api/campaign", tags=["Campaign"])
+app.include_router(metrics_router, prefix="/api/metrics", tags=["Metrics"])
+app.include_router(jobs_router, prefix="/api/jobs", tags=["Jobs"])
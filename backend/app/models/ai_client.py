@@ -1,11 +1,30 @@
-from huggingface_hub import InferenceClient
 from app.core.config import get_settings
 from app.db.schemas import Message
-from typing import List
+from app.models.response_cache import ResponseCache, make_cache_key
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
 
 settings = get_settings()
 
 
+@dataclass
+class Completion:
+    """
+    A generated reply with the provider-reported token usage, when known.
+    """
+    content: str = ""
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached: bool = False
+
+
+def _read_usage(completion: Completion, usage) -> None:
+    if usage is None:
+        return
+    completion.prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion.completion_tokens = getattr(usage, "completion_tokens", None)
+
+
 class AIModelClient:
 
     def __init__(self, settings):
@@ -19,9 +38,16 @@ class AIModelClient:
         self.provider = settings.PROVIDER
         self.hf_token = settings.HF_API_KEY
 
+        # huggingface_hub is slow to import; pay for it only when a client
+        # is actually created.
+        from huggingface_hub import AsyncInferenceClient, InferenceClient
         self.client = InferenceClient(provider=self.provider,
                                       model=self.model_name,
                                       token=self.hf_token)
+        self.async_client = AsyncInferenceClient(provider=self.provider,
+                                                 model=self.model_name,
+                                                 token=self.hf_token)
+        self.cache = ResponseCache.from_settings(settings)
 
     def get_client(self):
         """
@@ -38,8 +64,123 @@ class AIModelClient:
         messages.append({"role": "user", "content": prompt})
         return messages
 
-    def generate(self, prompt: str, history: List[Message] = []) -> str:
+    def cache_key(self, messages: List[dict]) -> str:
+        """
+        Returns the response cache key for a formatted message list.
+        """
+        return make_cache_key(self.model_name, messages)
+
+    def _cached(self, messages: List[dict], bypass_cache: bool):
+        if self.cache is None or bypass_cache:
+            return None
+        return self.cache.get(self.cache_key(messages))
+
+    async def _acached(self, messages: List[dict], bypass_cache: bool):
+        if self.cache is None or bypass_cache:
+            return None
+        return await self.cache.aget(self.cache_key(messages))
+
+    async def get_cached(self, prompt: str,
+                         history: List[Message] = []) -> Optional[str]:
+        """
+        Returns the cached completion for this prompt and history, if any.
+        """
+        return await self._acached(self.format_messages(prompt, history),
+                                   False)
+
+    def _store(self, messages: List[dict], content: str):
+        if self.cache is not None and content:
+            self.cache.set(self.cache_key(messages), content)
+
+    async def _astore(self, messages: List[dict], content: str):
+        if self.cache is not None and content:
+            await self.cache.aset(self.cache_key(messages), content)
+
+    def generate(self,
+                 prompt: str,
+                 history: List[Message] = [],
+                 bypass_cache: bool = False) -> str:
         messages = self.format_messages(prompt, history)
+        cached = self._cached(messages, bypass_cache)
+        if cached is not None:
+            return cached
         completion = self.client.chat.completions.create(model=self.model_name,
                                                          messages=messages)
-        return completion.choices[0].message["content"]
+        content = completion.choices[0].message["content"]
+        self._store(messages, content)
+        return content
+
+    async def acomplete(self,
+                        prompt: str,
+                        history: List[Message] = [],
+                        bypass_cache: bool = False) -> Completion:
+        """
+        Awaits the provider through the async client and returns the reply
+        together with its token usage.
+        """
+        messages = self.format_messages(prompt, history)
+        cached = await self._acached(messages, bypass_cache)
+        if cached is not None:
+            return Completion(content=cached, cached=True)
+        output = await self.async_client.chat.completions.create(
+            model=self.model_name, messages=messages)
+        completion = Completion(content=output.choices[0].message["content"])
+        _read_usage(completion, getattr(output, "usage", None))
+        await self._astore(messages, completion.content)
+        return completion
+
+    async def agenerate(self,
+                        prompt: str,
+                        history: List[Message] = [],
+                        bypass_cache: bool = False) -> str:
+        """
+        Non-blocking variant of `generate` that awaits the provider through
+        the async client instead of holding the event loop.
+        """
+        completion = await self.acomplete(prompt, history, bypass_cache)
+        return completion.content
+
+    async def stream(self,
+                     prompt: str,
+                     history: List[Message] = [],
+                     bypass_cache: bool = False,
+                     completion: Optional[Completion] = None
+                     ) -> AsyncIterator[str]:
+        """
+        Yields the completion token by token as the provider emits them.
+        Closing the iterator early closes the upstream connection so the
+        provider stops generating. A cached completion is yielded whole, and
+        only fully streamed completions are written back to the cache.
+
+        If `completion` is given, it is filled with the streamed text and the
+        token usage the provider reports at the end of the stream.
+        """
+        completion = completion if completion is not None else Completion()
+        messages = self.format_messages(prompt, history)
+        cached = await self._acached(messages, bypass_cache)
+        if cached is not None:
+            completion.content = cached
+            completion.cached = True
+            yield cached
+            return
+        chunks = await self.async_client.chat.completions.create(
+            model=self.model_name,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True})
+        tokens = []
+        try:
+            async for chunk in chunks:
+                _read_usage(completion, getattr(chunk, "usage", None))
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    tokens.append(token)
+                    completion.content += token
+                    yield token
+            await self._astore(messages, "".join(tokens))
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,189 @@
+import asyncio
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, List, Optional
+from app.db.schemas import Message
+
+# Rough cost of the chat template wrapped around every message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_INSTRUCTION = (
+    "You are the game master's scribe. Update the running summary of the "
+    "session with the new turns below. Keep names, places, items, open "
+    "quests and decisions; drop small talk. Reply with the summary only, "
+    "in at most {max_tokens} tokens.")
+
+
+@lru_cache(maxsize=8)
+def get_tokenizer(name: str):
+    """
+    Load and cache the `tokenizers` tokenizer for a model. Returns None when
+    the tokenizer cannot be loaded (offline, private model), in which case
+    token counts fall back to a character-based estimate.
+    """
+    try:
+        from tokenizers import Tokenizer
+        return Tokenizer.from_pretrained(name)
+    except Exception as e:
+        print(f"Could not load tokenizer for {name}: {e}")
+        return None
+
+
+def count_tokens(text: str, tokenizer=None) -> int:
+    """
+    Count the tokens in `text` with the given tokenizer, or estimate them at
+    roughly four characters per token without one.
+    """
+    if not text:
+        return 0
+    if tokenizer is None:
+        return len(text) // 4 + 1
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+@dataclass
+class ContextWindow:
+    """
+    The history to send for one turn, plus the summary state to persist with
+    the GameSession.
+    """
+    messages: List[Message]
+    summary: Optional[str]
+    summarized_message_count: int
+    summary_updated: bool
+    prompt_tokens: int
+
+
+class ContextManager:
+    """
+    Keeps the prompt within a token budget: recent turns are sent verbatim,
+    and turns that fall out of the window are folded into a rolling summary.
+    The summary is extended incrementally, so each older turn is summarized
+    once rather than on every request.
+    """
+
+    def __init__(self,
+                 tokenizer_name: str,
+                 token_budget: int = 3000,
+                 summary_token_budget: int = 400):
+        self.tokenizer_name = tokenizer_name
+        self.token_budget = token_budget
+        self.summary_token_budget = summary_token_budget
+
+    async def load_tokenizer(self):
+        # Loading may download the tokenizer once; keep it off the event loop.
+        return await asyncio.to_thread(get_tokenizer, self.tokenizer_name)
+
+    async def count(self, text: str) -> int:
+        """
+        Count the tokens in `text` with this manager's tokenizer.
+        """
+        return count_tokens(text, await self.load_tokenizer())
+
+    def _message_tokens(self, message: Message, tokenizer) -> int:
+        return count_tokens(message.content,
+                            tokenizer) + MESSAGE_OVERHEAD_TOKENS
+
+    async def build(
+        self,
+        prompt: str,
+        history: List[Message],
+        summarize: Callable[[str], Awaitable[str]],
+        summary: Optional[str] = None,
+        summarized_message_count: int = 0,
+        reserved_tokens: int = 0,
+    ) -> ContextWindow:
+        """
+        Select the messages to send with `prompt`.
+
+        Args:
+            prompt (str): The new user prompt.
+            history (List[Message]): The full session history, oldest first.
+            summarize (callable): Async callable that sends a summarization
+                prompt to the model and returns its reply.
+            summary (str, optional): The stored summary of
+                history[:summarized_message_count].
+            summarized_message_count (int): How many leading messages the
+                stored summary already covers.
+            reserved_tokens (int): Tokens the caller will add to the prompt
+                itself, e.g. retrieved lore.
+
+        Returns:
+            ContextWindow: The messages to send and the updated summary state.
+        """
+        tokenizer = await self.load_tokenizer()
+        summarized_message_count = min(summarized_message_count, len(history))
+        budget = self.token_budget - count_tokens(prompt, tokenizer)
+        budget -= self.summary_token_budget + MESSAGE_OVERHEAD_TOKENS
+        budget -= reserved_tokens
+
+        keep_from = self._window_start(history, summarized_message_count,
+                                       budget, tokenizer)
+        summary_updated = False
+        if keep_from > summarized_message_count:
+            # Fold down to half the budget so the summary is extended in
+            # batches instead of on every turn once the window is full.
+            keep_from = self._window_start(history, summarized_message_count,
+                                           budget // 2, tokenizer)
+            for chunk in self._chunks(
+                    history[summarized_message_count:keep_from], tokenizer):
+                summary = await self._fold(summary, chunk, summarize)
+            summarized_message_count = keep_from
+            summary_updated = True
+
+        messages = list(history[keep_from:])
+        if summary:
+            messages.insert(
+                0,
+                Message(role="system",
+                        content=f"Summary of the story so far: {summary}"))
+        prompt_tokens = sum(
+            self._message_tokens(message, tokenizer) for message in messages)
+        prompt_tokens += count_tokens(prompt, tokenizer)
+        return ContextWindow(messages=messages,
+                             summary=summary,
+                             summarized_message_count=summarized_message_count,
+                             summary_updated=summary_updated,
+                             prompt_tokens=prompt_tokens)
+
+    def _window_start(self, history: List[Message], floor: int, budget: int,
+                      tokenizer) -> int:
+        """
+        Walk back from the newest turn, keeping turns while they fit in
+        `budget`, and return the index of the oldest kept turn.
+        """
+        keep_from = len(history)
+        used = 0
+        while keep_from > floor:
+            cost = self._message_tokens(history[keep_from - 1], tokenizer)
+            if used + cost > budget:
+                break
+            used += cost
+            keep_from -= 1
+        return keep_from
+
+    def _chunks(self, turns: List[Message], tokenizer) -> List[List[Message]]:
+        """
+        Split turns into groups that each fit in one summarization request.
+        """
+        chunks, current, used = [], [], 0
+        for turn in turns:
+            cost = self._message_tokens(turn, tokenizer)
+            if current and used + cost > self.token_budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(turn)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _fold(self, summary: Optional[str], turns: List[Message],
+                    summarize: Callable[[str], Awaitable[str]]) -> str:
+        transcript = "\n".join(f"{turn.role}: {turn.content}"
+                               for turn in turns)
+        request = SUMMARY_INSTRUCTION.format(
+            max_tokens=self.summary_token_budget)
+        request += f"\n\nCurrent summary:\n{summary or '(none)'}"
+        request += f"\n\nNew turns:\n{transcript}"
+        return (await summarize(request)).strip()
@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+from app.core.cache import LRUCache
+from app.core import metrics
+
+
+def normalize_messages(messages: List[dict]) -> List[dict]:
+    """
+    Reduce a formatted message list to the parts that affect the completion,
+    so trivially different requests (leading and trailing whitespace, role
+    casing, extra keys such as timestamps) share a cache entry. Whitespace
+    inside a message is kept, as line breaks change what a prompt says.
+    """
+    return [{
+        "role": str(message["role"]).strip().lower(),
+        "content": str(message["content"]).strip()
+    } for message in messages]
+
+
+def make_cache_key(model_name: str, messages: List[dict]) -> str:
+    """
+    Build a stable cache key from the model name and the normalized messages.
+    """
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "messages": normalize_messages(messages)
+        },
+        sort_keys=True,
+        separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskResponseCache:
+    """
+    SQLite-backed cache tier that survives restarts and is shared between
+    workers on the same host. Bounded by `max_entries` (least recently
+    accessed rows are dropped first) and by `ttl_seconds`.
+
+    A hit only rewrites the row's access time once it is more than
+    `touch_seconds` old, so repeated hits of a popular entry cost a read
+    rather than a commit each.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000,
+                 ttl_seconds: Optional[float] = None,
+                 touch_seconds: float = 60):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.touch_seconds = touch_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS responses ("
+                           "key TEXT PRIMARY KEY, "
+                           "value TEXT NOT NULL, "
+                           "created_at REAL NOT NULL, "
+                           "accessed_at REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed "
+                           "ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, accessed_at FROM responses "
+                "WHERE key = ?", (key, )).fetchone()
+            if row is None:
+                return None
+            value, created_at, accessed_at = row
+            if self.ttl_seconds and created_at + self.ttl_seconds <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?",
+                                   (key, ))
+                self._conn.commit()
+                return None
+            if accessed_at + self.touch_seconds <= now:
+                self._conn.execute(
+                    "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                    (now, key))
+                self._conn.commit()
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, now, now))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries, ))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-tier cache for model completions: an in-memory LRU in front of an
+    optional on-disk tier. Disk hits are promoted into memory.
+
+    Async code uses `aget`/`aset`, which run the disk tier in a worker
+    thread so its reads and commits do not block the event loop.
+    """
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 ttl_seconds: Optional[float] = None,
+                 disk_path: Optional[str] = None,
+                 disk_max_entries: int = 10000):
+        self.memory = LRUCache(max_entries=max_entries,
+                               ttl_seconds=ttl_seconds)
+        self.disk = (DiskResponseCache(disk_path,
+                                       max_entries=disk_max_entries,
+                                       ttl_seconds=ttl_seconds)
+                     if disk_path else None)
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional["ResponseCache"]:
+        """
+        Build the cache described by the AI_CACHE_* settings, or None if
+        caching is disabled.
+        """
+        if not settings.AI_CACHE_ENABLED:
+            return None
+        return cls(max_entries=settings.AI_CACHE_MAX_ENTRIES,
+                   ttl_seconds=settings.AI_CACHE_TTL_SECONDS,
+                   disk_path=settings.AI_CACHE_DISK_PATH,
+                   disk_max_entries=settings.AI_CACHE_DISK_MAX_ENTRIES)
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.increment("ai.cache.memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                metrics.increment("ai.cache.disk_hits")
+                self.memory.set(key, value)
+                return value
+        metrics.increment("ai.cache.misses")
+        return None
+
+    def set(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    async def aget(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        if value is not None:
+            metrics.increment("ai.cache.memory_hits")
+            return value
+        if self.disk is not None:
+            value = await asyncio.to_thread(self.disk.get, key)
+            if value is not None:
+                metrics.increment("ai.cache.disk_hits")
+                self.memory.set(key, value)
+                return value
+        metrics.increment("ai.cache.misses")
+        return None
+
+    async def aset(self, key: str, value: str) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> dict:
+        return {"memory": self.memory.stats(), "disk_enabled": bool(self.disk)}
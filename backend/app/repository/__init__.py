@@ -0,0 +1,65 @@
+# app/repository/__init__.py
+import threading
+from typing import Optional
+from app.core.config import get_settings
+from app.repository.base import (
+    BulkWriteResult,
+    Filter,
+    MultiGetResult,
+    Mutation,
+    Repository,
+    page_ids,
+    unique_ids,
+)
+
+__all__ = [
+    "BulkWriteResult",
+    "Filter",
+    "MultiGetResult",
+    "Mutation",
+    "Repository",
+    "close_repository",
+    "get_repository",
+    "page_ids",
+    "unique_ids",
+]
+
+settings = get_settings()
+
+_lock = threading.Lock()
+_repository: Optional[Repository] = None
+
+
+def _create_repository() -> Repository:
+    backend = settings.REPOSITORY_BACKEND
+    if backend == "firestore":
+        from app.repository.firestore import FirestoreRepository
+        return FirestoreRepository()
+    if backend == "memory":
+        from app.repository.memory import MemoryRepository
+        return MemoryRepository()
+    if backend == "sqlite":
+        from app.repository.sqlite import SQLiteRepository
+        return SQLiteRepository(settings.SQLITE_PATH)
+    raise ValueError(f"Unknown repository backend: {backend}")
+
+
+def get_repository() -> Repository:
+    """
+    Return the repository selected by the REPOSITORY_BACKEND setting,
+    creating it on first use.
+    """
+    global _repository
+    if _repository is None:
+        with _lock:
+            if _repository is None:
+                _repository = _create_repository()
+    return _repository
+
+
+def close_repository() -> None:
+    global _repository
+    with _lock:
+        if _repository is not None:
+            _repository.close()
+            _repository = None
@@ -0,0 +1,396 @@
+# repository/base.py
+import copy
+import secrets
+import string
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import (Any, AsyncIterator, Callable, Dict, Iterable, List,
+                    Optional, Tuple, Union)
+
+# A query condition: (field, operator, value), with the operators
+# "==", "<", "<=", ">" and ">=".
+Filter = Tuple[str, str, Any]
+
+# Fields the local backends index for equality filters, i.e. the fields the
+# list routes and cascade deletes query on.
+INDEXED_FIELDS = ("user_id", "by_user", "created_by_user_id", "world_id",
+                  "campaign_id", "character_id", "current_location_id")
+
+_ID_ALPHABET = string.ascii_letters + string.digits
+
+
+def new_id() -> str:
+    """
+    Generate a 20-character document ID like Firestore's auto IDs.
+    """
+    return "".join(secrets.choice(_ID_ALPHABET) for _ in range(20))
+
+
+@dataclass
+class MultiGetResult:
+    """
+    Documents fetched by ID, in the order the IDs were requested, plus the
+    IDs that do not exist.
+    """
+    documents: List[dict] = field(default_factory=list)
+    missing_ids: List[str] = field(default_factory=list)
+    requested_ids: List[str] = field(default_factory=list)
+
+    @classmethod
+    def from_found(cls, doc_ids: List[str],
+                   found: Dict[str, dict]) -> "MultiGetResult":
+        """
+        Arrange `found` (documents keyed by ID) in the order of `doc_ids`,
+        adding each document's ID as "id".
+        """
+        result = cls(requested_ids=list(doc_ids))
+        for doc_id in doc_ids:
+            if doc_id in found:
+                result.documents.append({**found[doc_id], "id": doc_id})
+            else:
+                result.missing_ids.append(doc_id)
+        return result
+
+
+def unique_ids(doc_ids: Iterable[str]) -> List[str]:
+    """
+    Drop empty and repeated IDs, keeping the first occurrence of each.
+    """
+    return list(dict.fromkeys(doc_id for doc_id in doc_ids if doc_id))
+
+
+@dataclass
+class BulkWriteResult:
+    """
+    Outcome of a bulk write: the document ID of every requested write, in
+    request order, and the error of each write that was not applied, keyed
+    by its position.
+    """
+    ids: List[str] = field(default_factory=list)
+    errors: Dict[int, str] = field(default_factory=dict)
+
+    def written_ids(self) -> List[str]:
+        """
+        The IDs of the documents that were written.
+        """
+        return [
+            doc_id for position, doc_id in enumerate(self.ids)
+            if position not in self.errors
+        ]
+
+
+@dataclass
+class Mutation:
+    """
+    Field changes applied to a document in one write, without reading it
+    first. On Firestore the array and counter changes are field transforms,
+    so concurrent mutations of the same array or counter are all kept.
+
+    Keys are field paths; dots address nested fields, e.g. "stats.hp".
+    """
+    set: Dict[str, Any] = field(default_factory=dict)
+    # Elements appended to an array unless it already has an equal one.
+    add: Dict[str, List[Any]] = field(default_factory=dict)
+    # Elements whose every occurrence is removed from an array.
+    remove: Dict[str, List[Any]] = field(default_factory=dict)
+    increment: Dict[str, Union[int, float]] = field(default_factory=dict)
+    # Fields removed from the document; deleting a missing one is a no-op.
+    delete: List[str] = field(default_factory=list)
+
+    def paths(self) -> List[str]:
+        """
+        Every field path the mutation changes.
+        """
+        return [*self.set, *self.add, *self.remove, *self.increment,
+                *self.delete]
+
+    def check(self) -> None:
+        """
+        Raise ValueError unless the mutation changes at least one field and
+        no field twice, as Firestore requires. A path and a path below it
+        (e.g. "stats" and "stats.hp") count as the same field.
+        """
+        paths = self.paths()
+        if not paths:
+            raise ValueError("The mutation changes no field")
+        for path in paths:
+            if not path or "" in path.split("."):
+                raise ValueError(f"Invalid field path: {path!r}")
+        ordered = sorted(paths)
+        for path, following in zip(ordered, ordered[1:]):
+            if following == path or following.startswith(path + "."):
+                raise ValueError(
+                    f"Field {following!r} is changed more than once")
+
+
+def page_ids(doc_ids: List[str],
+             limit: Optional[int] = None,
+             start_after: Optional[str] = None) -> List[str]:
+    """
+    Apply the same cursor paging to a list of IDs (e.g. a campaign roster)
+    before it is fetched.
+    """
+    if start_after:
+        doc_ids = (doc_ids[doc_ids.index(start_after) + 1:]
+                   if start_after in doc_ids else [])
+    return doc_ids[:limit] if limit else doc_ids
+
+
+class Repository(ABC):
+    """
+    Document storage used by the services: collections of JSON-like
+    documents addressed by ID, in the Firestore data model.
+
+    `collection` may be a subcollection path such as
+    "campaigns/{campaign_id}/events". Documents are returned without their
+    ID unless noted; list results carry it as "id". Updating a document that
+    does not exist raises google.cloud.exceptions.NotFound, whatever the
+    backend.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        """
+        Return a document's data, or None if it does not exist.
+        """
+
+    @abstractmethod
+    async def get_many(self, collection: str,
+                       doc_ids: Iterable[str]) -> Dict[str, dict]:
+        """
+        Return the documents that exist among `doc_ids`, keyed by ID.
+        """
+
+    @abstractmethod
+    async def create(self, collection: str, data: dict,
+                     id_field: Optional[str] = None) -> str:
+        """
+        Store a new document under a generated ID and return the ID, also
+        writing it to `data[id_field]` when `id_field` is given.
+        """
+
+    @abstractmethod
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        """
+        Create or replace a document.
+        """
+
+    @abstractmethod
+    async def update(self, collection: str, doc_id: str, data: dict,
+                     pre_image: Optional[dict] = None) -> dict:
+        """
+        Apply top-level field updates to a document and return the updated
+        document. `pre_image` is a copy of the current document, if the
+        caller has one, that a remote backend can save a read with.
+        """
+
+    @abstractmethod
+    async def mutate(self, collection: str, doc_id: str,
+                     mutation: Mutation) -> dict:
+        """
+        Apply a Mutation to a document as one atomic write and return the
+        updated document.
+        """
+
+    @abstractmethod
+    async def delete(self, collection: str, doc_id: str) -> None:
+        """
+        Delete a document. Deleting a missing document succeeds.
+        """
+
+    @abstractmethod
+    def stream(self, collection: str,
+               filters: Iterable[Filter] = (),
+               limit: Optional[int] = None,
+               start_after: Optional[str] = None,
+               fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+        """
+        Yield the documents matching every filter in document ID order,
+        with their ID as "id", one page at a time.
+
+        Args:
+            collection (str): The collection path.
+            filters (Iterable[Filter]): Conditions the documents must meet.
+            limit (int, optional): Maximum number of documents.
+            start_after (str, optional): Return documents after this ID.
+            fields (List[str], optional): Only return these top-level
+                fields (and the ID); an empty list returns IDs only.
+        """
+
+    @abstractmethod
+    async def bulk_create(self, collection: str, documents: List[dict],
+                          id_field: Optional[str] = None) -> BulkWriteResult:
+        """
+        Create one document with a generated ID per entry of `documents`.
+        """
+
+    @abstractmethod
+    async def bulk_set(self, collection: str,
+                       documents: List[Tuple[str, dict]]) -> BulkWriteResult:
+        """
+        Create or replace many documents under IDs chosen by the caller,
+        given as (document ID, data) pairs.
+        """
+
+    @abstractmethod
+    async def bulk_update(self, collection: str,
+                          updates: List[Tuple[str, dict]]) -> BulkWriteResult:
+        """
+        Apply (document ID, field updates) pairs. Updates of documents that
+        do not exist are reported as errors.
+        """
+
+    @abstractmethod
+    async def bulk_delete(self, collection: str,
+                          doc_ids: List[str]) -> BulkWriteResult:
+        """
+        Delete many documents by ID.
+        """
+
+    def watch(self, collection: str,
+              on_change: Callable[[str], None]) -> Optional[Callable[[], None]]:
+        """
+        Call `on_change(doc_id)` whenever a document of `collection` is
+        changed by another process, and return a function that stops
+        watching.
+
+        Returns None when the backend has no change feed: local backends
+        are only written through this process.
+        """
+        return None
+
+    def warm_up(self) -> None:
+        """
+        Create the backend's clients now rather than on first use. Called
+        from the event loop, which async clients are bound to.
+        """
+
+    def close(self) -> None:
+        """
+        Release the backend's connections.
+        """
+
+
+_COMPARE = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+def value_kind(value: Any) -> str:
+    """
+    The Firestore type a value is stored as, for filters: values of
+    different kinds never compare equal or ordered (True is not 1).
+    """
+    if isinstance(value, bool):
+        return "boolean"
+    if isinstance(value, (int, float)):
+        return "number"
+    return type(value).__name__
+
+
+def matches(data: dict, filters: Iterable[Filter]) -> bool:
+    """
+    Whether a document meets every filter, for backends that filter in
+    Python. Like Firestore, a missing field or a value of another kind never
+    matches, and == None only matches fields explicitly set to None.
+
+    Raises:
+        ValueError: For an operator other than those of Filter.
+    """
+    for field_name, op, value in filters:
+        if op != "==" and op not in _COMPARE:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if field_name not in data:
+            return False
+        current = data[field_name]
+        if value_kind(current) != value_kind(value):
+            return False
+        if op == "==":
+            if current != value:
+                return False
+            continue
+        try:
+            if not _COMPARE[op](current, value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+def apply_update(data: dict, updates: dict) -> dict:
+    """
+    Return a copy of `data` with top-level field `updates` applied, as
+    Firestore's update() does.
+    """
+    updated = copy.deepcopy(data)
+    updated.update(copy.deepcopy(updates))
+    return updated
+
+
+def _parent(data: dict, path: str) -> Tuple[dict, str]:
+    # Like Firestore, a missing or non-map parent is replaced by a map.
+    parts = path.split(".")
+    node = data
+    for part in parts[:-1]:
+        if not isinstance(node.get(part), dict):
+            node[part] = {}
+        node = node[part]
+    return node, parts[-1]
+
+
+def apply_mutation(data: dict, mutation: Mutation) -> dict:
+    """
+    Return a copy of `data` with a Mutation applied, with the semantics of
+    the Firestore transforms: adding to or removing from a field that is not
+    an array starts from an empty array, incrementing a field that is not
+    a number sets it to the increment, and deleting a missing field does
+    nothing.
+    """
+    updated = copy.deepcopy(data)
+    for path, value in mutation.set.items():
+        node, key = _parent(updated, path)
+        node[key] = copy.deepcopy(value)
+    for path, values in mutation.add.items():
+        node, key = _parent(updated, path)
+        current = node.get(key)
+        array = list(current) if isinstance(current, list) else []
+        for value in values:
+            if value not in array:
+                array.append(copy.deepcopy(value))
+        node[key] = array
+    for path, values in mutation.remove.items():
+        node, key = _parent(updated, path)
+        current = node.get(key)
+        node[key] = ([value for value in current if value not in values]
+                     if isinstance(current, list) else [])
+    for path, amount in mutation.increment.items():
+        node, key = _parent(updated, path)
+        current = node.get(key)
+        if isinstance(current, (int, float)) and not isinstance(current, bool):
+            node[key] = current + amount
+        else:
+            node[key] = amount
+    for path in mutation.delete:
+        *parents, key = path.split(".")
+        node = updated
+        for part in parents:
+            node = node.get(part)
+            if not isinstance(node, dict):
+                break
+        else:
+            node.pop(key, None)
+    return updated
+
+
+def project(data: dict, fields: Optional[List[str]]) -> dict:
+    """
+    Keep only `fields` of a document; all of them when `fields` is None.
+    """
+    if fields is None:
+        return data
+    return {name: data[name] for name in fields if name in data}
@@ -0,0 +1,102 @@
+# repository/firestore.py
+from typing import (AsyncIterator, Callable, Dict, Iterable, List, Optional,
+                    Tuple)
+from app.core import firebase
+from app.repository.base import BulkWriteResult, Filter, Mutation, Repository
+
+
+class FirestoreRepository(Repository):
+    """
+    Repository backed by Cloud Firestore through the shared async client.
+    """
+
+    name = "firestore"
+
+    def warm_up(self) -> None:
+        firebase.get_async_firestore_client()
+
+    def _collection(self, collection: str):
+        return firebase.get_async_firestore_client().collection(collection)
+
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        snapshot = await self._collection(collection).document(doc_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    async def get_many(self, collection: str,
+                       doc_ids: Iterable[str]) -> Dict[str, dict]:
+        return await firebase.get_documents_by_ids(collection, doc_ids)
+
+    async def create(self, collection: str, data: dict,
+                     id_field: Optional[str] = None) -> str:
+        doc_ref = self._collection(collection).document()
+        if id_field:
+            data[id_field] = doc_ref.id
+        await doc_ref.set(data)
+        return doc_ref.id
+
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        await self._collection(collection).document(doc_id).set(data)
+
+    async def update(self, collection: str, doc_id: str, data: dict,
+                     pre_image: Optional[dict] = None) -> dict:
+        return await firebase.update_and_merge(
+            self._collection(collection).document(doc_id), data, pre_image)
+
+    async def mutate(self, collection: str, doc_id: str,
+                     mutation: Mutation) -> dict:
+        return await firebase.mutate_and_merge(
+            self._collection(collection).document(doc_id), mutation)
+
+    async def delete(self, collection: str, doc_id: str) -> None:
+        await self._collection(collection).document(doc_id).delete()
+
+    def stream(self, collection: str,
+               filters: Iterable[Filter] = (),
+               limit: Optional[int] = None,
+               start_after: Optional[str] = None,
+               fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+        query = self._collection(collection)
+        for field_name, op, value in filters:
+            query = query.where(field_name, op, value)
+        if fields is not None and not fields:
+            # An empty projection would return every field.
+            fields = ["__name__"]
+        return firebase.stream_documents(query, limit, start_after, fields)
+
+    async def bulk_create(self, collection: str, documents: List[dict],
+                          id_field: Optional[str] = None) -> BulkWriteResult:
+        return await firebase.bulk_create(collection, documents, id_field)
+
+    async def bulk_set(self, collection: str,
+                       documents: List[Tuple[str, dict]]) -> BulkWriteResult:
+        return await firebase.bulk_set(collection, documents)
+
+    async def bulk_update(self, collection: str,
+                          updates: List[Tuple[str, dict]]) -> BulkWriteResult:
+        return await firebase.bulk_update(collection, updates)
+
+    async def bulk_delete(self, collection: str,
+                          doc_ids: List[str]) -> BulkWriteResult:
+        return await firebase.bulk_delete(collection, doc_ids)
+
+    def watch(self, collection: str,
+              on_change: Callable[[str], None]) -> Optional[Callable[[], None]]:
+        """
+        Listen to the collection's change events. The async client has no
+        listeners, so this uses the synchronous client.
+
+        The first snapshot lists every existing document and is skipped;
+        later snapshots carry only the documents that changed.
+        """
+        initial = [True]
+
+        def on_snapshot(_docs, changes, _read_time):
+            if initial[0]:
+                initial[0] = False
+                return
+            for change in changes:
+                on_change(change.document.id)
+
+        watch = firebase.get_firestore_client().collection(
+            collection).on_snapshot(on_snapshot)
+        return watch.unsubscribe
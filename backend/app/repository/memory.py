@@ -0,0 +1,166 @@
+# repository/memory.py
+import copy
+from collections import defaultdict
+from typing import (AsyncIterator, Callable, Dict, Hashable, Iterable, List,
+                    Optional, Set, Tuple)
+from google.cloud.exceptions import NotFound
+from app.repository.base import (
+    INDEXED_FIELDS,
+    BulkWriteResult,
+    Filter,
+    Mutation,
+    Repository,
+    apply_mutation,
+    apply_update,
+    matches,
+    new_id,
+    project,
+)
+
+
+class MemoryRepository(Repository):
+    """
+    Repository that keeps every document in process memory, for tests, load
+    tests and demos. Nothing is persisted.
+
+    Equality filters on INDEXED_FIELDS are answered from per-field indexes
+    instead of scanning the collection.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, dict]] = defaultdict(dict)
+        # (collection, field) -> value -> IDs of the documents with it
+        self._indexes: Dict[Tuple[str, str], Dict[Hashable, Set[str]]] = (
+            defaultdict(lambda: defaultdict(set)))
+
+    def _index(self, collection: str, doc_id: str, data: dict,
+               add: bool) -> None:
+        for field_name in INDEXED_FIELDS:
+            value = data.get(field_name)
+            if value is None or not isinstance(value, Hashable):
+                continue
+            ids = self._indexes[(collection, field_name)][value]
+            if add:
+                ids.add(doc_id)
+            else:
+                ids.discard(doc_id)
+
+    def _write(self, collection: str, doc_id: str, data: dict) -> None:
+        documents = self._collections[collection]
+        if doc_id in documents:
+            self._index(collection, doc_id, documents[doc_id], add=False)
+        documents[doc_id] = copy.deepcopy(data)
+        self._index(collection, doc_id, data, add=True)
+
+    def _remove(self, collection: str, doc_id: str) -> None:
+        data = self._collections[collection].pop(doc_id, None)
+        if data is not None:
+            self._index(collection, doc_id, data, add=False)
+
+    def _change(self, collection: str, doc_id: str,
+                change: Callable[[dict], dict]) -> dict:
+        current = self._collections[collection].get(doc_id)
+        if current is None:
+            raise NotFound(f"No document to update: {collection}/{doc_id}")
+        updated = change(current)
+        self._write(collection, doc_id, updated)
+        return copy.deepcopy(updated)
+
+    def _update(self, collection: str, doc_id: str, data: dict) -> dict:
+        return self._change(collection, doc_id,
+                            lambda current: apply_update(current, data))
+
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        data = self._collections[collection].get(doc_id)
+        return copy.deepcopy(data) if data is not None else None
+
+    async def get_many(self, collection: str,
+                       doc_ids: Iterable[str]) -> Dict[str, dict]:
+        documents = self._collections[collection]
+        return {
+            doc_id: copy.deepcopy(documents[doc_id])
+            for doc_id in doc_ids if doc_id in documents
+        }
+
+    async def create(self, collection: str, data: dict,
+                     id_field: Optional[str] = None) -> str:
+        doc_id = new_id()
+        if id_field:
+            data[id_field] = doc_id
+        self._write(collection, doc_id, data)
+        return doc_id
+
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        self._write(collection, doc_id, data)
+
+    async def update(self, collection: str, doc_id: str, data: dict,
+                     pre_image: Optional[dict] = None) -> dict:
+        return self._update(collection, doc_id, data)
+
+    async def mutate(self, collection: str, doc_id: str,
+                     mutation: Mutation) -> dict:
+        return self._change(collection, doc_id,
+                            lambda current: apply_mutation(current, mutation))
+
+    async def delete(self, collection: str, doc_id: str) -> None:
+        self._remove(collection, doc_id)
+
+    def _candidates(self, collection: str, filters: List[Filter]):
+        for field_name, op, value in filters:
+            # None is not indexed, so == None scans the collection.
+            if (op == "==" and field_name in INDEXED_FIELDS
+                    and value is not None and isinstance(value, Hashable)):
+                return set(self._indexes[(collection, field_name)].get(
+                    value, ()))
+        return self._collections[collection].keys()
+
+    async def stream(self, collection: str,
+                     filters: Iterable[Filter] = (),
+                     limit: Optional[int] = None,
+                     start_after: Optional[str] = None,
+                     fields: Optional[List[str]] = None
+                     ) -> AsyncIterator[dict]:
+        filters = list(filters)
+        documents = self._collections[collection]
+        doc_ids = sorted(self._candidates(collection, filters))
+        count = 0
+        for doc_id in doc_ids:
+            if start_after is not None and doc_id <= start_after:
+                continue
+            data = documents.get(doc_id)
+            if data is None or not matches(data, filters):
+                continue
+            yield {**copy.deepcopy(project(data, fields)), "id": doc_id}
+            count += 1
+            if limit and count >= limit:
+                return
+
+    async def bulk_create(self, collection: str, documents: List[dict],
+                          id_field: Optional[str] = None) -> BulkWriteResult:
+        return BulkWriteResult(ids=[
+            await self.create(collection, data, id_field) for data in documents
+        ])
+
+    async def bulk_set(self, collection: str,
+                       documents: List[Tuple[str, dict]]) -> BulkWriteResult:
+        for doc_id, data in documents:
+            self._write(collection, doc_id, data)
+        return BulkWriteResult(ids=[doc_id for doc_id, _ in documents])
+
+    async def bulk_update(self, collection: str,
+                          updates: List[Tuple[str, dict]]) -> BulkWriteResult:
+        result = BulkWriteResult(ids=[doc_id for doc_id, _ in updates])
+        for position, (doc_id, data) in enumerate(updates):
+            try:
+                self._update(collection, doc_id, data)
+            except NotFound as e:
+                result.errors[position] = str(e)
+        return result
+
+    async def bulk_delete(self, collection: str,
+                          doc_ids: List[str]) -> BulkWriteResult:
+        for doc_id in doc_ids:
+            self._remove(collection, doc_id)
+        return BulkWriteResult(ids=list(doc_ids))
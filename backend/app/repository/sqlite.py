@@ -0,0 +1,292 @@
+# repository/sqlite.py
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import (AsyncIterator, Callable, Dict, Iterable, List, Optional,
+                    Tuple)
+from google.cloud.exceptions import NotFound
+from app.repository.base import (
+    INDEXED_FIELDS,
+    BulkWriteResult,
+    Filter,
+    Mutation,
+    Repository,
+    apply_mutation,
+    apply_update,
+    new_id,
+    project,
+    value_kind,
+)
+
+# Datetimes are stored as {"__datetime__": "<UTC ISO 8601>"}, in a fixed
+# format so that range filters can compare them as strings.
+_DATETIME_KEY = "__datetime__"
+_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f+00:00"
+_OPERATORS = ("==", "<", "<=", ">", ">=")
+# The json_type() results of each kind of filter value (see value_kind).
+_JSON_TYPES = {
+    "boolean": ("true", "false"),
+    "number": ("integer", "real"),
+    "str": ("text",),
+}
+
+
+def _encode_datetime(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime(_DATETIME_FORMAT)
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return {_DATETIME_KEY: _encode_datetime(value)}
+    raise TypeError(f"Cannot store {type(value).__name__} in SQLite")
+
+
+def _object_hook(value: dict):
+    if len(value) == 1 and _DATETIME_KEY in value:
+        return datetime.fromisoformat(value[_DATETIME_KEY])
+    return value
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, default=_default, separators=(",", ":"))
+
+
+def _loads(text: str) -> dict:
+    return json.loads(text, object_hook=_object_hook)
+
+
+def _field_path(field_name: str) -> str:
+    # Field names are quoted so that names with dots are not read as paths.
+    return '$."' + field_name.replace('"', '\\"') + '"'
+
+
+class SQLiteRepository(Repository):
+    """
+    Repository stored in a local SQLite database, for small self-hosted
+    deployments and offline load tests.
+
+    Documents are kept as JSON in one table keyed by (collection, id), with
+    expression indexes on INDEXED_FIELDS so that the equality queries of the
+    list routes are index lookups. Reads are a local function call, so they
+    run on the event loop rather than in a thread.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        if path != ":memory:":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False,
+                                           isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " collection TEXT NOT NULL,"
+                " id TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " PRIMARY KEY (collection, id)"
+                ") WITHOUT ROWID")
+            for field_name in INDEXED_FIELDS:
+                self._connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS documents_{field_name} "
+                    f"ON documents (collection, "
+                    f"json_extract(data, '{_field_path(field_name)}'), id)")
+
+    def _select(self, collection: str, doc_id: str) -> Optional[dict]:
+        row = self._connection.execute(
+            "SELECT data FROM documents WHERE collection = ? AND id = ?",
+            (collection, doc_id)).fetchone()
+        return _loads(row[0]) if row else None
+
+    def _put(self, collection: str, doc_id: str, data: dict) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO documents (collection, id, data) "
+            "VALUES (?, ?, ?)", (collection, doc_id, _dumps(data)))
+
+    def _transaction(self, write):
+        self._connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = write()
+            self._connection.execute("COMMIT")
+            return result
+        except Exception:
+            self._connection.execute("ROLLBACK")
+            raise
+
+    def _change(self, collection: str, doc_id: str,
+                change: Callable[[dict], dict]) -> dict:
+        current = self._select(collection, doc_id)
+        if current is None:
+            raise NotFound(f"No document to update: {collection}/{doc_id}")
+        updated = change(current)
+        self._put(collection, doc_id, updated)
+        return updated
+
+    def _update(self, collection: str, doc_id: str, data: dict) -> dict:
+        return self._change(collection, doc_id,
+                            lambda current: apply_update(current, data))
+
+    async def get(self, collection: str, doc_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._select(collection, doc_id)
+
+    async def get_many(self, collection: str,
+                       doc_ids: Iterable[str]) -> Dict[str, dict]:
+        doc_ids = list(dict.fromkeys(doc_ids))
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters.
+            for start in range(0, len(doc_ids), 500):
+                chunk = doc_ids[start:start + 500]
+                rows = self._connection.execute(
+                    "SELECT id, data FROM documents WHERE collection = ? "
+                    f"AND id IN ({','.join('?' * len(chunk))})",
+                    (collection, *chunk))
+                found.update((doc_id, _loads(data)) for doc_id, data in rows)
+        return found
+
+    async def create(self, collection: str, data: dict,
+                     id_field: Optional[str] = None) -> str:
+        doc_id = new_id()
+        if id_field:
+            data[id_field] = doc_id
+        with self._lock:
+            self._put(collection, doc_id, data)
+        return doc_id
+
+    async def set(self, collection: str, doc_id: str, data: dict) -> None:
+        with self._lock:
+            self._put(collection, doc_id, data)
+
+    async def update(self, collection: str, doc_id: str, data: dict,
+                     pre_image: Optional[dict] = None) -> dict:
+        with self._lock:
+            return self._update(collection, doc_id, data)
+
+    async def mutate(self, collection: str, doc_id: str,
+                     mutation: Mutation) -> dict:
+        # The read and the write share one transaction, so other processes
+        # using the database cannot write in between either.
+        with self._lock:
+            return self._transaction(lambda: self._change(
+                collection, doc_id,
+                lambda current: apply_mutation(current, mutation)))
+
+    async def delete(self, collection: str, doc_id: str) -> None:
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM documents WHERE collection = ? AND id = ?",
+                (collection, doc_id))
+
+    async def stream(self, collection: str,
+                     filters: Iterable[Filter] = (),
+                     limit: Optional[int] = None,
+                     start_after: Optional[str] = None,
+                     fields: Optional[List[str]] = None
+                     ) -> AsyncIterator[dict]:
+        filters = list(filters)
+        # Without ANALYZE statistics the planner prefers the primary key for
+        # "id > ?" and scans the collection, so the index is named.
+        indexed = next((field_name for field_name, op, _ in filters
+                        if op == "==" and field_name in INDEXED_FIELDS), None)
+        sql = [
+            "SELECT id, data FROM documents",
+            f"INDEXED BY documents_{indexed}" if indexed else "",
+            "WHERE collection = ?",
+        ]
+        params = [collection]
+        for field_name, op, value in filters:
+            if op not in _OPERATORS:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            path = _field_path(field_name)
+            if value is None:
+                if op != "==":
+                    sql.append("AND 0")
+                    continue
+                sql.append(f"AND json_type(data, '{path}') = 'null'")
+                continue
+            if isinstance(value, datetime):
+                path += f'."{_DATETIME_KEY}"'
+                value = _encode_datetime(value)
+            # SQLite orders numbers before text and stores booleans as 1
+            # and 0; like Firestore, only values of the same kind match.
+            if value_kind(value) not in _JSON_TYPES:
+                raise ValueError(
+                    f"Unsupported filter value: {type(value).__name__}")
+            kinds = "', '".join(_JSON_TYPES[value_kind(value)])
+            sql.append(f"AND json_type(data, '{path}') IN ('{kinds}') "
+                       f"AND json_extract(data, '{path}') "
+                       f"{'=' if op == '==' else op} ?")
+            params.append(value)
+        if start_after is not None:
+            sql.append("AND id > ?")
+            params.append(start_after)
+        sql.append("ORDER BY id")
+        if limit:
+            sql.append("LIMIT ?")
+            params.append(limit)
+        with self._lock:
+            rows = self._connection.execute(" ".join(sql), params).fetchall()
+        for doc_id, data in rows:
+            yield {**project(_loads(data), fields), "id": doc_id}
+
+    async def bulk_create(self, collection: str, documents: List[dict],
+                          id_field: Optional[str] = None) -> BulkWriteResult:
+        result = BulkWriteResult(ids=[new_id() for _ in documents])
+
+        def write():
+            for doc_id, data in zip(result.ids, documents):
+                if id_field:
+                    data[id_field] = doc_id
+                self._put(collection, doc_id, data)
+
+        with self._lock:
+            self._transaction(write)
+        return result
+
+    async def bulk_set(self, collection: str,
+                       documents: List[Tuple[str, dict]]) -> BulkWriteResult:
+
+        def write():
+            for doc_id, data in documents:
+                self._put(collection, doc_id, data)
+
+        with self._lock:
+            self._transaction(write)
+        return BulkWriteResult(ids=[doc_id for doc_id, _ in documents])
+
+    async def bulk_update(self, collection: str,
+                          updates: List[Tuple[str, dict]]) -> BulkWriteResult:
+        result = BulkWriteResult(ids=[doc_id for doc_id, _ in updates])
+
+        def write():
+            for position, (doc_id, data) in enumerate(updates):
+                try:
+                    self._update(collection, doc_id, data)
+                except NotFound as e:
+                    result.errors[position] = str(e)
+
+        with self._lock:
+            self._transaction(write)
+        return result
+
+    async def bulk_delete(self, collection: str,
+                          doc_ids: List[str]) -> BulkWriteResult:
+        with self._lock:
+            self._transaction(lambda: self._connection.executemany(
+                "DELETE FROM documents WHERE collection = ? AND id = ?",
+                [(collection, doc_id) for doc_id in doc_ids]))
+        return BulkWriteResult(ids=list(doc_ids))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,161 @@
+# services/ai_scheduler.py
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict
+from app.core import metrics
+
+
+class SchedulerOverloaded(Exception):
+    """
+    Raised when a model call is shed instead of queued.
+
+    Attributes:
+        status_code (int): 429 when the caller's own queue is full, 503 when
+            the whole service is saturated.
+        retry_after (int): Suggested seconds to wait before retrying.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class FairScheduler:
+    """
+    Caps concurrent model calls and hands free slots to waiting callers
+    round-robin by fairness key (campaign or user), so one busy campaign
+    cannot starve the others.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = 8,
+                 max_queue_depth: int = 64,
+                 max_queue_per_key: int = 8):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_queue_per_key = max_queue_per_key
+        self._active = 0
+        self._queued = 0
+        # Fairness keys with waiters, in round-robin order.
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        # Moving average of slot hold time, used for Retry-After estimates.
+        self._avg_hold_seconds = 1.0
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    def _retry_after(self) -> int:
+        backlog = self._queued + 1
+        return max(
+            1,
+            math.ceil(self._avg_hold_seconds * backlog /
+                      max(1, self.max_concurrency)))
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrency and self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            self._queued -= 1
+            if waiter.done():
+                continue
+            self._active += 1
+            waiter.set_result(None)
+
+    def _remove_waiter(self, key: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._queued -= 1
+        if not queue:
+            del self._queues[key]
+
+    async def acquire(self, key: str) -> float:
+        """
+        Wait for a generation slot.
+
+        Args:
+            key (str): The fairness key, e.g. a campaign or user ID.
+
+        Returns:
+            float: Seconds spent queued.
+
+        Raises:
+            SchedulerOverloaded: If the queue for `key` or the global queue is
+                full.
+        """
+        if self._active < self.max_concurrency and not self._queues:
+            self._active += 1
+            return 0.0
+        if self._queued >= self.max_queue_depth:
+            metrics.increment("ai.scheduler.shed_global")
+            raise SchedulerOverloaded("AI service is at capacity",
+                                      status_code=503,
+                                      retry_after=self._retry_after())
+        queue = self._queues.get(key)
+        if queue is not None and len(queue) >= self.max_queue_per_key:
+            metrics.increment("ai.scheduler.shed_per_key")
+            raise SchedulerOverloaded("Too many pending AI requests",
+                                      status_code=429,
+                                      retry_after=self._retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(key, deque()).append(waiter)
+        self._queued += 1
+        started = time.perf_counter()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we were cancelled.
+                self.release(0.0)
+            else:
+                self._remove_waiter(key, waiter)
+            raise
+        return time.perf_counter() - started
+
+    def release(self, held_seconds: float) -> None:
+        """
+        Return a slot and wake the next waiter in round-robin order.
+        """
+        self._active -= 1
+        if held_seconds:
+            self._avg_hold_seconds = (0.8 * self._avg_hold_seconds +
+                                      0.2 * held_seconds)
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, key: str):
+        """
+        Hold a generation slot for the duration of the block, recording
+        queue wait and generation time histograms.
+        """
+        waited = await self.acquire(key)
+        metrics.observe("ai.queue_wait_ms", waited * 1000)
+        started = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            held = time.perf_counter() - started
+            metrics.observe("ai.generation_ms", held * 1000)
+            self.release(held)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self._active,
+            "queued": self._queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue_depth": self.max_queue_depth,
+        }
@@ -1,8 +1,77 @@
-from app.models.ai_client import AIModelClient
+import asyncio
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from app.models.ai_client import AIModelClient, Completion
+from app.models.context_manager import (
+    ContextManager,
+    ContextWindow,
+    count_tokens,
+)
 from app.core.config import get_settings
+from app.core import metrics
+from app.db.schemas import Message, ModelResponse
+from app.services.ai_scheduler import FairScheduler
+from app.services.session_service import get_session, update_session_summary
+from app.services.lore_index import (
+    index_character,
+    index_item,
+    index_world,
+    lore_index,
+)
+from app.services.world_service import get_world
+from app.services.item_service import get_items_by_world
+from app.services.character_service import get_characters_in_world
+from app.services.campaign_service import get_campaign
+from app.services.campaign_events import get_synced_memory
+from app.services.campaign_memory import loaded_campaign_memory
 
 settings = get_settings()
 
+# How often an in-flight generation checks whether its client went away.
+DISCONNECT_POLL_INTERVAL = 0.25
+
+
+class GenerationCancelled(Exception):
+    """Raised when a generation is aborted because the client disconnected."""
+
+
+class _InFlightGeneration:
+    """A provider call shared by every request with the same prompt key."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+# Provider calls currently running, keyed by response cache key.
+_in_flight: Dict[str, _InFlightGeneration] = {}
+
+
+def _join_in_flight(key: str, start: Callable[[], Awaitable[str]],
+                    coalesce: bool = True) -> _InFlightGeneration:
+    """
+    Attach to the running generation for `key`, or start one.
+
+    Concurrent identical requests (a whole table pressing "continue", a
+    double-submitted form) therefore share a single provider call.
+    """
+    entry = _in_flight.get(key) if coalesce else None
+    if entry is None or entry.task.done():
+        entry = _InFlightGeneration(asyncio.ensure_future(start()))
+        if coalesce:
+            _in_flight[key] = entry
+
+            def _forget(_task, entry=entry):
+                if _in_flight.get(key) is entry:
+                    del _in_flight[key]
+
+            entry.task.add_done_callback(_forget)
+    else:
+        metrics.increment("ai.generations_coalesced")
+    entry.waiters += 1
+    return entry
+
 
 def init_model_client():
     """
@@ -15,10 +84,379 @@ def init_model_client():
             "Model name and provider must be set in the configuration.")
 
 
+_model_client: Optional[AIModelClient] = None
+_model_client_lock = threading.Lock()
+
+
+def get_model_client() -> AIModelClient:
+    """
+    Return the shared model client, creating it on first use so importing
+    this module stays cheap.
+    """
+    global _model_client
+    if _model_client is None:
+        with _model_client_lock:
+            if _model_client is None:
+                _model_client = init_model_client()
+    return _model_client
+
+
+def _response_cache_stats() -> Optional[dict]:
+    if _model_client is None or _model_client.cache is None:
+        return None
+    return _model_client.cache.stats()
+
+
+scheduler = FairScheduler(max_concurrency=settings.AI_MAX_CONCURRENCY,
+                          max_queue_depth=settings.AI_MAX_QUEUE_DEPTH,
+                          max_queue_per_key=settings.AI_MAX_QUEUE_PER_KEY)
+
+context_manager = ContextManager(
+    tokenizer_name=settings.TOKENIZER_NAME or settings.MODEL_NAME,
+    token_budget=settings.AI_CONTEXT_TOKEN_BUDGET,
+    summary_token_budget=settings.AI_SUMMARY_TOKEN_BUDGET)
+
+metrics.register_gauge("ai.scheduler", scheduler.stats)
+metrics.register_gauge("ai.response_cache", _response_cache_stats)
+
+
 def generate_response(prompt: str,
-                      client: AIModelClient = init_model_client(),
-                      history: list = []) -> str:
+                      client: Optional[AIModelClient] = None,
+                      history: list = [],
+                      bypass_cache: bool = False) -> str:
     """
     Generate a response from the AI model based on the prompt and conversation history.
     """
-    return client.generate(prompt, history)
+    client = client or get_model_client()
+    return client.generate(prompt, history, bypass_cache=bypass_cache)
+
+
+def _finish(stats: ModelResponse, started: float, tokenizer=None) -> None:
+    """
+    Fill in totals for a finished generation and record it in the metrics.
+    """
+    stats.latency_ms = int((time.perf_counter() - started) * 1000)
+    if stats.ttft_ms is None:
+        stats.ttft_ms = stats.latency_ms
+    if stats.completion_tokens is None:
+        stats.completion_tokens = count_tokens(stats.generated_text, tokenizer)
+    stats.tokens_used = (stats.prompt_tokens or 0) + stats.completion_tokens
+    metrics.increment(f"ai.cache_status.{stats.cache_status}")
+    metrics.observe("ai.latency_ms", stats.latency_ms)
+    metrics.observe("ai.ttft_ms", stats.ttft_ms)
+    metrics.observe("ai.prompt_tokens", stats.prompt_tokens or 0,
+                    metrics.TOKEN_BUCKETS)
+    metrics.observe("ai.completion_tokens", stats.completion_tokens,
+                    metrics.TOKEN_BUCKETS)
+
+
+async def generate_model_response(
+        prompt: str,
+        client: Optional[AIModelClient] = None,
+        history: list = [],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        bypass_cache: bool = False,
+        fairness_key: str = "anonymous",
+        prompt_tokens: Optional[int] = None) -> ModelResponse:
+    """
+    Generate a response without blocking the event loop, and measure it.
+
+    Args:
+        prompt (str): The user prompt.
+        client (AIModelClient): The model client to use.
+        history (list): The prior conversation messages.
+        is_disconnected (callable, optional): Async callable reporting whether
+            the requesting client has gone away. When it returns True the
+            in-flight provider call is cancelled, unless other requests are
+            still waiting on the same call.
+        bypass_cache (bool): Skip the response cache lookup and request
+            coalescing, e.g. for a "reroll" turn. The fresh completion still
+            replaces the cached one.
+        fairness_key (str): The campaign or user the call is queued under.
+        prompt_tokens (int, optional): Locally counted prompt size, used when
+            the provider does not report usage.
+
+    Returns:
+        ModelResponse: The generated text with timing, token and cache data.
+
+    Raises:
+        GenerationCancelled: If the client disconnected before completion.
+        SchedulerOverloaded: If the call was shed instead of queued.
+    """
+    client = client or get_model_client()
+    started = time.perf_counter()
+    stats = ModelResponse(generated_text="", prompt_tokens=prompt_tokens)
+    if not bypass_cache:
+        cached = await client.get_cached(prompt, history)
+        if cached is not None:
+            stats.generated_text = cached
+            stats.queue_ms = 0
+            stats.cache_status = "hit"
+            _finish(stats, started, await context_manager.load_tokenizer())
+            return stats
+
+    async def scheduled_generate():
+        async with scheduler.slot(fairness_key) as waited:
+            slot_started = time.perf_counter()
+            # The cache was checked above; only write the result back.
+            completion = await client.acomplete(prompt,
+                                                history,
+                                                bypass_cache=True)
+            return (completion, waited,
+                    time.perf_counter() - slot_started)
+
+    key = client.cache_key(client.format_messages(prompt, history))
+    entry = _join_in_flight(key,
+                            scheduled_generate,
+                            coalesce=not bypass_cache)
+    stats.cache_status = ("bypass" if bypass_cache else
+                          "miss" if entry.waiters == 1 else "coalesced")
+    try:
+        while True:
+            done, _ = await asyncio.wait({entry.task},
+                                         timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                completion, waited, generation_seconds = entry.task.result()
+                break
+            if is_disconnected is not None and await is_disconnected():
+                metrics.increment("ai.generations_cancelled")
+                raise GenerationCancelled("Client disconnected")
+    except asyncio.CancelledError:
+        metrics.increment("ai.generations_cancelled")
+        raise
+    finally:
+        entry.waiters -= 1
+        if entry.waiters == 0 and not entry.task.done():
+            entry.task.cancel()
+
+    stats.generated_text = completion.content
+    stats.queue_ms = int(waited * 1000)
+    stats.ttft_ms = stats.queue_ms + int(generation_seconds * 1000)
+    stats.prompt_tokens = completion.prompt_tokens or prompt_tokens
+    stats.completion_tokens = completion.completion_tokens
+    _finish(stats, started, await context_manager.load_tokenizer())
+    return stats
+
+
+async def generate_response_async(
+        prompt: str,
+        client: Optional[AIModelClient] = None,
+        history: list = [],
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        bypass_cache: bool = False,
+        fairness_key: str = "anonymous") -> str:
+    """
+    Generate a response without blocking the event loop.
+
+    Takes the same arguments as `generate_model_response` and returns only
+    the generated text.
+    """
+    response = await generate_model_response(prompt,
+                                             client=client,
+                                             history=history,
+                                             is_disconnected=is_disconnected,
+                                             bypass_cache=bypass_cache,
+                                             fairness_key=fairness_key)
+    return response.generated_text
+
+
+async def stream_response(
+    prompt: str,
+    client: Optional[AIModelClient] = None,
+    history: list = [],
+    is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+    bypass_cache: bool = False,
+    fairness_key: str = "anonymous",
+    stats: Optional[ModelResponse] = None
+) -> AsyncIterator[str]:
+    """
+    Stream the response from the AI model token by token.
+
+    Cached completions are yielded without taking a scheduler slot. The
+    upstream stream is closed as soon as the client disconnects or the
+    consumer stops iterating, so the provider stops generating tokens.
+
+    If `stats` is given, it is filled with the streamed text, timings, token
+    usage and cache status once the stream completes.
+    """
+    client = client or get_model_client()
+    started = time.perf_counter()
+    stats = stats if stats is not None else ModelResponse(generated_text="")
+    if not bypass_cache:
+        cached = await client.get_cached(prompt, history)
+        if cached is not None:
+            stats.generated_text = cached
+            stats.queue_ms = 0
+            stats.cache_status = "hit"
+            _finish(stats, started, await context_manager.load_tokenizer())
+            yield cached
+            return
+
+    stats.cache_status = "bypass" if bypass_cache else "miss"
+    completion = Completion()
+    async with scheduler.slot(fairness_key) as waited:
+        stats.queue_ms = int(waited * 1000)
+        stream = client.stream(prompt,
+                               history,
+                               bypass_cache=True,
+                               completion=completion)
+        try:
+            async for token in stream:
+                if stats.ttft_ms is None:
+                    stats.ttft_ms = int(
+                        (time.perf_counter() - started) * 1000)
+                if is_disconnected is not None and await is_disconnected():
+                    metrics.increment("ai.generations_cancelled")
+                    return
+                yield token
+        except (asyncio.CancelledError, GeneratorExit):
+            metrics.increment("ai.generations_cancelled")
+            raise
+        finally:
+            await stream.aclose()
+    stats.generated_text = completion.content
+    stats.prompt_tokens = completion.prompt_tokens or stats.prompt_tokens
+    stats.completion_tokens = completion.completion_tokens
+    _finish(stats, started, await context_manager.load_tokenizer())
+
+
+async def load_world_lore(world_id: str) -> None:
+    """
+    Index a world's areas, POIs, items and characters the first time it is
+    used in a prompt. Later changes reach the index through the services'
+    write paths.
+    """
+    if lore_index.is_world_loaded(world_id):
+        return
+    world, items, characters = await asyncio.gather(
+        get_world(world_id), get_items_by_world(world_id),
+        get_characters_in_world(world_id))
+    if world is None:
+        return
+    index_world(world_id, world)
+    for item in items:
+        index_item(item.id, {**item.model_dump(), "world_id": world_id})
+    for character in characters:
+        index_character(character["id"], character)
+    lore_index.mark_world_loaded(world_id)
+
+
+async def retrieve_lore(prompt: str, world_id: str) -> Optional[Message]:
+    """
+    Build a system message with the lore most relevant to `prompt`, within
+    the lore token budget, or None if nothing matches.
+    """
+    await load_world_lore(world_id)
+    tokenizer = await context_manager.load_tokenizer()
+    snippets = lore_index.search(
+        prompt,
+        k=settings.AI_LORE_TOP_K,
+        token_budget=settings.AI_LORE_TOKEN_BUDGET,
+        world_id=world_id,
+        count_tokens=lambda text: count_tokens(text, tokenizer))
+    if not snippets:
+        return None
+    lore = "\n".join(f"- {snippet.render()}" for snippet in snippets)
+    return Message(role="system", content=f"Relevant lore:\n{lore}")
+
+
+async def retrieve_memories(prompt: str,
+                            campaign_id: str) -> Optional[Message]:
+    """
+    Build a system message with the past campaign events most similar to
+    `prompt`, within the memory token budget, or None if there are none or
+    the campaign does not exist.
+    """
+    memory = loaded_campaign_memory(campaign_id)
+    if memory is None or not memory.synced:
+        # The memory is only created (and loaded from disk) for campaigns
+        # that exist.
+        if await get_campaign(campaign_id) is None:
+            return None
+        memory = await get_synced_memory(campaign_id)
+    tokenizer = await context_manager.load_tokenizer()
+    lines, used = [], 0
+    for _, event in memory.search(prompt, settings.AI_MEMORY_TOP_K):
+        line = f"- ({event.get('timestamp')}) {event.get('description', '')}"
+        cost = count_tokens(line, tokenizer)
+        if used + cost > settings.AI_MEMORY_TOKEN_BUDGET:
+            continue
+        used += cost
+        lines.append(line)
+    if not lines:
+        return None
+    return Message(role="system",
+                   content="Relevant past events:\n" + "\n".join(lines))
+
+
+async def build_context(prompt: str,
+                        history: List[Message] = [],
+                        session_id: Optional[str] = None,
+                        fairness_key: str = "anonymous",
+                        world_id: Optional[str] = None,
+                        campaign_id: Optional[str] = None) -> ContextWindow:
+    """
+    Trim the conversation history to the context token budget.
+
+    When a session is given, its stored messages are used as the history
+    and its rolling summary is extended with any turns that no longer fit,
+    then saved back to the session. When a world is given, the most relevant
+    lore snippets are added as well, and when a campaign is given, the most
+    relevant past events.
+
+    Args:
+        prompt (str): The new user prompt.
+        history (List[Message]): The conversation so far, oldest first.
+        session_id (str, optional): The GameSession the turn belongs to.
+        fairness_key (str): Scheduler key for any summarization calls.
+        world_id (str, optional): The world to retrieve lore from.
+        campaign_id (str, optional): The campaign to recall events from.
+
+    Returns:
+        ContextWindow: The messages to send with the prompt.
+
+    Raises:
+        ValueError: If the session does not exist, or both a history and a
+            session are given.
+    """
+    summary, summarized_message_count = None, 0
+    if session_id:
+        # The session's summary covers a prefix of its own messages, so it
+        # cannot be combined with another history.
+        if history:
+            raise ValueError("Pass either a history or a session, not both")
+        session = await get_session(session_id)
+        if session is None:
+            raise ValueError(f"Session {session_id} not found")
+        history = session.messages
+        summary = session.summary
+        summarized_message_count = session.summarized_message_count
+
+    retrieved = []
+    if world_id:
+        retrieved.append(await retrieve_lore(prompt, world_id))
+    if campaign_id:
+        retrieved.append(await retrieve_memories(prompt, campaign_id))
+    retrieved = [message for message in retrieved if message is not None]
+    reserved_tokens = 0
+    for message in retrieved:
+        reserved_tokens += await context_manager.count(message.content)
+
+    async def summarize(request: str) -> str:
+        return await generate_response_async(request,
+                                             fairness_key=fairness_key)
+
+    window = await context_manager.build(
+        prompt,
+        history,
+        summarize,
+        summary=summary,
+        summarized_message_count=summarized_message_count,
+        reserved_tokens=reserved_tokens)
+    position = 1 if window.summary else 0
+    window.messages[position:position] = retrieved
+    window.prompt_tokens += reserved_tokens
+    if session_id and window.summary_updated:
+        await update_session_summary(session_id, window.summary,
+                                     window.summarized_message_count)
+    return window
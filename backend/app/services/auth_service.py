@@ -1,5 +1,6 @@
 import requests
 from app.core.config import get_settings
+from app.core.firebase import get_firebase_app
 from firebase_admin import auth
 from fastapi import HTTPException, status, Depends
 
@@ -86,7 +87,7 @@ def verify_firebase_token(id_token: str):
     try:
         # Verify the ID token while checking if the token is revoked.
         # This confirms the token is valid and issued by Firebase for your project.
-        decoded_token = auth.verify_id_token(id_token)
+        decoded_token = auth.verify_id_token(id_token, app=get_firebase_app())
         # Token is valid and contains the user's UID and other claims.
         # You can access user info like decoded_token['uid'], decoded_token['email'] etc.
         return decoded_token
@@ -0,0 +1,394 @@
+# services/campaign_events.py
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from app.core import metrics
+from app.core.config import get_settings
+from app.db.campaign import CampaignEvent
+from app.repository import BulkWriteResult, get_repository
+from app.services.campaign_memory import (CampaignMemory, get_campaign_memory,
+                                          mark_stale)
+
+settings = get_settings()
+
+# Page size of the reads behind stream_events.
+READ_PAGE_SIZE = 500
+
+_KEY_FORMAT = "%Y%m%dT%H%M%S%fZ"
+
+
+def events_collection(campaign_id: str) -> str:
+    """
+    The path of a campaign's event log subcollection.
+    """
+    return f"campaigns/{campaign_id}/events"
+
+
+def _time_key(timestamp) -> str:
+    # Fixed-width UTC time, so that keys sort in time order.
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(timezone.utc).strftime(_KEY_FORMAT)
+
+
+def event_id(timestamp: datetime, suffix: Optional[str] = None) -> str:
+    """
+    The document ID of an event: its timestamp followed by a suffix that
+    keeps events of the same instant apart, random unless given.
+    """
+    return f"{_time_key(timestamp)}-{suffix or uuid.uuid4().hex[:8]}"
+
+
+def _event_data(event) -> dict:
+    if isinstance(event, CampaignEvent):
+        return event.model_dump()
+    return CampaignEvent(**event).model_dump()
+
+
+class EventBufferFull(Exception):
+    """
+    Raised when new events are refused because too many are waiting to be
+    written.
+
+    Attributes:
+        retry_after (int): Suggested seconds to wait before retrying.
+    """
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _remember(campaign_id: str, events: List[dict]) -> None:
+    # Embeds the events and appends them to the memory's files, so it runs
+    # in a worker thread.
+    get_campaign_memory(campaign_id).append(events)
+
+
+class EventBuffer:
+    """
+    Write-behind buffer of new campaign events.
+
+    Events are kept in memory and written with batched writes once
+    `max_events` are pending or `max_delay_ms` after the first one, so a
+    burst of events costs a few round-trips instead of one per event.
+    Flushes run one at a time; events whose write fails go back to the
+    front of the buffer and are retried `max_delay_ms` later. At most
+    `max_pending` events are held; add() refuses more.
+
+    Written events are added to the campaign's long-term memory, so the
+    memory never holds events the log does not.
+    """
+
+    def __init__(self, max_events: int, max_delay_ms: int,
+                 max_pending: int = 10000):
+        self.max_events = max_events
+        self.max_delay_ms = max_delay_ms
+        self.max_pending = max_pending
+        self._pending: Dict[str, List[Tuple[str, dict]]] = {}
+        self._count = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        # Scheduled flushes, referenced so they are not garbage collected.
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, campaign_id: str, entries: List[Tuple[str, dict]]) -> None:
+        """
+        Queue (event ID, data) pairs of one campaign for writing.
+
+        Raises:
+            EventBufferFull: If the entries would exceed `max_pending`.
+        """
+        if not entries:
+            return
+        if self._count + len(entries) > self.max_pending:
+            metrics.increment("campaign_events.refused", len(entries))
+            raise EventBufferFull(
+                f"{self._count} campaign events are waiting to be written",
+                retry_after=max(1, round(self.max_delay_ms / 1000)))
+        self._pending.setdefault(campaign_id, []).extend(entries)
+        self._count += len(entries)
+        if self._count >= self.max_events:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_delay_ms / 1000, self._schedule_flush)
+
+    def pending(self, campaign_id: str) -> List[Tuple[str, dict]]:
+        """
+        The (event ID, data) pairs of a campaign not written yet.
+        """
+        return list(self._pending.get(campaign_id, []))
+
+    def discard(self, campaign_id: str) -> int:
+        """
+        Drop a campaign's pending events, e.g. when it is deleted.
+        """
+        dropped = len(self._pending.pop(campaign_id, []))
+        self._count -= dropped
+        return dropped
+
+    def _schedule_flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _take(self, campaign_id: Optional[str]
+              ) -> Dict[str, List[Tuple[str, dict]]]:
+        if campaign_id is None:
+            taken, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        else:
+            taken = ({campaign_id: self._pending.pop(campaign_id)}
+                     if campaign_id in self._pending else {})
+        self._count -= sum(len(entries) for entries in taken.values())
+        return taken
+
+    async def flush(self, campaign_id: Optional[str] = None) -> int:
+        """
+        Write the pending events of one campaign, or of all of them.
+
+        Waits for a flush already in progress first, so once this returns
+        every event added before the call has been written (or failed).
+
+        Returns:
+            int: The number of events written.
+        """
+        async with self._flush_lock:
+            written = 0
+            for cid, entries in self._take(campaign_id).items():
+                try:
+                    result = await get_repository().bulk_set(
+                        events_collection(cid), entries)
+                except Exception as e:
+                    result = BulkWriteResult(
+                        ids=[doc_id for doc_id, _ in entries],
+                        errors={position: str(e)
+                                for position in range(len(entries))})
+                failed = [entries[position] for position in result.errors]
+                written += len(entries) - len(failed)
+                if failed:
+                    self._pending[cid] = failed + self._pending.get(cid, [])
+                    self._count += len(failed)
+                    metrics.increment("campaign_events.failed", len(failed))
+                stored = [{**data, "id": doc_id}
+                          for position, (doc_id, data) in enumerate(entries)
+                          if position not in result.errors]
+                if stored:
+                    # Still under the flush lock, so a read that flushes
+                    # first (stream_events) sees the log and the memory in
+                    # step.
+                    try:
+                        await asyncio.to_thread(_remember, cid, stored)
+                    except Exception:
+                        metrics.increment("campaign_events.memory_failed",
+                                          len(stored))
+                        mark_stale(cid)
+            if self._pending and self._timer is None:
+                # Retry what failed without waiting for another event.
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.max_delay_ms / 1000, self._schedule_flush)
+            metrics.increment("campaign_events.written", written)
+            return written
+
+    async def close(self) -> None:
+        """
+        Write everything still pending, e.g. at shutdown.
+        """
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+
+_buffer: Optional[EventBuffer] = None
+
+
+def _get_buffer() -> EventBuffer:
+    global _buffer
+    if _buffer is None:
+        _buffer = EventBuffer(settings.CAMPAIGN_EVENT_FLUSH_EVENTS,
+                              settings.CAMPAIGN_EVENT_FLUSH_MS,
+                              settings.CAMPAIGN_EVENT_MAX_PENDING)
+    return _buffer
+
+
+def record_events(campaign_id: str, events: list) -> List[str]:
+    """
+    Append events to a campaign's log without waiting for the write.
+
+    The events are written with the next flush of the buffer, which also
+    adds them to the campaign's long-term memory. Reads through
+    stream_events flush the campaign first and include the events that are
+    still pending if that fails.
+
+    Args:
+        campaign_id (str): The ID of the campaign.
+        events (list): CampaignEvent objects or dicts.
+
+    Returns:
+        List[str]: The new events' IDs, in the order given.
+
+    Raises:
+        EventBufferFull: If too many events are waiting to be written.
+    """
+    entries = []
+    for event in events:
+        data = _event_data(event)
+        entries.append((event_id(data["timestamp"]), data))
+    if not entries:
+        return []
+    _get_buffer().add(campaign_id, entries)
+    return [doc_id for doc_id, _ in entries]
+
+
+async def import_events(campaign_id: str, events: list) -> BulkWriteResult:
+    """
+    Write existing events (e.g. an old campaign's embedded history) to the
+    log at once, bypassing the buffer. The long-term memory picks them up
+    the next time it is used.
+
+    IDs are derived from each event's timestamp and position, so importing
+    the same events again overwrites them instead of adding copies.
+    """
+    entries = []
+    for position, event in enumerate(events):
+        # Stored events are kept as they are rather than re-validated.
+        data = dict(event)
+        entries.append((event_id(data["timestamp"], f"h{position:06d}"),
+                        data))
+    result = await get_repository().bulk_set(events_collection(campaign_id),
+                                             entries)
+    mark_stale(campaign_id)
+    return result
+
+
+async def flush_events(campaign_id: Optional[str] = None) -> int:
+    """
+    Write the buffered events of one campaign, or of all campaigns.
+    """
+    if _buffer is None:
+        return 0
+    return await _buffer.flush(campaign_id)
+
+
+def discard_events(campaign_id: str) -> int:
+    """
+    Drop the buffered events of a deleted campaign.
+    """
+    return _buffer.discard(campaign_id) if _buffer is not None else 0
+
+
+async def get_synced_memory(campaign_id: str) -> CampaignMemory:
+    """
+    Return a campaign's long-term memory, first adding the logged events it
+    is missing if it was just loaded or may have fallen behind. Callers
+    check that the campaign exists first.
+    """
+    memory = await asyncio.to_thread(get_campaign_memory, campaign_id)
+    if not memory.synced:
+        events = [event async for event in stream_events(campaign_id)]
+        await asyncio.to_thread(memory.sync_history, events)
+    return memory
+
+
+async def close_event_buffer() -> None:
+    """
+    Write every buffered event, e.g. at shutdown.
+    """
+    if _buffer is not None:
+        await _buffer.close()
+
+
+async def stream_events(campaign_id: str,
+                        since: Optional[datetime] = None,
+                        until: Optional[datetime] = None,
+                        limit: Optional[int] = None,
+                        start_after: Optional[str] = None,
+                        fields: Optional[List[str]] = None
+                        ) -> AsyncIterator[dict]:
+    """
+    Stream a campaign's events in timestamp order, with their IDs.
+
+    Event IDs start with the event's time, so the time range is a range of
+    IDs: the read starts after the later of `since` and the cursor, and
+    stops at the first ID at or past `until`, at most one page past the
+    range. Buffered events are written first; those whose write fails are
+    read from the buffer instead.
+
+    Args:
+        campaign_id (str): The ID of the campaign.
+        since (datetime, optional): Only events at or after this time.
+        until (datetime, optional): Only events before this time.
+        limit (int, optional): Maximum number of events.
+        start_after (str, optional): Return events after this event ID.
+        fields (List[str], optional): Only return these fields (and the
+            ID).
+    """
+    await flush_events(campaign_id)
+    bounds = [start_after, _time_key(since) if since else None]
+    cursor = max((bound for bound in bounds if bound), default=None)
+    upper = _time_key(until) if until else None
+    # Events whose write just failed are served from the buffer, merged
+    # into the stored ones in ID order.
+    pending = sorted(
+        ((doc_id, data)
+         for doc_id, data in (_buffer.pending(campaign_id) if _buffer else [])
+         if (cursor is None or doc_id > cursor) and (upper is None
+                                                     or doc_id < upper)),
+        key=lambda entry: entry[0],
+        reverse=True)
+
+    def pending_row():
+        doc_id, data = pending.pop()
+        if fields is not None:
+            data = {name: data[name] for name in fields if name in data}
+        return {**data, "id": doc_id}
+
+    async def merged():
+        async for row in _stored_events(campaign_id, cursor, upper, limit,
+                                        fields):
+            while pending and pending[-1][0] < row["id"]:
+                yield pending_row()
+            if pending and pending[-1][0] == row["id"]:
+                pending.pop()  # written after all
+            yield row
+        while pending:
+            yield pending_row()
+
+    count = 0
+    async for row in merged():
+        yield row
+        count += 1
+        if limit is not None and count >= limit:
+            return
+
+
+async def _stored_events(campaign_id: str, cursor: Optional[str],
+                         upper: Optional[str], limit: Optional[int],
+                         fields: Optional[List[str]]) -> AsyncIterator[dict]:
+    remaining = limit
+    while remaining is None or remaining > 0:
+        page_size = min(remaining or READ_PAGE_SIZE, READ_PAGE_SIZE)
+        rows = 0
+        async for row in get_repository().stream(
+                events_collection(campaign_id), (), page_size, cursor,
+                fields):
+            if upper is not None and row["id"] >= upper:
+                return
+            yield row
+            rows += 1
+            cursor = row["id"]
+        if rows < page_size:
+            return
+        if remaining is not None:
+            remaining -= rows
\ No newline at end of file
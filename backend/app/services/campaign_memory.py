@@ -0,0 +1,294 @@
+# services/campaign_memory.py
+import json
+import os
+import re
+import threading
+import zlib
+from datetime import datetime
+from typing import List, Optional, Set, Tuple
+import numpy as np
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+
+settings = get_settings()
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+# Campaign IDs name the memory's files, so only plain IDs are accepted.
+CAMPAIGN_ID_PATTERN = r"^[A-Za-z0-9_-]+$"
+
+
+class HashingEmbedder:
+    """
+    Offline text embedding: word unigrams and character n-grams are hashed
+    into a fixed number of signed buckets and the result is L2-normalized.
+    Needs no model download and is stable across processes.
+    """
+
+    def __init__(self, dim: int = 512, ngram_range: Tuple[int, int] = (3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> List[str]:
+        words = _WORD_RE.findall(text.lower())
+        features = [f"w:{word}" for word in words]
+        low, high = self.ngram_range
+        for word in words:
+            padded = f" {word} "
+            for n in range(low, high + 1):
+                features.extend(f"c:{padded[i:i + n]}"
+                                for i in range(len(padded) - n + 1))
+        return features
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = zlib.crc32(feature.encode("utf-8"))
+            sign = 1.0 if digest & 0x80000000 else -1.0
+            vector[digest % self.dim] += sign
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector /= norm
+        return vector
+
+
+def _event_to_dict(event) -> dict:
+    if hasattr(event, "model_dump"):
+        event = event.model_dump()
+    event = dict(event)
+    timestamp = event.get("timestamp")
+    if isinstance(timestamp, datetime):
+        event["timestamp"] = timestamp.isoformat()
+    elif timestamp is not None and not isinstance(timestamp, str):
+        event["timestamp"] = str(timestamp)
+    return event
+
+
+class CampaignMemory:
+    """
+    Long-term memory of one campaign's history events.
+
+    Embeddings live in a contiguous float32 matrix that grows by doubling,
+    so appends are amortized O(1) and a query is a single matrix-vector
+    product. On disk the vectors and event metadata are append-only files,
+    so saving new events never rewrites old ones.
+
+    Events are keyed by their log ID ("id"), so storing an event twice is a
+    no-op and the memory can be brought up to date from the log in any
+    order. `synced` is False until that has happened once, and again after
+    a write the memory may have missed (see mark_stale).
+    """
+
+    def __init__(self, campaign_id: str, embedder: HashingEmbedder,
+                 directory: Optional[str] = None):
+        self.campaign_id = campaign_id
+        self.embedder = embedder
+        self.directory = directory
+        self.synced = False
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._vectors = np.zeros((16, embedder.dim), dtype=np.float32)
+        self._size = 0
+        self._events: List[dict] = []
+        self._ids: Set[str] = set()
+        if directory:
+            self._load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size
+
+    def __contains__(self, event_id: str) -> bool:
+        with self._lock:
+            return event_id in self._ids
+
+    def _paths(self):
+        base = os.path.join(self.directory, self.campaign_id)
+        return f"{base}.f32", f"{base}.jsonl"
+
+    def _embed(self, events: List[dict]) -> np.ndarray:
+        if not events:
+            return np.zeros((0, self.embedder.dim), dtype=np.float32)
+        return np.stack([
+            self.embedder.embed(event.get("description", ""))
+            for event in events
+        ]).astype(np.float32)
+
+    def _load(self) -> None:
+        vectors_path, events_path = self._paths()
+        if not os.path.exists(events_path):
+            return
+        events, ids, damaged = [], set(), False
+        with open(events_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    event = json.loads(line)
+                except ValueError:  # a partial write
+                    damaged = True
+                    continue
+                # Events saved without a log ID (by older versions) or twice
+                # are dropped; syncing with the log restores them.
+                if not event.get("id") or event["id"] in ids:
+                    damaged = True
+                    continue
+                ids.add(event["id"])
+                events.append(event)
+        vectors = None
+        if not damaged and os.path.exists(vectors_path):
+            vectors = np.fromfile(vectors_path, dtype=np.float32)
+            if vectors.size != len(events) * self.embedder.dim:
+                vectors = None  # dimension changed or partial write
+            else:
+                vectors = vectors.reshape(len(events), self.embedder.dim)
+        if vectors is None:
+            vectors = self._embed(events)
+            self._rewrite(events, vectors)
+        self._ensure_capacity(len(events))
+        self._vectors[:len(events)] = vectors
+        self._size = len(events)
+        self._events = events
+        self._ids = ids
+
+    def _rewrite(self, events: List[dict], vectors: np.ndarray) -> None:
+        # Replaces both files whole, so they line up again after a partial
+        # write.
+        vectors_path, events_path = self._paths()
+        vectors.tofile(vectors_path + ".tmp")
+        with open(events_path + ".tmp", "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+        os.replace(vectors_path + ".tmp", vectors_path)
+        os.replace(events_path + ".tmp", events_path)
+
+    def _ensure_capacity(self, needed: int) -> None:
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def append(self, events: list) -> int:
+        """
+        Embed and store the events this memory does not have yet,
+        persisting them if a directory is set.
+
+        Returns:
+            int: The number of events stored.
+
+        Raises:
+            ValueError: If an event has no log ID.
+        """
+        events = [_event_to_dict(event) for event in events]
+        if any(not event.get("id") for event in events):
+            raise ValueError("Campaign events need their log ID")
+        with self._lock:
+            known = set(self._ids)
+        new_events = []
+        for event in events:
+            if event["id"] not in known:
+                known.add(event["id"])
+                new_events.append(event)
+        if not new_events:
+            return 0
+        vectors = self._embed(new_events)
+        with self._lock:
+            # Skip events stored by another thread while embedding.
+            keep = [position for position, event in enumerate(new_events)
+                    if event["id"] not in self._ids]
+            new_events = [new_events[position] for position in keep]
+            vectors = vectors[keep]
+            if not new_events:
+                return 0
+            self._ensure_capacity(self._size + len(new_events))
+            self._vectors[self._size:self._size + len(new_events)] = vectors
+            self._size += len(new_events)
+            self._events.extend(new_events)
+            self._ids.update(event["id"] for event in new_events)
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+                vectors_path, events_path = self._paths()
+                with open(vectors_path, "ab") as f:
+                    vectors.tofile(f)
+                with open(events_path, "a", encoding="utf-8") as f:
+                    for event in new_events:
+                        f.write(json.dumps(event) + "\n")
+        return len(new_events)
+
+    def sync_history(self, history: list) -> int:
+        """
+        Store the events of `history`, the campaign's log, that this memory
+        does not have yet, and mark it as synced.
+
+        Returns:
+            int: The number of newly stored events.
+        """
+        with self._sync_lock:
+            self.synced = True
+            try:
+                return self.append(history)
+            except Exception:
+                self.synced = False
+                raise
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, dict]]:
+        """
+        Return the `k` events most similar to `query` by cosine similarity,
+        best first.
+        """
+        if k < 1:
+            return []
+        query_vector = self.embedder.embed(query)
+        with self._lock:
+            if not self._size or not query_vector.any():
+                return []
+            scores = self._vectors[:self._size] @ query_vector
+            k = min(k, self._size)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(float(scores[i]), self._events[i]) for i in top]
+
+
+_embedder = HashingEmbedder(dim=settings.CAMPAIGN_MEMORY_DIM)
+_memories = LRUCache(max_entries=settings.CAMPAIGN_MEMORY_MAX_LOADED)
+_memories_lock = threading.Lock()
+
+
+def get_campaign_memory(campaign_id: str) -> CampaignMemory:
+    """
+    Return the memory for a campaign, loading it from disk on first use.
+    Callers check that the campaign exists first.
+
+    Raises:
+        ValueError: If `campaign_id` is not a plain document ID.
+    """
+    if not re.match(CAMPAIGN_ID_PATTERN, campaign_id):
+        raise ValueError(f"Invalid campaign ID: {campaign_id!r}")
+    with _memories_lock:
+        memory = _memories.get(campaign_id)
+        if memory is None:
+            memory = CampaignMemory(campaign_id, _embedder,
+                                    settings.CAMPAIGN_MEMORY_DIR)
+            _memories.set(campaign_id, memory)
+        return memory
+
+
+def loaded_campaign_memory(campaign_id: str) -> Optional[CampaignMemory]:
+    """
+    Return the memory for a campaign if it is loaded, without loading it.
+    """
+    with _memories_lock:
+        return _memories.get(campaign_id)
+
+
+def mark_stale(campaign_id: str) -> None:
+    """
+    Note that a campaign's log has events its memory may have missed, e.g.
+    after an import or a failed append, so the next use syncs it again.
+    """
+    memory = loaded_campaign_memory(campaign_id)
+    if memory is not None:
+        memory.synced = False
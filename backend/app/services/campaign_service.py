@@ -1,14 +1,115 @@
 # services/campaign_service.py
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
+from app.core import metrics
 from app.db.campaign import Campaign, CampaignCreate
-from app.core.firebase import firebase_db
+from app.repository import Mutation, get_repository, unique_ids
 from datetime import datetime, timezone
 from google.cloud.exceptions import NotFound, GoogleCloudError
+from app.services.campaign_events import (discard_events, import_events,
+                                          record_events)
+from app.services.entity_cache import get_entity_cache
 
 COLLECTION_NAME = "campaigns"
+_cache = get_entity_cache(COLLECTION_NAME)
 
 
-def get_campaign(campaign_id: str) -> Optional[dict]:
+def _with_references(campaign: Optional[dict]) -> Optional[dict]:
+    """
+    Replace the worlds and characters that older campaign documents embed
+    with their IDs, so every campaign has the same reference-only shape.
+    Embedded characters are not typed, so they are listed as player
+    characters unless already on the roster.
+
+    Single reads also migrate the stored document (_move_references);
+    lists convert the rows they return in memory only.
+    """
+    if campaign is None or not ("worlds" in campaign
+                                or "characters" in campaign):
+        return campaign
+    campaign = dict(campaign)
+    worlds = campaign.pop("worlds", None) or []
+    characters = campaign.pop("characters", None) or []
+    campaign["world_ids"] = unique_ids(
+        (campaign.get("world_ids") or []) +
+        [world.get("id") for world in worlds if isinstance(world, dict)])
+    roster = set(campaign_character_ids(campaign))
+    campaign["player_character_ids"] = unique_ids(
+        (campaign.get("player_character_ids") or []) + [
+            character.get("id") for character in characters
+            if isinstance(character, dict)
+            and character.get("id") not in roster
+        ])
+    return campaign
+
+
+async def _references_only(rows: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    async for row in rows:
+        yield _with_references(row)
+
+
+async def _move_history(campaign_id: str, campaign: dict) -> dict:
+    """
+    Move the events that older campaign documents keep in a `history`
+    array to the campaign's event log, then empty the array. The import is
+    idempotent, so a move interrupted before the array is emptied is simply
+    repeated on a later read. A failure leaves the campaign as it is.
+    """
+    try:
+        result = await import_events(campaign_id, campaign["history"])
+        if result.errors:
+            raise Exception(next(iter(result.errors.values())))
+        return await get_repository().mutate(COLLECTION_NAME, campaign_id,
+                                             Mutation(set={"history": []}))
+    except Exception:
+        # The campaign is still served; the move is retried on a later read.
+        metrics.increment("campaign_events.history_move_failed")
+        return campaign
+
+
+async def _move_references(campaign_id: str, campaign: dict) -> dict:
+    """
+    Replace the worlds and characters that older campaign documents embed
+    with their IDs in storage, like _move_history: the IDs are added to the
+    reference lists and the embedded copies deleted in one write. Adding is
+    idempotent, so the move is simply repeated if it fails.
+    """
+    migrated = _with_references(campaign)
+    add = {}
+    for name in ("world_ids", "player_character_ids"):
+        stored = campaign.get(name) or []
+        ids = [doc_id for doc_id in migrated[name] if doc_id not in stored]
+        if ids:
+            add[name] = ids
+    delete = [name for name in ("worlds", "characters") if name in campaign]
+    try:
+        return await get_repository().mutate(
+            COLLECTION_NAME, campaign_id, Mutation(add=add, delete=delete))
+    except Exception:
+        # Served converted in memory; the move is retried on a later read.
+        metrics.increment("campaigns.reference_move_failed")
+        return campaign
+
+
+async def _fetch_campaign(campaign_id: str) -> Optional[dict]:
+    campaign = await get_repository().get(COLLECTION_NAME, campaign_id)
+    if campaign and campaign.get("history"):
+        campaign = await _move_history(campaign_id, campaign)
+    if campaign and ("worlds" in campaign or "characters" in campaign):
+        campaign = await _move_references(campaign_id, campaign)
+    return _with_references(campaign)
+
+
+def campaign_character_ids(campaign: dict) -> List[str]:
+    """
+    The IDs of a campaign's player characters followed by its active NPCs,
+    without repeats.
+    """
+    return unique_ids(
+        (campaign.get("player_character_ids") or []) +
+        (campaign.get("active_npc_character_ids") or []))
+
+
+async def get_campaign(campaign_id: str) -> Optional[dict]:
     """
     Retrieve a campaign by its ID.
 
@@ -23,13 +124,7 @@ def get_campaign(campaign_id: str) -> Optional[dict]:
         Exception: If there is a general error. 
     """
     try:
-        campaign_ref = firebase_db.collection(COLLECTION_NAME).document(
-            campaign_id)
-        campaign_doc = campaign_ref.get()
-        if campaign_doc.exists:
-            return campaign_doc.to_dict()
-        else:
-            return None
+        return await _cache.get(campaign_id, _fetch_campaign)
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching campaign: {db_error}")
@@ -38,12 +133,31 @@ def get_campaign(campaign_id: str) -> Optional[dict]:
             f"Unexpected error while fetching campaign: {general_error}")
 
 
-def get_all_campaigns_of_user(user_id: str) -> List[Campaign]:
+def stream_campaigns_of_user(
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+    """
+    Stream the campaigns owned by a specific user one document at a time.
+    Only `fields` (and the ID) are read when given.
+    """
+    return _references_only(get_repository().stream(
+        COLLECTION_NAME, [("user_id", "==", user_id)], limit, start_after,
+        fields))
+
+
+async def get_all_campaigns_of_user(
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None) -> List[Campaign]:
     """
     Fetch all campaigns owned by a specific user.
 
     Args:
         user_id (str): The user's ID.
+        limit (int, optional): Maximum number of campaigns to return.
+        start_after (str, optional): Return campaigns after this campaign ID.
 
     Returns:
         List[Campaign]: List of Campaign objects.
@@ -53,10 +167,10 @@ def get_all_campaigns_of_user(user_id: str) -> List[Campaign]:
         Exception: If there is a general error.
     """
     try:
-        docs = firebase_db.collection(COLLECTION_NAME).where(
-            "user_id", "==", user_id).get()
-        campaigns = [Campaign(id=doc.id, **doc.to_dict()) for doc in docs]
-        return campaigns
+        return [
+            Campaign(**doc) async for doc in stream_campaigns_of_user(
+                user_id, limit, start_after)
+        ]
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching campaigns for user: {db_error}")
@@ -66,7 +180,7 @@ def get_all_campaigns_of_user(user_id: str) -> List[Campaign]:
         )
 
 
-def create_campaign(campaign: CampaignCreate) -> str:
+async def create_campaign(campaign: CampaignCreate) -> str:
     """
     Create a new campaign.
 
@@ -81,14 +195,14 @@ def create_campaign(campaign: CampaignCreate) -> str:
         Exception: If there is a general error.    
     """
     try:
-        campaign_data = campaign.model_dump()
+        campaign_data = campaign.model_dump(exclude={"history"})
         campaign_data["created_at"] = datetime.now(timezone.utc)
         campaign_data["last_played_at"] = datetime.now(timezone.utc)
-        campaign_data["player_character_ids"] = []
-        campaign_data["active_npc_character_ids"] = []
-        campaign_ref = firebase_db.collection(COLLECTION_NAME).document()
-        campaign_ref.set(campaign_data)
-        return campaign_ref.id
+        campaign_id = await get_repository().create(COLLECTION_NAME,
+                                                    campaign_data)
+        _cache.set(campaign_id, campaign_data)
+        record_events(campaign_id, campaign.history)
+        return campaign_id
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while creating campaign: {db_error}")
@@ -97,7 +211,8 @@ def create_campaign(campaign: CampaignCreate) -> str:
             f"Unexpected error while creating campaign: {general_error}")
 
 
-def update_campaign(campaign_id: str, campaign: Campaign) -> Optional[dict]:
+async def update_campaign(campaign_id: str,
+                          campaign: Campaign) -> Optional[dict]:
     """
     Update an existing campaign.
 
@@ -114,15 +229,12 @@ def update_campaign(campaign_id: str, campaign: Campaign) -> Optional[dict]:
         Exception: If there is a general error.
     """
     try:
-        campaign_ref = firebase_db.collection(COLLECTION_NAME).document(
-            campaign_id)
         campaign_data = campaign.model_dump(exclude={"id"})
-        campaign_ref.update(campaign_data)
-        updated_doc = campaign_ref.get()
-        if updated_doc.exists:
-            return updated_doc.to_dict()
-        else:
-            return None
+        updated_campaign = _with_references(await get_repository().update(
+            COLLECTION_NAME, campaign_id, campaign_data,
+            _cache.peek(campaign_id)))
+        _cache.set(campaign_id, updated_campaign)
+        return updated_campaign
     except NotFound as not_found_error:
         raise NotFound(f"Campaign not found: {not_found_error}")
     except GoogleCloudError as db_error:
@@ -133,7 +245,39 @@ def update_campaign(campaign_id: str, campaign: Campaign) -> Optional[dict]:
             f"Unexpected error while updating campaign: {general_error}")
 
 
-def delete_campaign(campaign_id: str) -> bool:
+async def mutate_campaign(campaign_id: str, mutation: Mutation) -> dict:
+    """
+    Change fields of a campaign with one atomic write, e.g. add a character
+    to its roster. Concurrent changes of the same array are all kept.
+
+    Args:
+        campaign_id (str): The ID of the campaign to change.
+        mutation (Mutation): The field changes.
+
+    Returns:
+        dict: The updated campaign data, with its ID.
+
+    Raises:
+        NotFound: If the campaign does not exist.
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        updated_campaign = _with_references(await get_repository().mutate(
+            COLLECTION_NAME, campaign_id, mutation))
+        _cache.set(campaign_id, updated_campaign)
+        return {**updated_campaign, "id": campaign_id}
+    except NotFound as not_found_error:
+        raise NotFound(f"Campaign not found: {not_found_error}")
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while changing campaign: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while changing campaign: {general_error}")
+
+
+async def delete_campaign(campaign_id: str) -> bool:
     """
     Delete a campaign by its ID.
 
@@ -149,9 +293,9 @@ def delete_campaign(campaign_id: str) -> bool:
         Exception: If there is a general error.
     """
     try:
-        campaign_ref = firebase_db.collection(COLLECTION_NAME).document(
-            campaign_id)
-        campaign_ref.delete()
+        await get_repository().delete(COLLECTION_NAME, campaign_id)
+        _cache.invalidate(campaign_id)
+        discard_events(campaign_id)
         return True
     except NotFound as not_found_error:
         raise NotFound(f"Campaign not found: {not_found_error}")
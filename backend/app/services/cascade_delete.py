@@ -0,0 +1,170 @@
+# services/cascade_delete.py
+import asyncio
+import functools
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from app.core import metrics
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+from app.core.firebase import WRITE_BATCH_SIZE
+from app.repository import BulkWriteResult, get_repository
+from app.services import campaign_events, character_service, item_service
+
+settings = get_settings()
+
+# Errors kept per job; the counts in `failed` cover the rest.
+MAX_JOB_ERRORS = 20
+
+
+@dataclass
+class Dependent:
+    """
+    Documents that belong to a deleted parent: those in `collection` whose
+    `field` holds the parent's ID, or all of them for a subcollection of the
+    parent (`field` None), removed with `delete(ids)`. Progress is counted
+    under `name`.
+    """
+    name: str
+    collection: str
+    field: Optional[str]
+    delete: Callable[[List[str]], Awaitable[BulkWriteResult]]
+
+
+@dataclass
+class CascadeJob:
+    """
+    Progress of the background removal of a deleted document's dependents.
+    """
+    id: str
+    kind: str  # "world" or "campaign"
+    target_id: str
+    status: str = "pending"  # "running", "completed", "failed", "cancelled"
+    deleted: Dict[str, int] = field(default_factory=dict)
+    failed: Dict[str, int] = field(default_factory=dict)
+    errors: List[str] = field(default_factory=list)
+    created_at: datetime = field(
+        default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+_jobs = LRUCache(max_entries=settings.CASCADE_JOB_MAX_ENTRIES,
+                 ttl_seconds=settings.CASCADE_JOB_TTL_SECONDS)
+# Running jobs' tasks, referenced so they are not garbage collected.
+_tasks: Set[asyncio.Task] = set()
+
+
+def _dependents(kind: str, target_id: str) -> List[Dependent]:
+    if kind == "world":
+        return [
+            Dependent("items", item_service.COLLECTION_NAME, "world_id",
+                      item_service.delete_items),
+            Dependent("characters", character_service.COLLECTION_NAME,
+                      "world_id", character_service.delete_characters),
+        ]
+    events = campaign_events.events_collection(target_id)
+    return [
+        Dependent("items", item_service.COLLECTION_NAME, "campaign_id",
+                  item_service.delete_items),
+        Dependent("events", events, None,
+                  functools.partial(get_repository().bulk_delete, events)),
+    ]
+
+
+async def _delete_dependents(job: CascadeJob, dependent: Dependent) -> None:
+    filters = ([(dependent.field, "==", job.target_id)]
+               if dependent.field else [])
+    start_after = None
+    while True:
+        # Only the IDs are needed, so no other field is transferred.
+        doc_ids = [
+            doc["id"] async for doc in get_repository().stream(
+                dependent.collection, filters, WRITE_BATCH_SIZE, start_after,
+                fields=[])
+        ]
+        if not doc_ids:
+            return
+        result = await dependent.delete(doc_ids)
+        failed = len(result.errors)
+        job.deleted[dependent.name] = (
+            job.deleted.get(dependent.name, 0) + len(doc_ids) - failed)
+        if failed:
+            job.failed[dependent.name] = (
+                job.failed.get(dependent.name, 0) + failed)
+            room = MAX_JOB_ERRORS - len(job.errors)
+            job.errors.extend(list(result.errors.values())[:max(room, 0)])
+        metrics.increment(f"cascade_delete.{dependent.name}.deleted",
+                          len(doc_ids) - failed)
+        if len(doc_ids) < WRITE_BATCH_SIZE:
+            return
+        # Failed deletes stay in the results, so page past them.
+        start_after = doc_ids[-1]
+
+
+async def _run(job: CascadeJob) -> None:
+    job.status = "running"
+    try:
+        for dependent in _dependents(job.kind, job.target_id):
+            await _delete_dependents(job, dependent)
+        job.status = "failed" if job.failed else "completed"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        raise
+    except Exception as e:
+        job.status = "failed"
+        job.errors.append(str(e))
+    finally:
+        job.finished_at = datetime.now(timezone.utc)
+        metrics.increment(f"cascade_delete.jobs.{job.status}")
+
+
+def start_cascade_delete(kind: str, target_id: str) -> CascadeJob:
+    """
+    Start deleting the documents that belong to a deleted world or
+    campaign in the background and return the job tracking it.
+
+    Dependents are found with the same `where(...)` queries the list routes
+    use and removed with batched deletes, a page at a time:
+
+    - world: items and characters whose world_id is the world's ID
+    - campaign: items whose campaign_id is the campaign's ID, and the
+      campaign's event log
+
+    Jobs run in this process and are not resumed after a restart; deleting
+    the parent again starts a new job that picks up whatever is left.
+
+    Args:
+        kind (str): "world" or "campaign".
+        target_id (str): The ID of the deleted document.
+
+    Returns:
+        CascadeJob: The job, also available through get_cascade_job.
+    """
+    if kind not in ("world", "campaign"):
+        raise ValueError(f"Unknown cascade delete kind: {kind}")
+    job = CascadeJob(id=uuid.uuid4().hex, kind=kind, target_id=target_id)
+    _jobs.set(job.id, job)
+    task = asyncio.get_running_loop().create_task(_run(job))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return job
+
+
+def get_cascade_job(job_id: str) -> Optional[CascadeJob]:
+    """
+    Return a cascade delete job by ID, or None if it is unknown or expired.
+    """
+    return _jobs.get(job_id)
+
+
+async def cancel_cascade_deletes() -> None:
+    """
+    Cancel the running jobs, e.g. at shutdown.
+    """
+    for task in list(_tasks):
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
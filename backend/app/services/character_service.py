@@ -1,79 +1,377 @@
 # services/character_service.py
-from typing import Optional, List
+import asyncio
+from typing import AsyncIterator, Dict, Iterable, Optional, List, Set
+from app.core import metrics
+from app.core.config import get_settings
 from app.db.character import Character, CharacterCreate
-from app.core.firebase import firebase_db
+from app.repository import (
+    BulkWriteResult,
+    MultiGetResult,
+    Mutation,
+    get_repository,
+    page_ids,
+    unique_ids,
+)
+from app.services.lore_index import index_character, remove_character
+from app.services.entity_cache import get_entity_cache
+from app.services.campaign_service import campaign_character_ids, get_campaign
+
+settings = get_settings()
 
 COLLECTION_NAME = "characters"
+_cache = get_entity_cache(COLLECTION_NAME)
 
 
-def get_character(character_id: str):
-    character_ref = firebase_db.collection(COLLECTION_NAME).document(
-        character_id)
-    character_doc = character_ref.get()
-    if character_doc.exists:
-        return character_doc.to_dict()
-    else:
-        return None
+class WriteCoalescer:
+    """
+    Merges the updates of each character in memory and writes them
+    together, so a character updated many times a second during combat
+    costs one write per flush instead of one per update.
 
+    Pending updates are written with one bulk update `delay_ms` after the
+    first of them, or earlier through flush(). Reads in this process, lists
+    included, see them right away (see _with_pending); other processes see
+    them once they are flushed. Updates that fail are kept for the next
+    flush unless the character no longer exists.
+    """
 
-def get_characters_of_user(user_id: str):
-    characters_ref = firebase_db.collection(COLLECTION_NAME).where(
-        "created_by_user_id", "==", user_id)
-    characters_docs = characters_ref.stream()
-    return [character_doc.to_dict() for character_doc in characters_docs]
+    def __init__(self, delay_ms: int):
+        self.delay_ms = delay_ms
+        self._pending: Dict[str, dict] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        # Scheduled flushes, referenced so they are not garbage collected.
+        self._tasks: Set[asyncio.Task] = set()
 
+    def __len__(self) -> int:
+        return len(self._pending)
 
-def get_characters_in_world(world_id: str):
-    characters_ref = firebase_db.collection(COLLECTION_NAME).where(
-        "world_id", "==", world_id)
-    characters_docs = characters_ref.stream()
-    return [character_doc.to_dict() for character_doc in characters_docs]
+    def pending(self, character_id: str) -> Optional[dict]:
+        """
+        The fields of a character that are updated but not written yet.
+        """
+        return self._pending.get(character_id)
 
+    def add(self, character_id: str, data: dict) -> None:
+        """
+        Merge top-level field updates into the character's pending ones.
+        """
+        self._pending[character_id] = {
+            **self._pending.get(character_id, {}),
+            **data
+        }
+        metrics.increment("character_writes.updates")
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.delay_ms / 1000, self._schedule_flush)
 
-def get_characters_at_location(location_id: str):
-    characters_ref = firebase_db.collection(COLLECTION_NAME).where(
-        "current_location_id", "==", location_id)
-    characters_docs = characters_ref.stream()
-    return [character_doc.to_dict() for character_doc in characters_docs]
+    def discard(self, character_id: str) -> None:
+        """
+        Drop a character's pending updates, e.g. when it is deleted.
+        """
+        self._pending.pop(character_id, None)
 
+    def _schedule_flush(self) -> None:
+        self._timer = None
+        task = asyncio.get_running_loop().create_task(self.flush())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
 
-def get_characters_in_campaign(campaign_id: str):
-    campaign_ref = firebase_db.collection(COLLECTION_NAME).document(
-        campaign_id)
-    campaign_doc = campaign_ref.get()
-    if campaign_doc.exists:
-        campaign = campaign_doc.to_dict()
-        player_character_ids = campaign.get("player_character_ids", [])
-        active_npc_character_ids = campaign.get("active_npc_character_ids", [])
+    def _take(self, character_ids: Optional[Iterable[str]]) -> Dict[str, dict]:
+        if character_ids is None:
+            taken, self._pending = self._pending, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            return taken
+        return {
+            character_id: self._pending.pop(character_id)
+            for character_id in character_ids
+            if character_id in self._pending
+        }
 
-        characters = []
-        for character_id in player_character_ids + active_npc_character_ids:
-            character = get_character(character_id)
-            if character:
-                characters.append(character)
+    async def flush(self,
+                    character_ids: Optional[Iterable[str]] = None) -> int:
+        """
+        Write the pending updates of some characters, or of all of them.
 
-        return characters
-    else:
+        Waits for a flush already in progress first, so once this returns
+        every update made before the call has been written (or failed).
+
+        Returns:
+            int: The number of characters written.
+        """
+        async with self._flush_lock:
+            taken = self._take(character_ids)
+            if not taken:
+                return 0
+            updates = list(taken.items())
+            try:
+                result = await get_repository().bulk_update(
+                    COLLECTION_NAME, updates)
+            except Exception as e:
+                result = BulkWriteResult(
+                    ids=[character_id for character_id, _ in updates],
+                    errors={position: str(e)
+                            for position in range(len(updates))})
+            failed_ids = [updates[position][0] for position in result.errors]
+            existing = (await get_repository().get_many(
+                COLLECTION_NAME, failed_ids) if failed_ids else {})
+            for character_id in failed_ids:
+                if character_id in existing:
+                    # Keep the failed fields under any newer updates.
+                    self._pending[character_id] = {
+                        **taken[character_id],
+                        **self._pending.get(character_id, {})
+                    }
+                else:
+                    _cache.invalidate(character_id)
+            if self._pending and self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(
+                    self.delay_ms / 1000, self._schedule_flush)
+            written = len(updates) - len(failed_ids)
+            metrics.increment("character_writes.flushed", written)
+            metrics.increment("character_writes.failed", len(failed_ids))
+            return written
+
+    async def close(self) -> None:
+        """
+        Write everything still pending, e.g. at shutdown.
+        """
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+
+_writes = WriteCoalescer(settings.CHARACTER_WRITE_FLUSH_MS)
+
+
+def _with_pending(character_id: str,
+                  character: Optional[dict]) -> Optional[dict]:
+    pending = _writes.pending(character_id)
+    if character is None or not pending:
+        return character
+    return {**character, **pending}
+
+
+async def flush_character_writes(
+        character_ids: Optional[List[str]] = None) -> int:
+    """
+    Write the buffered updates of some characters, or of all of them, e.g.
+    at the end of an encounter or a session.
+    """
+    return await _writes.flush(character_ids)
+
+
+async def close_character_writes() -> None:
+    """
+    Write every buffered character update, e.g. at shutdown.
+    """
+    await _writes.close()
+
+
+async def _fetch_character(character_id: str):
+    return await get_repository().get(COLLECTION_NAME, character_id)
+
+
+async def get_character(character_id: str):
+    character = await _cache.get(character_id, _fetch_character)
+    return _with_pending(character_id, character)
+
+
+async def _fetch_characters(character_ids: List[str]):
+    return await get_repository().get_many(COLLECTION_NAME, character_ids)
+
+
+async def get_characters_by_ids(character_ids: List[str]) -> MultiGetResult:
+    """
+    Fetch many characters at once, from the cache where possible and with
+    batched reads for the rest.
+
+    Returns:
+        MultiGetResult: The characters in the order of `character_ids`
+            (repeats removed), and the IDs that do not exist.
+    """
+    character_ids = unique_ids(character_ids)
+    found = await _cache.get_many(character_ids, _fetch_characters)
+    found = {
+        character_id: _with_pending(character_id, character)
+        for character_id, character in found.items()
+    }
+    return MultiGetResult.from_found(character_ids, found)
+
+
+async def _characters_where(field: str, value: str, limit: Optional[int],
+                            start_after: Optional[str],
+                            fields: Optional[List[str]]
+                            ) -> AsyncIterator[dict]:
+    rows = get_repository().stream(COLLECTION_NAME, [(field, "==", value)],
+                                   limit, start_after, fields)
+    async for row in rows:
+        pending = _writes.pending(row["id"])
+        if pending and fields is not None:
+            pending = {
+                name: data
+                for name, data in pending.items() if name in fields
+            }
+        yield {**row, **pending} if pending else row
+
+
+def stream_characters_of_user(user_id: str,
+                              limit: Optional[int] = None,
+                              start_after: Optional[str] = None,
+                              fields: Optional[List[str]] = None):
+    return _characters_where("created_by_user_id", user_id, limit,
+                             start_after, fields)
+
+
+def stream_characters_in_world(world_id: str,
+                               limit: Optional[int] = None,
+                               start_after: Optional[str] = None,
+                               fields: Optional[List[str]] = None):
+    return _characters_where("world_id", world_id, limit, start_after,
+                             fields)
+
+
+def stream_characters_at_location(location_id: str,
+                                  limit: Optional[int] = None,
+                                  start_after: Optional[str] = None,
+                                  fields: Optional[List[str]] = None):
+    return _characters_where("current_location_id", location_id, limit,
+                             start_after, fields)
+
+
+async def get_characters_of_user(user_id: str,
+                                 limit: Optional[int] = None,
+                                 start_after: Optional[str] = None):
+    return [
+        character async for character in stream_characters_of_user(
+            user_id, limit, start_after)
+    ]
+
+
+async def get_characters_in_world(world_id: str,
+                                  limit: Optional[int] = None,
+                                  start_after: Optional[str] = None):
+    return [
+        character async for character in stream_characters_in_world(
+            world_id, limit, start_after)
+    ]
+
+
+async def get_characters_at_location(location_id: str,
+                                     limit: Optional[int] = None,
+                                     start_after: Optional[str] = None):
+    return [
+        character async for character in stream_characters_at_location(
+            location_id, limit, start_after)
+    ]
+
+
+async def get_characters_in_campaign(
+        campaign_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None) -> Optional[MultiGetResult]:
+    campaign = await get_campaign(campaign_id)
+    if campaign is None:
         return None
+    return await get_characters_by_ids(
+        page_ids(campaign_character_ids(campaign), limit, start_after))
 
 
-def create_character(character: CharacterCreate):
+async def create_character(character: CharacterCreate):
     character_data = character.model_dump()
-    character_ref = firebase_db.collection(COLLECTION_NAME).document()
-    character_ref.set(character_data)
-    return character_ref.id
+    character_id = await get_repository().create(COLLECTION_NAME,
+                                                 character_data)
+    _cache.set(character_id, character_data)
+    index_character(character_id, character_data)
+    return character_id
+
 
+async def update_character(character_id: str, character: Character):
+    """
+    Update a character. Unless CHARACTER_WRITE_FLUSH_MS is 0, the update is
+    merged into the character's pending updates and written with the next
+    flush; the returned and later read character include it right away.
 
-def update_character(character_id: str, character: Character):
-    character_ref = firebase_db.collection(COLLECTION_NAME).document(
-        character_id)
+    Returns:
+        dict or None: The updated character, or None if it does not exist.
+    """
     character_data = character.model_dump(exclude={"id"})
-    character_ref.update(character_data)
-    return character_ref.get().to_dict()
+    if not _writes.delay_ms:
+        updated_character = await get_repository().update(
+            COLLECTION_NAME, character_id, character_data,
+            _cache.peek(character_id))
+    else:
+        current = await get_character(character_id)
+        if current is None:
+            return None
+        _writes.add(character_id, character_data)
+        updated_character = {**current, **character_data}
+    _cache.set(character_id, updated_character)
+    index_character(character_id, updated_character)
+    return {**updated_character, "id": character_id}
+
+
+async def mutate_character(character_id: str, mutation: Mutation):
+    """
+    Change fields of a character with one atomic write, e.g. grant
+    experience or add a status condition.
+    """
+    # Pending updates are written first, so they cannot overwrite this.
+    await _writes.flush([character_id])
+    updated_character = await get_repository().mutate(
+        COLLECTION_NAME, character_id, mutation)
+    _cache.set(character_id, updated_character)
+    index_character(character_id, updated_character)
+    return {**updated_character, "id": character_id}
 
 
-def delete_character(character_id: str):
-    character_ref = firebase_db.collection(COLLECTION_NAME).document(
-        character_id)
-    character_ref.delete()
+async def delete_character(character_id: str):
+    _writes.discard(character_id)
+    await get_repository().delete(COLLECTION_NAME, character_id)
+    _cache.invalidate(character_id)
+    remove_character(character_id)
     return True
+
+
+async def create_characters(
+        characters: List[CharacterCreate]) -> BulkWriteResult:
+    """
+    Create many characters with batched writes, e.g. to import an NPC roster.
+    """
+    documents = [character.model_dump() for character in characters]
+    result = await get_repository().bulk_create(COLLECTION_NAME, documents)
+    for position, character_id in enumerate(result.ids):
+        if position not in result.errors:
+            _cache.set(character_id, documents[position])
+            index_character(character_id, documents[position])
+    return result
+
+
+async def update_characters(characters: List[Character]) -> BulkWriteResult:
+    """
+    Update many existing characters, identified by their `id`, with batched
+    writes. Missing characters are reported in the result's errors.
+    """
+    await _writes.flush(character.id for character in characters)
+    result = await get_repository().bulk_update(COLLECTION_NAME, [
+        (character.id, character.model_dump(exclude={"id"}))
+        for character in characters
+    ])
+    written_ids = result.written_ids()
+    for character_id in written_ids:
+        _cache.invalidate(character_id)
+    updated = await _cache.get_many(written_ids, _fetch_characters)
+    for character_id, character_data in updated.items():
+        index_character(character_id, character_data)
+    return result
+
+
+async def delete_characters(character_ids: List[str]) -> BulkWriteResult:
+    for character_id in character_ids:
+        _writes.discard(character_id)
+    result = await get_repository().bulk_delete(COLLECTION_NAME, character_ids)
+    for character_id in result.written_ids():
+        _cache.invalidate(character_id)
+        remove_character(character_id)
+    return result
@@ -0,0 +1,192 @@
+# services/entity_cache.py
+import copy
+import threading
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from app.core import metrics
+from app.core.cache import LRUCache
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Collections whose documents are served through the cache.
+CACHED_COLLECTIONS = ("worlds", "items", "campaigns", "characters")
+
+
+class EntityCache:
+    """
+    Read-through cache of one collection's documents, keyed by document ID.
+
+    Entries are dropped when they expire, when this process writes the
+    document, and, while `listen` is active, when Firestore reports a change
+    made by anyone else. Values are copied in and out so callers can mutate
+    what they get back.
+    """
+
+    def __init__(self, collection: str, max_entries: int = 1024,
+                 ttl_seconds: Optional[float] = None,
+                 enabled: bool = True):
+        self.collection = collection
+        self.enabled = enabled
+        self._cache = LRUCache(max_entries=max_entries,
+                               ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+        # Bumped on every invalidation, so a read that raced with a write
+        # does not put the stale document back into the cache.
+        self._generation = 0
+        self._watch = None
+
+    async def get(
+        self, doc_id: str,
+        load: Callable[[str], Awaitable[Optional[dict]]]
+    ) -> Optional[dict]:
+        """
+        Return the cached document, or load it with `load(doc_id)` and cache
+        it. Missing documents (None) are not cached.
+        """
+        if not self.enabled:
+            return await load(doc_id)
+        data = self._cache.get(doc_id)
+        if data is not None:
+            return copy.deepcopy(data)
+        with self._lock:
+            generation = self._generation
+        data = await load(doc_id)
+        if data is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._cache.set(doc_id, copy.deepcopy(data))
+        return data
+
+    async def get_many(
+        self, doc_ids: Iterable[str],
+        load_many: Callable[[List[str]], Awaitable[Dict[str, dict]]]
+    ) -> Dict[str, dict]:
+        """
+        Return the documents for `doc_ids`, keyed by ID, loading only the
+        ones not in the cache with a single `load_many(missing_ids)` call.
+        IDs without a document are absent from the result.
+        """
+        doc_ids = list(doc_ids)
+        if not self.enabled:
+            return await load_many(doc_ids)
+        found, missing = {}, []
+        for doc_id in doc_ids:
+            data = self._cache.get(doc_id)
+            if data is not None:
+                found[doc_id] = copy.deepcopy(data)
+            else:
+                missing.append(doc_id)
+        if missing:
+            with self._lock:
+                generation = self._generation
+            loaded = await load_many(missing)
+            with self._lock:
+                if generation == self._generation:
+                    for doc_id, data in loaded.items():
+                        self._cache.set(doc_id, copy.deepcopy(data))
+            found.update(loaded)
+        return found
+
+    def peek(self, doc_id: str) -> Optional[dict]:
+        """
+        Return a copy of the cached document without loading on a miss.
+        """
+        if not self.enabled:
+            return None
+        data = self._cache.get(doc_id)
+        return copy.deepcopy(data) if data is not None else None
+
+    def set(self, doc_id: str, data: dict) -> None:
+        """
+        Cache the current version of a document this process just wrote.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            self._cache.set(doc_id, copy.deepcopy(data))
+
+    def invalidate(self, doc_id: str, source: str = "write") -> None:
+        """
+        Drop a document from the cache.
+
+        Args:
+            doc_id (str): The document ID.
+            source (str): What caused the invalidation ("write" or
+                "snapshot"), recorded in the metrics.
+        """
+        with self._lock:
+            self._generation += 1
+            removed = self._cache.delete(doc_id)
+        if removed:
+            metrics.increment(
+                f"entity_cache.{self.collection}.invalidations.{source}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def listen(self, repository) -> None:
+        """
+        Invalidate entries when the repository reports that another process
+        changed a document of this collection. Backends without a change
+        feed are only written through this process, so there is nothing to
+        listen to.
+        """
+        if self._watch is not None:
+            return
+        self._watch = repository.watch(
+            self.collection,
+            lambda doc_id: self.invalidate(doc_id, source="snapshot"))
+
+    def stop(self) -> None:
+        if self._watch is not None:
+            self._watch()
+            self._watch = None
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "listening": self._watch is not None}
+
+
+_caches: Dict[str, EntityCache] = {
+    collection: EntityCache(collection,
+                            max_entries=settings.ENTITY_CACHE_MAX_ENTRIES,
+                            ttl_seconds=settings.ENTITY_CACHE_TTL_SECONDS,
+                            enabled=settings.ENTITY_CACHE_ENABLED)
+    for collection in CACHED_COLLECTIONS
+}
+
+
+def get_entity_cache(collection: str) -> EntityCache:
+    """
+    Return the cache for one of CACHED_COLLECTIONS.
+    """
+    return _caches[collection]
+
+
+def start_listeners() -> None:
+    """
+    Subscribe every entity cache to its collection's change events.
+
+    Each Firestore listener reads (and is billed for) its whole collection
+    once when it starts and then receives every change to it, so they are
+    only opened when ENTITY_CACHE_LISTEN is set, once per process at
+    startup.
+    """
+    if not settings.ENTITY_CACHE_ENABLED:
+        return
+    from app.repository import get_repository
+    repository = get_repository()
+    for cache in _caches.values():
+        cache.listen(repository)
+
+
+def stop_listeners() -> None:
+    for cache in _caches.values():
+        cache.stop()
+
+
+metrics.register_gauge(
+    "entity_cache",
+    lambda: {name: cache.stats() for name, cache in _caches.items()})
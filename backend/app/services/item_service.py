@@ -1,13 +1,26 @@
 # services/item_service.py
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List
 from app.db.item import Item, ItemCreate
-from app.core.firebase import firebase_db
+from app.repository import (
+    BulkWriteResult,
+    MultiGetResult,
+    Mutation,
+    get_repository,
+    unique_ids,
+)
 from google.cloud.exceptions import NotFound, GoogleCloudError
+from app.services.lore_index import index_item, remove_item
+from app.services.entity_cache import get_entity_cache
 
 COLLECTION_NAME = "items"
+_cache = get_entity_cache(COLLECTION_NAME)
 
 
-def get_item(item_id: str) -> Optional[dict]:
+async def _fetch_item(item_id: str) -> Optional[dict]:
+    return await get_repository().get(COLLECTION_NAME, item_id)
+
+
+async def get_item(item_id: str) -> Optional[dict]:
     """
     Retrieve an item by its ID.
 
@@ -22,12 +35,7 @@ def get_item(item_id: str) -> Optional[dict]:
         Exception: If there is a general error.
     """
     try:
-        item_ref = firebase_db.collection(COLLECTION_NAME).document(item_id)
-        item_doc = item_ref.get()
-        if item_doc.exists:
-            return item_doc.to_dict()
-        else:
-            return None
+        return await _cache.get(item_id, _fetch_item)
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching item: {db_error}")
@@ -36,12 +44,62 @@ def get_item(item_id: str) -> Optional[dict]:
             f"Unexpected error while fetching item: {general_error}")
 
 
-def get_all_items_of_user(user_id: str) -> List[Item]:
+async def _fetch_items(item_ids: List[str]):
+    return await get_repository().get_many(COLLECTION_NAME, item_ids)
+
+
+async def get_items_by_ids(item_ids: List[str]) -> MultiGetResult:
+    """
+    Fetch many items at once, e.g. the items listed in a world's item_ids.
+
+    Args:
+        item_ids (List[str]): The item IDs; repeats are ignored.
+
+    Returns:
+        MultiGetResult: The items in the order of `item_ids` and the IDs that
+            do not exist.
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        item_ids = unique_ids(item_ids)
+        found = await _cache.get_many(item_ids, _fetch_items)
+        return MultiGetResult.from_found(item_ids, found)
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while fetching items by ID: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while fetching items by ID: {general_error}")
+
+
+def stream_items_of_user(
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+    """
+    Stream the items owned by a specific user one document at a time.
+    Only `fields` (and the ID) are read when given.
+    """
+    return get_repository().stream(COLLECTION_NAME,
+                                   [("user_id", "==", user_id)], limit,
+                                   start_after, fields)
+
+
+async def get_all_items_of_user(
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None) -> List[Item]:
     """
     Fetch all items owned by a specific user.
 
     Args:
         user_id (str): The user's ID.
+        limit (int, optional): Maximum number of items to return.
+        start_after (str, optional): Return items after this item ID.
 
     Returns:
         List[Item]: List of Item objects.
@@ -51,10 +109,10 @@ def get_all_items_of_user(user_id: str) -> List[Item]:
         Exception: If there is a general error.
     """
     try:
-        docs = firebase_db.collection(COLLECTION_NAME).where(
-            "user_id", "==", user_id).get()
-        items = [Item(id=doc.id, **doc.to_dict()) for doc in docs]
-        return items
+        return [
+            Item(**doc)
+            async for doc in stream_items_of_user(user_id, limit, start_after)
+        ]
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching items for user: {db_error}")
@@ -63,12 +121,31 @@ def get_all_items_of_user(user_id: str) -> List[Item]:
             f"Unexpected error while fetching items for user: {general_error}")
 
 
-def get_items_by_world(world_id: str) -> List[Item]:
+def stream_items_by_world(
+        world_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+    """
+    Stream the items associated with a specific world one document at a time.
+    Only `fields` (and the ID) are read when given.
+    """
+    return get_repository().stream(COLLECTION_NAME,
+                                   [("world_id", "==", world_id)], limit,
+                                   start_after, fields)
+
+
+async def get_items_by_world(
+        world_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None) -> List[Item]:
     """
     Fetch all items associated with a specific world.
 
     Args:
         world_id (str): The ID of the world.
+        limit (int, optional): Maximum number of items to return.
+        start_after (str, optional): Return items after this item ID.
 
     Returns:
         List[Item]: List of Item objects.
@@ -78,10 +155,10 @@ def get_items_by_world(world_id: str) -> List[Item]:
         Exception: If there is a general error.
     """
     try:
-        docs = firebase_db.collection(COLLECTION_NAME).where(
-            "world_id", "==", world_id).get()
-        items = [Item(id=doc.id, **doc.to_dict()) for doc in docs]
-        return items
+        return [
+            Item(**doc)
+            async for doc in stream_items_by_world(world_id, limit, start_after)
+        ]
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching items for world: {db_error}")
@@ -91,12 +168,31 @@ def get_items_by_world(world_id: str) -> List[Item]:
         )
 
 
-def get_items_by_campaign(campaign_id: str) -> List[Item]:
+def stream_items_by_campaign(
+        campaign_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+    """
+    Stream the items associated with a specific campaign one document at
+    a time. Only `fields` (and the ID) are read when given.
+    """
+    return get_repository().stream(COLLECTION_NAME,
+                                   [("campaign_id", "==", campaign_id)], limit,
+                                   start_after, fields)
+
+
+async def get_items_by_campaign(
+        campaign_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None) -> List[Item]:
     """
     Fetch all items associated with a specific campaign.
 
     Args:
         campaign_id (str): The ID of the campaign.
+        limit (int, optional): Maximum number of items to return.
+        start_after (str, optional): Return items after this item ID.
 
     Returns:
         List[Item]: List of Item objects.
@@ -106,10 +202,11 @@ def get_items_by_campaign(campaign_id: str) -> List[Item]:
         Exception: If there is a general error.
     """
     try:
-        docs = firebase_db.collection(COLLECTION_NAME).where(
-            "campaign_id", "==", campaign_id).get()
-        items = [Item(id=doc.id, **doc.to_dict()) for doc in docs]
-        return items
+        return [
+            Item(**doc)
+            async for doc in stream_items_by_campaign(campaign_id, limit,
+                                                      start_after)
+        ]
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching items for campaign: {db_error}")
@@ -119,12 +216,31 @@ def get_items_by_campaign(campaign_id: str) -> List[Item]:
         )
 
 
-def get_items_by_character(character_id: str) -> List[Item]:
+def stream_items_by_character(
+        character_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+    """
+    Stream the items associated with a specific character one document at
+    a time. Only `fields` (and the ID) are read when given.
+    """
+    return get_repository().stream(COLLECTION_NAME,
+                                   [("character_id", "==", character_id)], limit,
+                                   start_after, fields)
+
+
+async def get_items_by_character(
+        character_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None) -> List[Item]:
     """
     Fetch all items associated with a specific character.
 
     Args:
         character_id (str): The ID of the character.
+        limit (int, optional): Maximum number of items to return.
+        start_after (str, optional): Return items after this item ID.
 
     Returns:
         List[Item]: List of Item objects.
@@ -134,10 +250,11 @@ def get_items_by_character(character_id: str) -> List[Item]:
         Exception: If there is a general error..
     """
     try:
-        docs = firebase_db.collection(COLLECTION_NAME).where(
-            "character_id", "==", character_id).get()
-        items = [Item(id=doc.id, **doc.to_dict()) for doc in docs]
-        return items
+        return [
+            Item(**doc)
+            async for doc in stream_items_by_character(character_id, limit,
+                                                       start_after)
+        ]
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching items for character: {db_error}")
@@ -147,7 +264,7 @@ def get_items_by_character(character_id: str) -> List[Item]:
         )
 
 
-def create_item(item: ItemCreate) -> str:
+async def create_item(item: ItemCreate) -> str:
     """
     Create a new item.
 
@@ -163,9 +280,10 @@ def create_item(item: ItemCreate) -> str:
     """
     try:
         item_data = item.dict()
-        item_ref = firebase_db.collection(COLLECTION_NAME).document()
-        item_ref.set(item_data)
-        return item_ref.id
+        item_id = await get_repository().create(COLLECTION_NAME, item_data)
+        _cache.set(item_id, item_data)
+        index_item(item_id, item_data)
+        return item_id
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while creating item: {db_error}")
@@ -174,7 +292,7 @@ def create_item(item: ItemCreate) -> str:
             f"Unexpected error while creating item: {general_error}")
 
 
-def update_item(item_id: str, item: Item) -> Optional[dict]:
+async def update_item(item_id: str, item: Item) -> Optional[dict]:
     """
     Update an existing item.
 
@@ -191,14 +309,13 @@ def update_item(item_id: str, item: Item) -> Optional[dict]:
         Exception: If there is a general error.
     """
     try:
-        item_ref = firebase_db.collection(COLLECTION_NAME).document(item_id)
         item_data = item.model_dump(exclude={"id"})
-        item_ref.update(item_data)
-        updated_doc = item_ref.get()
-        if updated_doc.exists:
-            return updated_doc.to_dict()
-        else:
-            return None
+        updated_item = await get_repository().update(COLLECTION_NAME, item_id,
+                                                     item_data,
+                                                     _cache.peek(item_id))
+        _cache.set(item_id, updated_item)
+        index_item(item_id, updated_item)
+        return updated_item
     except NotFound as not_found_error:
         raise NotFound(f"Item not found: {not_found_error}")
     except GoogleCloudError as db_error:
@@ -209,7 +326,40 @@ def update_item(item_id: str, item: Item) -> Optional[dict]:
             f"Unexpected error while updating item: {general_error}")
 
 
-def delete_item(item_id: str) -> bool:
+async def mutate_item(item_id: str, mutation: Mutation) -> dict:
+    """
+    Change fields of an item with one atomic write, e.g. add a set bonus
+    without sending the whole item.
+
+    Args:
+        item_id (str): The ID of the item to change.
+        mutation (Mutation): The field changes.
+
+    Returns:
+        dict: The updated item data, with its ID.
+
+    Raises:
+        NotFound: If the item does not exist.
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        updated_item = await get_repository().mutate(COLLECTION_NAME, item_id,
+                                                     mutation)
+        _cache.set(item_id, updated_item)
+        index_item(item_id, updated_item)
+        return {**updated_item, "id": item_id}
+    except NotFound as not_found_error:
+        raise NotFound(f"Item not found: {not_found_error}")
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while changing item: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while changing item: {general_error}")
+
+
+async def delete_item(item_id: str) -> bool:
     """
     Delete an item by its ID.
 
@@ -225,8 +375,9 @@ def delete_item(item_id: str) -> bool:
         Exception: If there is a general error.
     """
     try:
-        item_ref = firebase_db.collection(COLLECTION_NAME).document(item_id)
-        item_ref.delete()
+        await get_repository().delete(COLLECTION_NAME, item_id)
+        _cache.invalidate(item_id)
+        remove_item(item_id)
         return True
     except NotFound as not_found_error:
         raise NotFound(f"Item not found: {not_found_error}")
@@ -236,3 +387,99 @@ def delete_item(item_id: str) -> bool:
     except Exception as general_error:
         raise Exception(
             f"Unexpected error while deleting item: {general_error}")
+
+
+async def create_items(items: List[ItemCreate]) -> BulkWriteResult:
+    """
+    Create many items with batched writes.
+
+    Args:
+        items (List[ItemCreate]): The items' data.
+
+    Returns:
+        BulkWriteResult: The new item IDs in the order of `items`, and the
+            errors of the items that were not created.
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        documents = [item.model_dump() for item in items]
+        result = await get_repository().bulk_create(COLLECTION_NAME, documents)
+        for position, item_id in enumerate(result.ids):
+            if position not in result.errors:
+                _cache.set(item_id, documents[position])
+                index_item(item_id, documents[position])
+        return result
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while creating items: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while creating items: {general_error}")
+
+
+async def update_items(items: List[Item]) -> BulkWriteResult:
+    """
+    Update many existing items with batched writes.
+
+    Args:
+        items (List[Item]): The updated items, identified by their `id`.
+
+    Returns:
+        BulkWriteResult: The item IDs in the order of `items`, and the
+            errors of the items that were not updated (e.g. not found).
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        result = await get_repository().bulk_update(
+            COLLECTION_NAME,
+            [(item.id, item.model_dump(exclude={"id"})) for item in items])
+        written_ids = result.written_ids()
+        for item_id in written_ids:
+            _cache.invalidate(item_id)
+        # Stored items carry fields outside the model, so the lore index is
+        # refreshed from the written documents, read back in batches.
+        updated = await _cache.get_many(written_ids, _fetch_items)
+        for item_id, item_data in updated.items():
+            index_item(item_id, item_data)
+        return result
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while updating items: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while updating items: {general_error}")
+
+
+async def delete_items(item_ids: List[str]) -> BulkWriteResult:
+    """
+    Delete many items by ID with batched writes.
+
+    Args:
+        item_ids (List[str]): The IDs of the items to delete.
+
+    Returns:
+        BulkWriteResult: The item IDs, and the errors of the items that were
+            not deleted.
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        result = await get_repository().bulk_delete(COLLECTION_NAME, item_ids)
+        for item_id in result.written_ids():
+            _cache.invalidate(item_id)
+            remove_item(item_id)
+        return result
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while deleting items: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while deleting items: {general_error}")
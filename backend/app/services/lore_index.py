@@ -0,0 +1,258 @@
+# services/lore_index.py
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his in is it its "
+    "of on or she that the their them then there they this to was were will "
+    "with you your".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercase `text` and split it into index terms, dropping stopwords.
+    """
+    return [
+        token for token in _TOKEN_RE.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+
+
+@dataclass
+class LoreDocument:
+    doc_id: str
+    kind: str  # "world", "area", "poi", "item" or "character"
+    title: str
+    text: str
+    world_id: Optional[str] = None
+
+
+@dataclass
+class LoreSnippet:
+    doc_id: str
+    kind: str
+    title: str
+    text: str
+    score: float
+
+    def render(self) -> str:
+        return f"[{self.kind}] {self.title}: {self.text}"
+
+
+class LoreIndex:
+    """
+    In-process BM25 inverted index over world, item and character lore.
+
+    Documents are added, replaced and removed one at a time, so the index is
+    kept current by the service write paths without ever being rebuilt.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._docs: Dict[str, LoreDocument] = {}
+        self._doc_terms: Dict[str, Counter] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._total_length = 0
+        # Worlds whose full lore (areas, POIs, items, characters) is loaded.
+        self._loaded_worlds = set()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._docs)
+
+    def upsert(self, document: LoreDocument) -> None:
+        """
+        Add a document, replacing any previous version with the same ID.
+        """
+        terms = Counter(tokenize(f"{document.title} {document.text}"))
+        with self._lock:
+            self._remove(document.doc_id)
+            self._docs[document.doc_id] = document
+            self._doc_terms[document.doc_id] = terms
+            length = sum(terms.values())
+            self._doc_lengths[document.doc_id] = length
+            self._total_length += length
+            for term, frequency in terms.items():
+                self._postings[term][document.doc_id] = frequency
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def remove_prefix(self, prefix: str) -> None:
+        """
+        Remove every document whose ID starts with `prefix`.
+        """
+        with self._lock:
+            for doc_id in [d for d in self._docs if d.startswith(prefix)]:
+                self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        if doc_id not in self._docs:
+            return
+        del self._docs[doc_id]
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+
+    def mark_world_loaded(self, world_id: str) -> None:
+        with self._lock:
+            self._loaded_worlds.add(world_id)
+
+    def is_world_loaded(self, world_id: str) -> bool:
+        with self._lock:
+            return world_id in self._loaded_worlds
+
+    def forget_world(self, world_id: str) -> None:
+        """
+        Drop all lore belonging to a world.
+        """
+        with self._lock:
+            self._loaded_worlds.discard(world_id)
+            for doc_id in [
+                    d for d, doc in self._docs.items()
+                    if doc.world_id == world_id
+            ]:
+                self._remove(doc_id)
+
+    def search(self,
+               query: str,
+               k: int = 5,
+               token_budget: Optional[int] = None,
+               world_id: Optional[str] = None,
+               count_tokens: Callable[[str], int] = None) -> List[LoreSnippet]:
+        """
+        Return the top-k documents for `query` ranked by BM25.
+
+        Args:
+            query (str): Free text, typically the player's prompt.
+            k (int): Maximum number of snippets.
+            token_budget (int, optional): Stop adding snippets once their
+                rendered size would exceed this many tokens.
+            world_id (str, optional): Only return lore from this world.
+            count_tokens (callable, optional): Token counter for the budget.
+
+        Returns:
+            List[LoreSnippet]: The best matching snippets, best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._docs)
+            if not terms or not n_docs:
+                return []
+            avg_length = self._total_length / n_docs or 1.0
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) /
+                               (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    if (world_id is not None
+                            and self._docs[doc_id].world_id != world_id):
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b *
+                                      self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (
+                        frequency + norm)
+            ranked = sorted(scores.items(), key=lambda kv: kv[1],
+                            reverse=True)
+            snippets = []
+            used = 0
+            for doc_id, score in ranked:
+                if len(snippets) >= k:
+                    break
+                doc = self._docs[doc_id]
+                snippet = LoreSnippet(doc_id=doc_id,
+                                      kind=doc.kind,
+                                      title=doc.title,
+                                      text=doc.text,
+                                      score=score)
+                if token_budget is not None and count_tokens is not None:
+                    cost = count_tokens(snippet.render())
+                    if used + cost > token_budget:
+                        continue
+                    used += cost
+                snippets.append(snippet)
+            return snippets
+
+
+lore_index = LoreIndex()
+
+
+def index_world(world_id: str, world: dict) -> None:
+    """
+    Index a world and its areas and POIs, replacing any previous version.
+    """
+    remove_world(world_id)
+    lore_index.upsert(
+        LoreDocument(doc_id=f"world:{world_id}",
+                     kind="world",
+                     title=world.get("name") or "",
+                     text=world.get("description") or "",
+                     world_id=world_id))
+    for kind, key in (("area", "areas"), ("poi", "pois")):
+        for entry in world.get(key) or []:
+            if hasattr(entry, "model_dump"):
+                entry = entry.model_dump()
+            if not entry.get("description"):
+                continue
+            lore_index.upsert(
+                LoreDocument(doc_id=f"world:{world_id}:{kind}:{entry['id']}",
+                             kind=kind,
+                             title=entry.get("name") or "",
+                             text=entry["description"],
+                             world_id=world_id))
+
+
+def index_item(item_id: str, item: dict) -> None:
+    """
+    Index an item's description.
+    """
+    lore_index.upsert(
+        LoreDocument(doc_id=f"item:{item_id}",
+                     kind="item",
+                     title=item.get("name") or "",
+                     text=item.get("description") or "",
+                     world_id=item.get("world_id")))
+
+
+def index_character(character_id: str, character: dict) -> None:
+    """
+    Index a character's background story.
+    """
+    lore_index.upsert(
+        LoreDocument(doc_id=f"character:{character_id}",
+                     kind="character",
+                     title=character.get("name") or "",
+                     text=character.get("background_story") or "",
+                     world_id=character.get("world_id")))
+
+
+def remove_world(world_id: str) -> None:
+    """
+    Remove a world's own lore (the world, its areas and POIs).
+    """
+    lore_index.remove(f"world:{world_id}")
+    lore_index.remove_prefix(f"world:{world_id}:")
+
+
+def remove_item(item_id: str) -> None:
+    lore_index.remove(f"item:{item_id}")
+
+
+def remove_character(character_id: str) -> None:
+    lore_index.remove(f"character:{character_id}")
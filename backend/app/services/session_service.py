@@ -0,0 +1,72 @@
+# services/session_service.py
+from typing import Optional
+from app.db.schemas import GameSession
+from app.repository import get_repository
+from datetime import datetime, timezone
+from google.cloud.exceptions import NotFound, GoogleCloudError
+
+COLLECTION_NAME = "sessions"
+
+
+async def get_session(session_id: str) -> Optional[GameSession]:
+    """
+    Retrieve a game session by its ID.
+
+    Args:
+        session_id (str): The ID of the session.
+
+    Returns:
+        GameSession or None: The session if found, else None.
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        data = await get_repository().get(COLLECTION_NAME, session_id)
+        if data is not None:
+            data["session_id"] = session_id
+            return GameSession(**data)
+        else:
+            return None
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while fetching session: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while fetching session: {general_error}")
+
+
+async def update_session_summary(session_id: str, summary: Optional[str],
+                                 summarized_message_count: int) -> bool:
+    """
+    Store the rolling conversation summary of a session.
+
+    Args:
+        session_id (str): The ID of the session.
+        summary (str): Summary of the first `summarized_message_count` messages.
+        summarized_message_count (int): How many messages the summary covers.
+
+    Returns:
+        bool: True if the update was successful.
+
+    Raises:
+        NotFound: If the session does not exist.
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        await get_repository().update(COLLECTION_NAME, session_id, {
+            "summary": summary,
+            "summarized_message_count": summarized_message_count,
+            "updated_at": datetime.now(timezone.utc),
+        })
+        return True
+    except NotFound as not_found_error:
+        raise NotFound(f"Session not found: {not_found_error}")
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while updating session: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while updating session: {general_error}")
@@ -1,11 +1,20 @@
-from typing import Optional, List
-from app.db.world import WorldCreate, World, WorldUpdate, Area, POI
-from app.core.firebase import firebase_db
+from typing import AsyncIterator, Optional, List
+from app.db.world import WorldCreate, World, WorldBulkUpdate, WorldUpdate, Area, POI
+from app.repository import (
+    BulkWriteResult,
+    MultiGetResult,
+    Mutation,
+    get_repository,
+    unique_ids,
+)
 from datetime import datetime, timezone
 from google.cloud.exceptions import NotFound, GoogleCloudError
+from app.services.lore_index import index_world, lore_index
+from app.services.entity_cache import get_entity_cache
 import re
 
 COLLECTION_NAME = "worlds"
+_cache = get_entity_cache(COLLECTION_NAME)
 
 import base64
 
@@ -14,7 +23,11 @@ def save_image_from_base64(base64_str, filename):
     with open(filename, "wb") as f:
         f.write(base64.b64decode(base64_str))
 
-def get_world(world_id: str) -> Optional[dict]:
+async def _fetch_world(world_id: str) -> Optional[dict]:
+    return await get_repository().get(COLLECTION_NAME, world_id)
+
+
+async def get_world(world_id: str) -> Optional[dict]:
     """
     Retrieve a world by its ID.
 
@@ -29,12 +42,7 @@ def get_world(world_id: str) -> Optional[dict]:
         Exception: If there is a general error.
     """
     try:
-        world_ref = firebase_db.collection(COLLECTION_NAME).document(world_id)
-        world_doc = world_ref.get()
-        if world_doc.exists:
-            return world_doc.to_dict()
-        else:
-            return None
+        return await _cache.get(world_id, _fetch_world)
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching world: {db_error}")
@@ -42,12 +50,61 @@ def get_world(world_id: str) -> Optional[dict]:
         raise Exception(
             f"Unexpected error while fetching world: {general_error}")
 
-def get_all_worlds_of_user(user_id: str) -> List[dict]:
+async def _fetch_worlds(world_ids: List[str]):
+    return await get_repository().get_many(COLLECTION_NAME, world_ids)
+
+
+async def get_worlds_by_ids(world_ids: List[str]) -> MultiGetResult:
+    """
+    Fetch many worlds at once, e.g. the worlds listed in a campaign's
+    world_ids.
+
+    Args:
+        world_ids (List[str]): The world IDs; repeats are ignored.
+
+    Returns:
+        MultiGetResult: The worlds in the order of `world_ids` and the IDs
+            that do not exist.
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        world_ids = unique_ids(world_ids)
+        found = await _cache.get_many(world_ids, _fetch_worlds)
+        return MultiGetResult.from_found(world_ids, found)
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while fetching worlds by ID: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while fetching worlds by ID: {general_error}")
+
+def stream_worlds_of_user(
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None,
+        fields: Optional[List[str]] = None) -> AsyncIterator[dict]:
+    """
+    Stream the worlds owned by a specific user one document at a time.
+    Only `fields` (and the ID) are read when given.
+    """
+    return get_repository().stream(COLLECTION_NAME,
+                                   [("by_user", "==", user_id)], limit,
+                                   start_after, fields)
+
+async def get_all_worlds_of_user(
+        user_id: str,
+        limit: Optional[int] = None,
+        start_after: Optional[str] = None) -> List[dict]:
     """
     Fetch all worlds owned by a specific user.
 
     Args:
         user_id (str): The user's ID.
+        limit (int, optional): Maximum number of worlds to return.
+        start_after (str, optional): Return worlds after this world ID.
 
     Returns:
         List[dict]: List of world data as dictionaries.
@@ -57,14 +114,11 @@ def get_all_worlds_of_user(user_id: str) -> List[dict]:
         Exception: If there is a general error.
     """
     try:
-        docs = firebase_db.collection(COLLECTION_NAME).where(
-            "by_user", "==", user_id).get()
-        worlds=[]
-        for doc in docs:
-            data = doc.to_dict()
-            data["id"] = doc.id  # <-- Ensure id is present
-            worlds.append(data)
-        return worlds
+        return [
+            world
+            async for world in stream_worlds_of_user(user_id, limit,
+                                                     start_after)
+        ]
     except GoogleCloudError as db_error:
         raise GoogleCloudError(
             f"Database error while fetching worlds for user: {db_error}")
@@ -73,7 +127,7 @@ def get_all_worlds_of_user(user_id: str) -> List[dict]:
             f"Unexpected error while fetching worlds for user: {general_error}"
         )
 
-def create_world(world: WorldCreate) -> str:
+async def create_world(world: WorldCreate) -> str:
     """
     Create a new world.
 
@@ -93,17 +147,53 @@ def create_world(world: WorldCreate) -> str:
         # Ensure nested models are dicts
         world_data["areas"] =  []
         world_data["pois"] =  []
-        world_ref = firebase_db.collection(COLLECTION_NAME).document()
-        world_data["id"] = world_ref.id  # <-- Add this line!
-        world_ref.set(world_data)
-        return world_ref.id
+        world_id = await get_repository().create(COLLECTION_NAME, world_data,
+                                                 id_field="id")
+        _cache.set(world_id, world_data)
+        index_world(world_id, world_data)
+        return world_id
     except GoogleCloudError as db_error:
         raise GoogleCloudError(f"Database error while creating world: {db_error}")
     except Exception as general_error:
         raise Exception(f"Unexpected error while creating world: {general_error}")
 
 
-def update_world(world_id: str, world_update: WorldUpdate, image_file=None) -> Optional[dict]:
+def _prepare_update(world_id: str, update_data: dict) -> dict:
+    """
+    Turn the fields of a world update into what is stored in Firestore:
+    nested models become dicts, a base64 map image is saved to a file and
+    replaced by its path, and fields that must not change are dropped.
+    """
+    import os
+
+    # Convert nested models to dicts if present
+    if "areas" in update_data and update_data["areas"] is not None:
+        update_data["areas"] = [area.dict() if hasattr(area, "dict") else area for area in update_data["areas"]]
+    if "pois" in update_data and update_data["pois"] is not None:
+        update_data["pois"] = [poi.dict() if hasattr(poi, "dict") else poi for poi in update_data["pois"]]
+
+    # Handle base64 image string if present (not an uploaded file's path)
+    if "map_image" in update_data and isinstance(update_data["map_image"], str) and update_data["map_image"].startswith("data:"):
+        # Extract extension and base64 data
+        match = re.match(r"data:image/(?P<ext>\w+);base64,(?P<data>.+)", update_data["map_image"])
+        if match:
+            ext = match.group("ext")
+            base64_data = match.group("data")
+            filename = f"{world_id}.{ext}"
+            image_path = f"static/world_images/{filename}"
+            os.makedirs(os.path.dirname(image_path), exist_ok=True)  # <-- Ensure directory exists
+            with open(image_path, "wb") as f:
+                f.write(base64.b64decode(base64_data))
+            update_data["map_image"] = image_path
+
+    # Remove fields that should not be updated in Firestore
+    for key in ["id", "by_user"]:
+        if key in update_data:
+            del update_data[key]
+    return update_data
+
+
+async def update_world(world_id: str, world_update: WorldUpdate, image_file=None) -> Optional[dict]:
     """
     Update an existing world, optionally handling an uploaded image file or a base64 image string.
 
@@ -121,14 +211,7 @@ def update_world(world_id: str, world_update: WorldUpdate, image_file=None) -> O
         Exception: If there is a general error.
     """
     try:
-        world_ref = firebase_db.collection(COLLECTION_NAME).document(world_id)
         update_data = world_update.model_dump(exclude_unset=True)
-
-        # Convert nested models to dicts if present
-        if "areas" in update_data and update_data["areas"] is not None:
-            update_data["areas"] = [area.dict() if hasattr(area, "dict") else area for area in update_data["areas"]]
-        if "pois" in update_data and update_data["pois"] is not None:
-            update_data["pois"] = [poi.dict() if hasattr(poi, "dict") else poi for poi in update_data["pois"]]
         import os
 
         # Handle image file upload if present
@@ -141,33 +224,14 @@ def update_world(world_id: str, world_update: WorldUpdate, image_file=None) -> O
                 f.write(image_file.file.read())
             update_data["map_image"] = image_path
 
-        # Handle base64 image string if present and not a file upload
-        elif "map_image" in update_data and isinstance(update_data["map_image"], str) and update_data["map_image"].startswith("data:"):
-            # Extract extension and base64 data
-            match = re.match(r"data:image/(?P<ext>\w+);base64,(?P<data>.+)", update_data["map_image"])
-            if match:
-                ext = match.group("ext")
-                base64_data = match.group("data")
-                filename = f"{world_id}.{ext}"
-                image_path = f"static/world_images/{filename}"
-                os.makedirs(os.path.dirname(image_path), exist_ok=True)  # <-- Ensure directory exists
-                with open(image_path, "wb") as f:
-                    f.write(base64.b64decode(base64_data))
-                update_data["map_image"] = image_path
-
-        # Remove fields that should not be updated in Firestore
-        for key in ["id", "by_user"]:
-            if key in update_data:
-                del update_data[key]
-
-        world_ref.update(update_data)
-        updated_doc = world_ref.get()
-        if updated_doc.exists:
-            data = updated_doc.to_dict()
-            data["id"] = updated_doc.id  # Ensure id is present in response
-            return data
-        else:
-            return None
+        update_data = _prepare_update(world_id, update_data)
+        data = await get_repository().update(COLLECTION_NAME, world_id,
+                                             update_data,
+                                             _cache.peek(world_id))
+        data["id"] = world_id  # Ensure id is present in response
+        _cache.set(world_id, data)
+        index_world(world_id, data)
+        return data
     except NotFound as not_found_error:
         raise NotFound(f"World not found: {not_found_error}")
     except GoogleCloudError as db_error:
@@ -176,7 +240,43 @@ def update_world(world_id: str, world_update: WorldUpdate, image_file=None) -> O
     except Exception as general_error:
         raise Exception(
             f"Unexpected error while updating world: {general_error}")
-def delete_world(world_id: str) -> bool:
+async def mutate_world(world_id: str, mutation: Mutation) -> dict:
+    """
+    Change fields of a world with one atomic write, e.g. add an item ID
+    without re-sending every area and point of interest.
+
+    Args:
+        world_id (str): The ID of the world to change.
+        mutation (Mutation): The field changes. Whole fields in `set` are
+            prepared like those of update_world.
+
+    Returns:
+        dict: The updated world data.
+
+    Raises:
+        NotFound: If the world does not exist.
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        mutation.set = _prepare_update(world_id, mutation.set)
+        data = await get_repository().mutate(COLLECTION_NAME, world_id,
+                                             mutation)
+        data["id"] = world_id
+        _cache.set(world_id, data)
+        index_world(world_id, data)
+        return data
+    except NotFound as not_found_error:
+        raise NotFound(f"World not found: {not_found_error}")
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(
+            f"Database error while changing world: {db_error}")
+    except Exception as general_error:
+        raise Exception(
+            f"Unexpected error while changing world: {general_error}")
+
+
+async def delete_world(world_id: str) -> bool:
     """
     Delete a world by its ID.
 
@@ -192,8 +292,9 @@ def delete_world(world_id: str) -> bool:
         Exception: If there is a general error.
     """
     try:
-        world_ref = firebase_db.collection(COLLECTION_NAME).document(world_id)
-        world_ref.delete()
+        await get_repository().delete(COLLECTION_NAME, world_id)
+        _cache.invalidate(world_id)
+        lore_index.forget_world(world_id)
         return True
     except NotFound as not_found_error:
         raise NotFound(f"World not found: {not_found_error}")
@@ -202,4 +303,99 @@ def delete_world(world_id: str) -> bool:
             f"Database error while deleting world: {db_error}")
     except Exception as general_error:
         raise Exception(
-            f"Unexpected error while deleting world: {general_error}")
\ No newline at end of file
+            f"Unexpected error while deleting world: {general_error}")
+
+
+async def create_worlds(worlds: List[WorldCreate]) -> BulkWriteResult:
+    """
+    Create many worlds with batched writes.
+
+    Args:
+        worlds (List[WorldCreate]): The worlds' data.
+
+    Returns:
+        BulkWriteResult: The new world IDs in the order of `worlds`, and the
+            errors of the worlds that were not created.
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        created_at = datetime.now(timezone.utc)
+        documents = [{
+            **world.model_dump(), "created_at": created_at,
+            "areas": [],
+            "pois": []
+        } for world in worlds]
+        result = await get_repository().bulk_create(COLLECTION_NAME, documents, id_field="id")
+        for position, world_id in enumerate(result.ids):
+            if position not in result.errors:
+                _cache.set(world_id, documents[position])
+                index_world(world_id, documents[position])
+        return result
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(f"Database error while creating worlds: {db_error}")
+    except Exception as general_error:
+        raise Exception(f"Unexpected error while creating worlds: {general_error}")
+
+
+async def update_worlds(worlds: List[WorldBulkUpdate]) -> BulkWriteResult:
+    """
+    Apply many world updates, each identified by its `id`, with batched
+    writes. Only the fields set in each update are changed.
+
+    Args:
+        worlds (List[WorldBulkUpdate]): The updates.
+
+    Returns:
+        BulkWriteResult: The world IDs in the order of `worlds`, and the
+            errors of the updates that were not applied (e.g. not found).
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        result = await get_repository().bulk_update(COLLECTION_NAME, [
+            (world.id, _prepare_update(world.id, world.model_dump(exclude_unset=True)))
+            for world in worlds
+        ])
+        written_ids = result.written_ids()
+        for world_id in written_ids:
+            _cache.invalidate(world_id)
+        updated = await _cache.get_many(written_ids, _fetch_worlds)
+        for world_id, world_data in updated.items():
+            index_world(world_id, world_data)
+        return result
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(f"Database error while updating worlds: {db_error}")
+    except Exception as general_error:
+        raise Exception(f"Unexpected error while updating worlds: {general_error}")
+
+
+async def delete_worlds(world_ids: List[str]) -> BulkWriteResult:
+    """
+    Delete many worlds by ID with batched writes.
+
+    Args:
+        world_ids (List[str]): The IDs of the worlds to delete.
+
+    Returns:
+        BulkWriteResult: The world IDs, and the errors of the worlds that
+            were not deleted.
+
+    Raises:
+        GoogleCloudError: If there is a database error.
+        Exception: If there is a general error.
+    """
+    try:
+        result = await get_repository().bulk_delete(COLLECTION_NAME, world_ids)
+        for world_id in result.written_ids():
+            _cache.invalidate(world_id)
+            lore_index.forget_world(world_id)
+        return result
+    except GoogleCloudError as db_error:
+        raise GoogleCloudError(f"Database error while deleting worlds: {db_error}")
+    except Exception as general_error:
+        raise Exception(f"Unexpected error while deleting worlds: {general_error}")
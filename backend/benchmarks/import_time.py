@@ -0,0 +1,78 @@
+"""
+Measure how long it takes to import the application.
+
+Each run imports `app.main` in a fresh interpreter so nothing is shared
+between runs. Run from the backend directory with the usual environment
+(.env) in place:
+
+    python benchmarks/import_time.py --runs 10 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(args):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    return subprocess.run([sys.executable, *args],
+                          cwd=BACKEND_DIR,
+                          env=env,
+                          capture_output=True,
+                          text=True,
+                          check=True)
+
+
+def time_imports(module: str, runs: int):
+    """
+    Return the wall-clock seconds of `runs` fresh-interpreter imports.
+    """
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        _run(["-c", f"import {module}"])
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def slowest_imports(module: str, top: int):
+    """
+    Return the `top` modules with the highest cumulative import time (in
+    microseconds) according to `python -X importtime`.
+    """
+    stderr = _run(["-X", "importtime", "-c", f"import {module}"]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line.split(":", 1)[1].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    timings = time_imports(args.module, args.runs)
+    print(f"import {args.module}: median {statistics.median(timings):.3f}s, "
+          f"min {min(timings):.3f}s, max {max(timings):.3f}s "
+          f"over {args.runs} runs")
+    if args.top:
+        print("\nslowest imports (cumulative):")
+        for cumulative_us, name in slowest_imports(args.module, args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure the cost of sending a large world: JSON serialization time with the
+standard library and with orjson, and the response size and compression
+time with gzip and brotli.
+
+The world is generated in memory, with `--areas` areas whose GeoJSON
+boundaries have `--vertices` points each, so no database is needed:
+
+    python benchmarks/response_serialization.py --areas 500 --runs 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import responses  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse, ORJSONResponse  # noqa: E402
+from app.core.compression import CompressionMiddleware, brotli  # noqa: E402
+from app.db.world import World  # noqa: E402
+
+
+def make_world(areas: int, vertices: int) -> dict:
+    """
+    A world document with `areas` polygon areas and as many points of
+    interest.
+    """
+    rng = random.Random(0)
+
+    def polygon():
+        x, y = rng.uniform(-180, 170), rng.uniform(-80, 70)
+        ring = [[round(x + rng.random() * 10, 6),
+                 round(y + rng.random() * 10, 6)]
+                for _ in range(vertices - 1)]
+        return {"type": "Polygon", "coordinates": [ring + [ring[0]]]}
+
+    return {
+        "id": "benchmark-world",
+        "name": "Benchmark World",
+        "type": "Fantasy",
+        "description": "A world generated for the serialization benchmark.",
+        "by_user": "benchmark",
+        "item_ids": [f"item-{i}" for i in range(200)],
+        "map_image": None,
+        "areas": [{
+            "id": f"area-{i}",
+            "name": f"Area {i}",
+            "type": "region",
+            "description": f"The lands of area {i}. " * 4,
+            "boundary": polygon(),
+        } for i in range(areas)],
+        "pois": [{
+            "id": f"poi-{i}",
+            "name": f"Point {i}",
+            "type": "town",
+            "description": "",
+            "location": {"type": "Point",
+                         "coordinates": [rng.uniform(-180, 180),
+                                         rng.uniform(-90, 90)]},
+        } for i in range(areas)],
+    }
+
+
+def measure(function, runs: int):
+    """
+    Return the median milliseconds of `runs` calls and the last result.
+    """
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--areas", type=int, default=500)
+    parser.add_argument("--vertices", type=int, default=64)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    document = make_world(args.areas, args.vertices)
+    # What the route's response_model produces before rendering.
+    content = World.model_validate(document).model_dump(mode="json")
+    validate_ms, _ = measure(
+        lambda: World.model_validate(document).model_dump(mode="json"),
+        args.runs)
+    print(f"world: {args.areas} areas x {args.vertices} vertices")
+    print(f"{'response_model validate + dump':34s} {validate_ms:8.2f} ms")
+
+    renderers = {
+        "jsonable_encoder + json": lambda: JSONResponse(
+            jsonable_encoder(document)).body,
+        "json (JSONResponse)": lambda: JSONResponse(content).body,
+    }
+    if responses.orjson is not None:
+        renderers["orjson (ORJSONResponse)"] = lambda: ORJSONResponse(
+            content).body
+    body = None
+    for name, render in renderers.items():
+        elapsed, rendered = measure(render, args.runs)
+        body = rendered if body is None else body
+        print(f"{name:34s} {elapsed:8.2f} ms  {len(rendered):>10,d} bytes")
+
+    middleware = CompressionMiddleware(None)
+    encodings = ["gzip", "br"] if brotli is not None else ["gzip"]
+    for encoding in encodings:
+        elapsed, compressed = measure(
+            lambda: middleware.compress(body, encoding), args.runs)
+        ratio = len(compressed) / len(body)
+        level = (middleware.brotli_quality if encoding == "br"
+                 else middleware.gzip_level)
+        print(f"{f'{encoding} (level {level})':34s} {elapsed:8.2f} ms"
+              f"  {len(compressed):>10,d} bytes ({ratio:.1%})")
+    if brotli is None:
+        print("brotli is not installed; only gzip was measured")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare per-update latency of the document update strategies.
+
+- read-after-write: update() followed by get(), as the services used to do
+- concurrent pre-image: update_and_merge() without a cached copy
+- cached pre-image: update_and_merge() with the document already cached
+
+Runs against the Firestore project configured in .env, or against the
+emulator when FIRESTORE_EMULATOR_HOST is set. A scratch document is created
+in the given collection and deleted afterwards:
+
+    python benchmarks/update_latency.py --updates 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.firebase import get_async_firestore_client, update_and_merge  # noqa: E402
+
+
+async def read_after_write(doc_ref, data, _pre_image):
+    await doc_ref.update(data)
+    return (await doc_ref.get()).to_dict()
+
+
+async def concurrent_pre_image(doc_ref, data, _pre_image):
+    return await update_and_merge(doc_ref, data)
+
+
+async def cached_pre_image(doc_ref, data, pre_image):
+    return await update_and_merge(doc_ref, data, pre_image)
+
+
+STRATEGIES = {
+    "read-after-write": read_after_write,
+    "concurrent pre-image": concurrent_pre_image,
+    "cached pre-image": cached_pre_image,
+}
+
+
+async def run(collection: str, updates: int):
+    document = {
+        "name": "Benchmark Blade",
+        "description": "x" * 2000,
+        "cost": 0,
+        "tags": [f"tag-{i}" for i in range(50)],
+    }
+    doc_ref = get_async_firestore_client().collection(collection).document()
+    await doc_ref.set(document)
+    try:
+        # One untimed round-trip so connection setup is not measured.
+        await doc_ref.get()
+        for name, strategy in STRATEGIES.items():
+            timings = []
+            for i in range(updates):
+                data = {"cost": i, "name": f"Benchmark Blade {i}"}
+                started = time.perf_counter()
+                document = await strategy(doc_ref, data, document)
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[int(len(timings) * 0.95) - 1]
+            print(f"{name:22s} median {statistics.median(timings):7.2f} ms"
+                  f"  p95 {p95:7.2f} ms")
+    finally:
+        await doc_ref.delete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--collection", default="_benchmarks")
+    parser.add_argument("--updates", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.collection, args.updates))
+
+
+if __name__ == "__main__":
+    main()
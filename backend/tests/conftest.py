@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings without defaults, so the app modules import without a .env file.
+# Nothing in the tests talks to Firebase or the model provider.
+for name in ("FIREBASE_CREDENTIALS_PATH", "FIREBASE_API_KEY",
+             "FIREBASE_PROJECT_ID", "FIREBASE_PROJECT_NUMBER",
+             "FIREBASE_AUTH_REDIRECT_URI", "FIREBASE_CONFIG_PATH",
+             "MODEL_NAME", "HF_API_KEY", "PROVIDER", "GOOGLE_CLIENT_ID",
+             "GOOGLE_CLIENT_SECRET", "GOOGLE_REDIRECT_URI", "GITHUB_CLIENT_ID",
+             "GITHUB_CLIENT_SECRET", "GITHUB_REDIRECT_URI"):
+    os.environ.setdefault(name, "test")
+# Keep everything in memory and off the network.
+os.environ.setdefault("REPOSITORY_BACKEND", "memory")
+os.environ.setdefault("CAMPAIGN_MEMORY_DIR", "")
+os.environ.setdefault("WARM_UP_CLIENTS", "false")
+
+
+@pytest.fixture
+def anyio_backend():
+    # The app runs on asyncio only.
+    return "asyncio"
@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi.testclient import TestClient
+from app.repository import get_repository
+from app.services import campaign_events
+from app.services.campaign_events import (EventBuffer, EventBufferFull,
+                                          events_collection, record_events,
+                                          stream_events)
+from app.services.campaign_memory import get_campaign_memory
+
+pytestmark = pytest.mark.anyio
+
+DELAY_MS = 20
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def events(count: int, start: int = 0) -> list:
+    return [{"timestamp": T0 + timedelta(minutes=start + position),
+             "event_type": "player_action",
+             "description": f"event {start + position}",
+             "character_id": None, "world_id": None}
+            for position in range(count)]
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    buffer = EventBuffer(max_events=3, max_delay_ms=DELAY_MS,
+                         max_pending=5)
+    monkeypatch.setattr(campaign_events, "_buffer", buffer)
+    return buffer
+
+
+@pytest.fixture
+def failing_writes(monkeypatch):
+    """
+    Make event writes fail until the returned list is cleared.
+    """
+    bulk_set = get_repository().bulk_set
+    failing = [True]
+
+    async def flaky(collection, entries):
+        if failing:
+            raise RuntimeError("unavailable")
+        return await bulk_set(collection, entries)
+
+    monkeypatch.setattr(get_repository(), "bulk_set", flaky)
+    return failing
+
+
+async def stored_ids(campaign_id: str) -> list:
+    return [row["id"] async for row in get_repository().stream(
+        events_collection(campaign_id))]
+
+
+async def settle():
+    await asyncio.sleep(DELAY_MS / 1000 * 5)
+
+
+async def test_a_full_batch_is_written_at_once(buffer):
+    ids = record_events("batch", events(2))
+    assert len(buffer) == 2
+    await asyncio.sleep(0)
+    assert await stored_ids("batch") == []
+    ids += record_events("batch", events(1, 2))
+    # The flush task runs at the next turn of the loop, not after the delay.
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert len(buffer) == 0
+    assert await stored_ids("batch") == ids
+
+
+async def test_events_are_written_after_the_delay(buffer):
+    ids = record_events("timed", events(1))
+    await settle()
+    assert len(buffer) == 0
+    assert await stored_ids("timed") == ids
+
+
+async def test_failed_writes_are_retried_without_new_events(
+        buffer, failing_writes):
+    ids = record_events("retried", events(2))
+    assert await buffer.flush() == 0
+    assert [doc_id for doc_id, _ in buffer.pending("retried")] == ids
+    failing_writes.clear()
+    await settle()
+    assert len(buffer) == 0
+    assert await stored_ids("retried") == ids
+
+
+async def test_new_events_are_refused_when_the_buffer_is_full(
+        buffer, failing_writes):
+    record_events("full", events(2))
+    await buffer.flush()
+    record_events("full", events(2, 2))
+    with pytest.raises(EventBufferFull) as raised:
+        record_events("full", events(2, 4))
+    assert raised.value.retry_after >= 1
+    assert len(buffer) == 4
+
+
+async def test_discard_drops_a_campaigns_events(buffer):
+    record_events("kept", events(1))
+    record_events("dropped", events(1))
+    assert buffer.discard("dropped") == 1
+    assert buffer.discard("dropped") == 0
+    assert len(buffer) == 1
+    assert await buffer.flush() == 1
+    assert await stored_ids("dropped") == []
+
+
+async def test_written_events_reach_the_memory_with_their_ids(buffer):
+    ids = record_events("remembered", events(2))
+    await buffer.flush()
+    memory = get_campaign_memory("remembered")
+    assert all(doc_id in memory for doc_id in ids)
+
+
+async def test_reads_include_events_whose_write_failed(buffer,
+                                                       failing_writes):
+    failing_writes.clear()
+    stored = record_events("read", [events(4)[0], events(4)[2]])
+    await buffer.flush()
+    failing_writes.append(True)
+    pending = record_events("read", [events(4)[1], events(4)[3]])
+
+    rows = [row async for row in stream_events("read")]
+    assert [row["id"] for row in rows] == [stored[0], pending[0], stored[1],
+                                           pending[1]]
+    assert rows[1]["description"] == "event 1"
+    assert len(buffer) == 2
+    # Paging, the time range and projections apply to them too.
+    rows = [row async for row in stream_events("read", limit=2,
+                                               start_after=stored[0],
+                                               fields=["description"])]
+    assert rows == [{"description": "event 1", "id": pending[0]},
+                    {"description": "event 2", "id": stored[1]}]
+    rows = [row async for row in stream_events(
+        "read", since=T0 + timedelta(minutes=3))]
+    assert [row["id"] for row in rows] == [pending[1]]
+    rows = [row async for row in stream_events(
+        "read", until=T0 + timedelta(minutes=2))]
+    assert [row["id"] for row in rows] == [stored[0], pending[0]]
+
+
+def test_a_full_buffer_answers_503(monkeypatch):
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.portal.call(get_repository().set, "campaigns", "busy",
+                           {"name": "Busy"})
+        monkeypatch.setattr(campaign_events, "_buffer",
+                            EventBuffer(100, 60000, max_pending=1))
+        body = [{**event, "timestamp": event["timestamp"].isoformat()}
+                for event in events(2)]
+        response = client.post("/api/campaign/busy/events", json=body)
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "60"
+        response = client.post("/api/campaign/busy/events", json=body[:1])
+        assert response.status_code == 202
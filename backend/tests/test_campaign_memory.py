@@ -0,0 +1,156 @@
+import os
+import numpy as np
+import pytest
+from app.repository import get_repository
+from app.services import ai_service
+from app.services.campaign_events import get_synced_memory, import_events
+from app.services.campaign_memory import (CampaignMemory, HashingEmbedder,
+                                          _memories, get_campaign_memory,
+                                          mark_stale)
+
+DIM = 64
+
+EVENTS = [
+    {"id": "e1", "timestamp": "2026-01-01T10:00:00",
+     "description": "The party met the dragon Vyrax in the mountains"},
+    {"id": "e2", "timestamp": "2026-01-01T11:00:00",
+     "description": "They bought rope and torches at the market"},
+    {"id": "e3", "timestamp": "2026-01-01T12:00:00",
+     "description": "Vyrax the dragon burned the village"},
+]
+
+
+@pytest.fixture
+def embedder():
+    return HashingEmbedder(dim=DIM)
+
+
+def event(position: int) -> dict:
+    return {"id": f"e{position:03d}", "timestamp": "2026-01-01",
+            "description": f"event number {position} about topic{position}"}
+
+
+class TestHashingEmbedder:
+
+    def test_vectors_are_unit_length_and_stable(self, embedder):
+        vector = embedder.embed("The dragon sleeps")
+        assert vector.dtype == np.float32 and vector.shape == (DIM, )
+        assert np.linalg.norm(vector) == pytest.approx(1.0)
+        assert np.array_equal(vector, HashingEmbedder(dim=DIM).embed(
+            "the DRAGON sleeps!"))
+
+    def test_text_without_words_embeds_to_zero(self, embedder):
+        assert not embedder.embed("  ?! ").any()
+
+    def test_shared_words_score_higher(self, embedder):
+        query = embedder.embed("dragon attack")
+        assert (query @ embedder.embed("the dragon attacked") >
+                query @ embedder.embed("buying bread"))
+
+
+class TestCampaignMemory:
+
+    def test_search_returns_the_top_k_by_cosine_best_first(self, embedder):
+        memory = CampaignMemory("c", embedder)
+        assert memory.append(EVENTS) == 3
+        query = embedder.embed("dragon Vyrax")
+        expected = sorted(
+            ((float(query @ embedder.embed(known["description"])),
+              known["id"]) for known in EVENTS), reverse=True)[:2]
+        results = memory.search("dragon Vyrax", 2)
+        assert [found["id"] for _, found in results] == [
+            event_id for _, event_id in expected]
+        assert [score for score, _ in results] == pytest.approx(
+            [score for score, _ in expected])
+        assert {found["id"] for _, found in results} == {"e1", "e3"}
+        scores = [score for score, _ in memory.search("dragon Vyrax", 10)]
+        assert len(scores) == 3 and scores == sorted(scores, reverse=True)
+        assert memory.search("dragon", 0) == []
+        assert memory.search("dragon", -5) == []
+        assert memory.search("?!", 3) == []
+        assert CampaignMemory("empty", embedder).search("dragon") == []
+
+    def test_events_are_stored_once_by_log_id(self, embedder):
+        memory = CampaignMemory("c", embedder)
+        assert memory.append(EVENTS[:2]) == 2
+        assert memory.append([EVENTS[1], EVENTS[1], EVENTS[2]]) == 1
+        assert len(memory) == 3 and "e3" in memory
+        with pytest.raises(ValueError):
+            memory.append([{"description": "no id"}])
+
+    def test_sync_adds_missing_events_in_any_order(self, embedder):
+        memory = CampaignMemory("c", embedder)
+        memory.append([EVENTS[2]])
+        assert not memory.synced
+        # The log is sorted by timestamp, so an event the memory missed can
+        # come before the ones it has.
+        assert memory.sync_history(EVENTS) == 2
+        assert memory.synced and len(memory) == 3
+        assert memory.sync_history(EVENTS) == 0
+
+    def test_capacity_grows_by_doubling(self, embedder):
+        memory = CampaignMemory("c", embedder)
+        for position in range(40):
+            memory.append([event(position)])
+        assert len(memory) == 40
+        assert memory._vectors.shape == (64, DIM)
+        _, best = memory.search("topic0", 1)[0]
+        assert best["id"] == "e000"
+
+    def test_reloads_from_disk(self, embedder, tmp_path):
+        memory = CampaignMemory("c", embedder, str(tmp_path))
+        memory.append(EVENTS[:2])
+        memory.append(EVENTS[2:])
+        reloaded = CampaignMemory("c", embedder, str(tmp_path))
+        assert len(reloaded) == 3 and not reloaded.synced
+        assert reloaded.search("market rope", 3) == memory.search(
+            "market rope", 3)
+
+    def test_partial_vector_write_is_re_embedded(self, embedder, tmp_path):
+        CampaignMemory("c", embedder, str(tmp_path)).append(EVENTS)
+        vectors_path = os.path.join(tmp_path, "c.f32")
+        with open(vectors_path, "r+b") as f:
+            f.truncate(os.path.getsize(vectors_path) - 10)
+        reloaded = CampaignMemory("c", embedder, str(tmp_path))
+        assert len(reloaded) == 3
+        assert os.path.getsize(vectors_path) == 3 * DIM * 4
+        _, best = reloaded.search("market rope", 1)[0]
+        assert best["id"] == "e2"
+        # The repaired files load as they are.
+        assert len(CampaignMemory("c", embedder, str(tmp_path))) == 3
+
+    def test_partial_or_legacy_event_lines_are_dropped(self, embedder,
+                                                       tmp_path):
+        CampaignMemory("c", embedder, str(tmp_path)).append(EVENTS[:2])
+        with open(os.path.join(tmp_path, "c.jsonl"), "a") as f:
+            f.write('{"description": "saved without an id"}\n{"id": "e3", ')
+        reloaded = CampaignMemory("c", embedder, str(tmp_path))
+        assert len(reloaded) == 2
+        assert reloaded.sync_history(EVENTS) == 1
+        assert len(CampaignMemory("c", embedder, str(tmp_path))) == 3
+
+
+@pytest.mark.parametrize("campaign_id", [
+    "../../etc/passwd", "a/b", "..", "", "id with spaces"])
+def test_ids_that_are_not_plain_are_rejected(campaign_id):
+    with pytest.raises(ValueError):
+        get_campaign_memory(campaign_id)
+
+
+@pytest.mark.anyio
+async def test_no_memory_is_created_for_unknown_campaigns():
+    assert await ai_service.retrieve_memories("hello", "missing") is None
+    assert _memories.get("missing") is None
+
+
+@pytest.mark.anyio
+async def test_imported_events_reach_a_loaded_memory():
+    await get_repository().set("campaigns", "imported", {"name": "C"})
+    await import_events("imported", [EVENTS[0]])
+    memory = await get_synced_memory("imported")
+    assert len(memory) == 1
+    await import_events("imported", EVENTS[1:])
+    assert not memory.synced
+    assert len(await get_synced_memory("imported")) == 3
+    mark_stale("imported")
+    assert len(await get_synced_memory("imported")) == 3
@@ -0,0 +1,149 @@
+import asyncio
+import pytest
+from app.db.character import Character
+from app.repository import Mutation, get_repository
+from app.repository.base import new_id
+from app.services import character_service
+from app.services.character_service import (WriteCoalescer,
+                                            delete_character,
+                                            flush_character_writes,
+                                            get_character, mutate_character,
+                                            stream_characters_in_world,
+                                            update_character)
+
+pytestmark = pytest.mark.anyio
+
+DELAY_MS = 20
+
+
+@pytest.fixture
+def writes(monkeypatch):
+    coalescer = WriteCoalescer(DELAY_MS)
+    monkeypatch.setattr(character_service, "_writes", coalescer)
+    return coalescer
+
+
+def character(**changes) -> dict:
+    data = {
+        "name": "Hero", "class_id": "fighter", "specialization_id": None,
+        "level": 1, "experience": 0, "experience_for_next_level": 100,
+        "attributes": [], "skills": [], "spells": [], "equipment": [],
+        "inventory": [], "status_conditions": [], "race": "human",
+        "personality_traits": [], "background_story": "", "feats": [],
+        "titles": [], "image": None,
+    }
+    return {**data, **changes}
+
+
+async def stored_character(**changes) -> str:
+    character_id = new_id()
+    await get_repository().set("characters", character_id,
+                               character(world_id="w-" + character_id,
+                                         **changes))
+    return character_id
+
+
+async def put(character_id: str, **changes):
+    return await update_character(
+        character_id, Character(id=character_id, **character(**changes)))
+
+
+async def stored(character_id: str) -> dict:
+    return await get_repository().get("characters", character_id)
+
+
+async def test_repeated_updates_are_merged_into_one_write(writes,
+                                                          monkeypatch):
+    character_id = await stored_character()
+    calls = []
+    bulk_update = get_repository().bulk_update
+
+    async def counted(collection, updates):
+        calls.append([doc_id for doc_id, _ in updates])
+        return await bulk_update(collection, updates)
+
+    monkeypatch.setattr(get_repository(), "bulk_update", counted)
+    await put(character_id, level=2)
+    updated = await put(character_id, level=3, name="Champion")
+    assert updated["level"] == 3 and updated["id"] == character_id
+    assert len(writes) == 1
+    # Not written yet, but read back with the pending update.
+    assert (await stored(character_id))["level"] == 1
+    assert (await get_character(character_id))["name"] == "Champion"
+    assert await flush_character_writes() == 1
+    assert calls == [[character_id]]
+    assert (await stored(character_id))["level"] == 3
+    assert await flush_character_writes() == 0
+
+
+async def test_updates_are_written_after_the_delay(writes):
+    character_id = await stored_character()
+    await put(character_id, level=4)
+    await asyncio.sleep(DELAY_MS / 1000 * 5)
+    assert len(writes) == 0
+    assert (await stored(character_id))["level"] == 4
+
+
+async def test_failed_writes_are_retried(writes, monkeypatch):
+    character_id = await stored_character()
+    bulk_update = get_repository().bulk_update
+    failures = [RuntimeError("unavailable")]
+
+    async def flaky(collection, updates):
+        if failures:
+            raise failures.pop()
+        return await bulk_update(collection, updates)
+
+    monkeypatch.setattr(get_repository(), "bulk_update", flaky)
+    await put(character_id, level=5)
+    assert await flush_character_writes() == 0
+    assert writes.pending(character_id)["level"] == 5
+    # A newer update wins over the failed one it is merged with.
+    await put(character_id, level=6)
+    await asyncio.sleep(DELAY_MS / 1000 * 5)
+    assert len(writes) == 0
+    assert (await stored(character_id))["level"] == 6
+
+
+async def test_failed_writes_of_deleted_characters_are_dropped(writes):
+    character_id = await stored_character()
+    await put(character_id, level=2)
+    await get_repository().delete("characters", character_id)
+    assert await flush_character_writes() == 0
+    assert len(writes) == 0
+    assert await stored(character_id) is None
+
+
+async def test_deleting_discards_pending_updates(writes):
+    character_id = await stored_character()
+    await put(character_id, level=2)
+    await delete_character(character_id)
+    assert writes.pending(character_id) is None
+    await asyncio.sleep(DELAY_MS / 1000 * 5)
+    assert await stored(character_id) is None
+
+
+async def test_pending_updates_are_written_before_a_mutation(writes):
+    character_id = await stored_character()
+    await put(character_id, level=2, experience=50)
+    mutated = await mutate_character(
+        character_id, Mutation(increment={"experience": 25}))
+    assert mutated["level"] == 2 and mutated["experience"] == 75
+    assert len(writes) == 0
+    # The timer firing later has nothing left to overwrite it with.
+    await asyncio.sleep(DELAY_MS / 1000 * 5)
+    assert (await stored(character_id))["experience"] == 75
+
+
+async def test_lists_include_pending_updates(writes):
+    character_id = await stored_character()
+    world_id = "w-" + character_id
+    await put(character_id, level=7)
+    rows = [row async for row in stream_characters_in_world(world_id)]
+    assert [(row["id"], row["level"]) for row in rows] == [(character_id, 7)]
+    rows = [row async for row in stream_characters_in_world(
+        world_id, fields=["level"])]
+    assert rows == [{"id": character_id, "level": 7}]
+    rows = [row async for row in stream_characters_in_world(
+        world_id, fields=["name"])]
+    assert rows == [{"id": character_id, "name": "Hero"}]
@@ -0,0 +1,44 @@
+import pytest
+from fastapi import HTTPException
+from app.api.listing import list_params
+from app.db.character import Character, CharacterSummary
+from app.db.world import World, WorldSummary
+
+
+def parse(dependency, fields=None, **params):
+    return dependency(limit=params.get("limit"),
+                      start_after=params.get("start_after"),
+                      format=params.get("format", "json"), fields=fields)
+
+
+def test_fields_select_a_projection():
+    params = parse(list_params(World, WorldSummary), "name, id,type,name")
+    assert params.fields == ["name", "type"]
+    assert params.row_model is None
+    assert parse(list_params(World, WorldSummary)).row_model is World
+
+
+def test_summary_selects_the_summary_model():
+    params = parse(list_params(World, WorldSummary), "summary")
+    assert params.row_model is WorldSummary
+    assert "id" not in params.fields
+    with pytest.raises(HTTPException) as raised:
+        parse(list_params(World), "summary")
+    assert raised.value.status_code == 422
+
+
+@pytest.mark.parametrize("fields", ["bogus", "name,bogus", "name.first",
+                                    "1st"])
+def test_unknown_or_invalid_fields_are_rejected(fields):
+    with pytest.raises(HTTPException) as raised:
+        parse(list_params(World, WorldSummary), fields)
+    assert raised.value.status_code == 422
+
+
+def test_field_model_checks_lists_without_a_row_model():
+    dependency = list_params(summary_model=CharacterSummary,
+                             field_model=Character)
+    assert parse(dependency, "name").fields == ["name"]
+    assert parse(dependency).row_model is None
+    with pytest.raises(HTTPException):
+        parse(dependency, "bogus")
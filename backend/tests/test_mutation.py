@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import pytest
+from fastapi import HTTPException
+from pydantic import BaseModel
+from app.api.mutation import to_mutation
+from app.db.campaign import CampaignBase
+from app.db.schemas import MutationRequest
+from app.db.world import WorldBase
+
+
+class Stats(BaseModel):
+    hp: int
+    speed: float = 0.0
+
+
+class Document(BaseModel):
+    id: str
+    name: str
+    level: int = 1
+    stats: Stats
+    bonus: Optional[Stats] = None
+    meta: dict = {}
+    counts: Dict[str, int] = {}
+    tags: List[str] = []
+    updated_at: datetime
+
+
+def mutation_of(model=Document, **body):
+    return to_mutation(MutationRequest(**body), model)
+
+
+def rejected(model=Document, **body) -> str:
+    with pytest.raises(HTTPException) as raised:
+        mutation_of(model, **body)
+    assert raised.value.status_code == 422
+    return raised.value.detail
+
+
+def test_whole_fields_are_validated():
+    mutation = mutation_of(set={"name": "Blade", "stats": {"hp": "3"}},
+                           add={"tags": ["a"]}, increment={"level": 2})
+    assert mutation.set == {"name": "Blade", "stats": {"hp": 3, "speed": 0.0}}
+    assert mutation.add == {"tags": ["a"]}
+    assert mutation.increment == {"level": 2}
+
+
+def test_nested_paths_follow_models_and_maps():
+    mutation = mutation_of(set={"stats.hp": "7", "meta.colour": "red"},
+                           increment={"counts.kills": 1})
+    assert mutation.set == {"stats.hp": 7, "meta.colour": "red"}
+    assert mutation.increment == {"counts.kills": 1}
+    assert "stats.hp" in rejected(set={"stats.hp": "many"})
+    assert "counts.kills" in rejected(set={"counts.kills": "x"})
+
+
+@pytest.mark.parametrize("path", [
+    "name.x",  # a string
+    "tags.0",  # an array
+    "level.value",  # a number
+    "stats.unknown",  # not a field of the nested model
+    "bonus.speed",  # would create a partial model where there is none
+    "unknown",
+    "id",  # read-only
+])
+def test_paths_into_non_maps_are_rejected(path):
+    assert "cannot be changed" in rejected(set={path: 1})
+
+
+def test_world_name_cannot_become_a_map():
+    assert "name.x" in rejected(WorldBase, set={"name.x": 1})
+    assert "areas.0" in rejected(WorldBase, set={"areas.0.name": "x"})
+
+
+def test_increment_only_applies_to_numbers():
+    assert "not a number" in rejected(CampaignBase,
+                                      increment={"updated_at": 5})
+    assert "not a number" in rejected(increment={"name": 1})
+    assert "not a number" in rejected(increment={"meta.anything": 1})
+    assert "level" in rejected(increment={"level": 1.5})
+    assert mutation_of(increment={"stats.speed": 0.5}).increment == {
+        "stats.speed": 0.5}
+
+
+def test_array_changes_only_apply_to_arrays():
+    assert "not an array" in rejected(add={"name": ["x"]})
+    assert "not an array" in rejected(remove={"stats.hp": [1]})
+    assert "tags" in rejected(add={"tags": [{"not": "a string"}]})
+
+
+def test_empty_and_overlapping_mutations_are_rejected():
+    rejected()
+    rejected(set={"stats": {"hp": 1}}, increment={"stats.hp": 1})
@@ -0,0 +1,230 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from google.cloud.exceptions import NotFound
+from app.repository import Mutation
+from app.repository.base import apply_mutation
+from app.repository.memory import MemoryRepository
+from app.repository.sqlite import SQLiteRepository
+
+pytestmark = pytest.mark.anyio
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "memory":
+        repository = MemoryRepository()
+    else:
+        repository = SQLiteRepository(str(tmp_path / "test.db"))
+    yield repository
+    repository.close()
+
+
+async def ids(rows) -> list:
+    return [row["id"] async for row in rows]
+
+
+async def test_create_get_set_delete(repo):
+    data = {"name": "Blade", "cost": 3}
+    doc_id = await repo.create("items", data, id_field="id")
+    assert data["id"] == doc_id
+    assert await repo.get("items", doc_id) == {"name": "Blade", "cost": 3,
+                                               "id": doc_id}
+    assert await repo.get("items", "missing") is None
+    await repo.set("items", "fixed", {"name": "Shield"})
+    assert await repo.get_many("items", ["fixed", "missing", doc_id]) == {
+        "fixed": {"name": "Shield"},
+        doc_id: {"name": "Blade", "cost": 3, "id": doc_id},
+    }
+    await repo.delete("items", "fixed")
+    await repo.delete("items", "fixed")  # deleting a missing one succeeds
+    assert await repo.get("items", "fixed") is None
+
+
+async def test_update_merges_top_level_fields(repo):
+    await repo.set("items", "a", {"name": "Blade", "stats": {"hp": 1}})
+    updated = await repo.update("items", "a", {"stats": {"speed": 2},
+                                               "cost": 5})
+    assert updated == {"name": "Blade", "stats": {"speed": 2}, "cost": 5}
+    assert await repo.get("items", "a") == updated
+
+
+async def test_update_and_mutate_of_missing_documents_raise_not_found(repo):
+    with pytest.raises(NotFound):
+        await repo.update("items", "missing", {"name": "x"})
+    with pytest.raises(NotFound):
+        await repo.mutate("items", "missing", Mutation(set={"name": "x"}))
+    assert await repo.get("items", "missing") is None
+
+
+async def test_datetimes_round_trip(repo):
+    await repo.set("campaigns", "c", {"created_at": T0})
+    assert (await repo.get("campaigns", "c"))["created_at"] == T0
+
+
+async def test_stream_filters_pages_and_projects(repo):
+    for position in range(6):
+        await repo.set("characters", f"c{position}", {
+            "name": f"Hero {position}",
+            "world_id": "w1" if position % 2 else "w2",
+            "level": position,
+            "created_at": T0 + timedelta(days=position),
+        })
+    assert await ids(repo.stream("characters")) == [
+        "c0", "c1", "c2", "c3", "c4", "c5"]
+    # An indexed equality filter, combined with a range on another field.
+    assert await ids(repo.stream("characters", [("world_id", "==", "w1"),
+                                                ("level", ">", 1)])) == [
+        "c3", "c5"]
+    assert await ids(repo.stream(
+        "characters",
+        [("created_at", ">=", T0 + timedelta(days=4))])) == ["c4", "c5"]
+    # A missing field or a value of another type never matches.
+    assert await ids(repo.stream("characters", [("level", "<", "9")])) == []
+    assert await ids(repo.stream("characters", [("rank", "==", None)])) == []
+    # Cursor paging.
+    assert await ids(repo.stream("characters", limit=2)) == ["c0", "c1"]
+    assert await ids(repo.stream("characters", limit=2,
+                                 start_after="c1")) == ["c2", "c3"]
+    assert await ids(repo.stream("characters", [("world_id", "==", "w2")],
+                                 limit=5, start_after="c0")) == ["c2", "c4"]
+    # Projection.
+    rows = [row async for row in repo.stream(
+        "characters", [("world_id", "==", "w1")], limit=1,
+        fields=["name", "missing"])]
+    assert rows == [{"name": "Hero 1", "id": "c1"}]
+    rows = [row async for row in repo.stream("characters", limit=1,
+                                             fields=[])]
+    assert rows == [{"id": "c0"}]
+
+
+async def test_filters_compare_values_of_the_same_kind_only(repo):
+    await repo.set("characters", "a", {"alive": True, "rank": None,
+                                       "world_id": None})
+    await repo.set("characters", "b", {"alive": 1, "rank": "1"})
+    await repo.set("characters", "c", {"alive": False})
+    assert await ids(repo.stream("characters", [("alive", "==", True)])) == [
+        "a"]
+    assert await ids(repo.stream("characters", [("alive", "==", 1)])) == ["b"]
+    assert await ids(repo.stream("characters", [("alive", ">=", 0)])) == ["b"]
+    assert await ids(repo.stream("characters", [("rank", "==", 1)])) == []
+    # == None matches explicit nulls, not missing fields.
+    assert await ids(repo.stream("characters", [("rank", "==", None)])) == [
+        "a"]
+    assert await ids(repo.stream("characters",
+                                 [("world_id", "==", None)])) == ["a"]
+    assert await ids(repo.stream("characters", [("rank", ">", None)])) == []
+
+
+async def test_stream_reads_subcollections_separately(repo):
+    await repo.set("campaigns/a/events", "e1", {"n": 1})
+    await repo.set("campaigns/b/events", "e2", {"n": 2})
+    assert await ids(repo.stream("campaigns/a/events")) == ["e1"]
+
+
+async def test_stream_rejects_unknown_operators(repo):
+    await repo.set("items", "a", {"cost": 1})
+    with pytest.raises(ValueError):
+        await ids(repo.stream("items", [("cost", "!=", 1)]))
+
+
+async def test_bulk_writes(repo):
+    documents = [{"name": "a"}, {"name": "b"}]
+    result = await repo.bulk_create("items", documents, id_field="id")
+    assert result.errors == {}
+    assert [document["id"] for document in documents] == result.ids
+    assert (await repo.get("items", result.ids[1]))["name"] == "b"
+
+    result = await repo.bulk_set("items", [("x", {"name": "x"}),
+                                           ("y", {"name": "y"})])
+    assert result.ids == ["x", "y"] and result.errors == {}
+
+    # Updates of missing documents fail on their own.
+    result = await repo.bulk_update("items", [("x", {"cost": 1}),
+                                              ("missing", {"cost": 2}),
+                                              ("y", {"cost": 3})])
+    assert result.ids == ["x", "missing", "y"]
+    assert list(result.errors) == [1]
+    assert result.written_ids() == ["x", "y"]
+    assert (await repo.get("items", "y")) == {"name": "y", "cost": 3}
+    assert await repo.get("items", "missing") is None
+
+    result = await repo.bulk_delete("items", ["x", "missing"])
+    assert result.errors == {}
+    assert await repo.get_many("items", ["x", "y"]) == {
+        "y": {"name": "y", "cost": 3}}
+
+
+async def test_mutate_applies_transforms(repo):
+    await repo.set("worlds", "w", {"name": "W", "item_ids": ["a", "b"],
+                                   "visits": 1, "meta": {"tags": ["x"]},
+                                   "legacy": {"big": True}})
+    updated = await repo.mutate("worlds", "w", Mutation(
+        set={"meta.colour": "red"},
+        add={"item_ids": ["b", "c", "c"], "meta.tags": ["y"]},
+        remove={"missing_array": ["a"]},
+        increment={"visits": 2, "stats.score": 1.5},
+        delete=["legacy", "not_there"]))
+    expected = {"name": "W", "item_ids": ["a", "b", "c"], "visits": 3,
+                "meta": {"tags": ["x", "y"], "colour": "red"},
+                "missing_array": [], "stats": {"score": 1.5}}
+    assert updated == expected
+    assert await repo.get("worlds", "w") == expected
+
+
+class TestApplyMutation:
+
+    def test_does_not_change_its_input(self):
+        data = {"tags": ["a"], "nested": {"n": 1}}
+        apply_mutation(data, Mutation(add={"tags": ["b"]},
+                                      set={"nested.n": 2}))
+        assert data == {"tags": ["a"], "nested": {"n": 1}}
+
+    def test_array_changes(self):
+        data = {"tags": ["a", "b", "a"], "name": "x"}
+        assert apply_mutation(data, Mutation(remove={"tags": ["a"]}))[
+            "tags"] == ["b"]
+        assert apply_mutation(data, Mutation(add={"tags": ["b", "c"]}))[
+            "tags"] == ["a", "b", "a", "c"]
+        # Like Firestore, a field that is not an array starts out empty.
+        assert apply_mutation(data, Mutation(add={"name": ["y"]}))[
+            "name"] == ["y"]
+        assert apply_mutation(data, Mutation(remove={"name": ["x"]}))[
+            "name"] == []
+
+    def test_increments(self):
+        data = {"hp": 5, "speed": 1.5, "alive": True, "name": "x"}
+        updated = apply_mutation(data, Mutation(increment={
+            "hp": -2, "speed": 1, "alive": 1, "name": 3, "new": 4}))
+        # Non-numbers (booleans included) are replaced by the increment.
+        assert updated == {"hp": 3, "speed": 2.5, "alive": 1, "name": 3,
+                           "new": 4}
+
+    def test_nested_paths(self):
+        data = {"stats": {"hp": 1, "mp": 2}, "name": "x"}
+        updated = apply_mutation(data, Mutation(set={"stats.hp": 9,
+                                                     "a.b.c": 1}))
+        assert updated["stats"] == {"hp": 9, "mp": 2}
+        assert updated["a"] == {"b": {"c": 1}}
+        # A non-map parent is replaced by a map, as on Firestore; the
+        # PATCH routes refuse such paths (see test_mutation).
+        assert apply_mutation(data, Mutation(set={"name.first": "y"}))[
+            "name"] == {"first": "y"}
+        assert apply_mutation(data, Mutation(delete=["stats.mp",
+                                                     "name.first",
+                                                     "x.y"])) == {
+            "stats": {"hp": 1}, "name": "x"}
+
+
+@pytest.mark.parametrize("mutation", [
+    Mutation(),
+    Mutation(set={"": 1}),
+    Mutation(set={"a..b": 1}),
+    Mutation(set={"a": 1}, increment={"a": 1}),
+    Mutation(set={"stats": {}}, add={"stats.tags": ["x"]}),
+    Mutation(set={"a": 1}, delete=["a"]),
+])
+def test_invalid_mutations_are_rejected(mutation):
+    with pytest.raises(ValueError):
+        mutation.check()
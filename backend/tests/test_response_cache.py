@@ -0,0 +1,60 @@
+import pytest
+from app.models import response_cache
+from app.models.response_cache import (DiskResponseCache, ResponseCache,
+                                       make_cache_key)
+
+pytestmark = pytest.mark.anyio
+
+
+def test_keys_ignore_surrounding_whitespace_and_role_case():
+    assert make_cache_key("m", [{"role": "User", "content": " hi\n",
+                                 "timestamp": 1}]) == make_cache_key(
+        "m", [{"role": "user", "content": "hi"}])
+
+
+def test_keys_keep_line_structure():
+    assert make_cache_key("m", [{"role": "user", "content": "a\nb"}]) != (
+        make_cache_key("m", [{"role": "user", "content": "a b"}]))
+    assert make_cache_key("m", [{"role": "user", "content": "a"}]) != (
+        make_cache_key("other", [{"role": "user", "content": "a"}]))
+
+
+def test_disk_hits_only_touch_stale_rows(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    disk = DiskResponseCache(str(tmp_path / "cache.db"), touch_seconds=60)
+    disk.set("k", "v")
+
+    def accessed_at():
+        return disk._conn.execute(
+            "SELECT accessed_at FROM responses").fetchone()[0]
+
+    now[0] = 1030.0
+    assert disk.get("k") == "v"
+    assert accessed_at() == 1000.0
+    now[0] = 1060.0
+    assert disk.get("k") == "v"
+    assert accessed_at() == 1060.0
+
+
+def test_disk_entries_expire_and_are_bounded(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    disk = DiskResponseCache(str(tmp_path / "cache.db"), max_entries=2,
+                             ttl_seconds=100)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        disk.set(key, key)
+    assert disk.get("a") is None
+    assert disk.get("c") == "c"
+    now[0] += 100
+    assert disk.get("c") is None
+
+
+async def test_async_access_promotes_disk_hits(tmp_path):
+    path = str(tmp_path / "cache.db")
+    await ResponseCache(disk_path=path).aset("k", "v")
+    cache = ResponseCache(disk_path=path)
+    assert await cache.aget("k") == "v"
+    assert cache.memory.get("k") == "v"
+    assert await cache.aget("missing") is None